@@ -26,7 +26,7 @@ class UserAdmin(BaseUserAdmin):
     # ⚠️ IMPORTANT : username supprimé
     fieldsets = (
         (None, {'fields': ('email', 'password')}),
-        (_('Clés cryptographiques'), {'fields': ('public_key',)}),
+        (_('Clés cryptographiques'), {'fields': ('public_key', 'key_version', 'public_key_updated_at')}),
         (_('Créé par'), {'fields': ('created_by',)}),
         (_('Permissions'), {
             'fields': (
@@ -54,4 +54,6 @@ class UserAdmin(BaseUserAdmin):
         }),
     )
 
+    readonly_fields = ('key_version', 'public_key_updated_at')
     filter_horizontal = ('groups', 'user_permissions')
+
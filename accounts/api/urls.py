@@ -1,6 +1,6 @@
 # accounts/api/urls.py
 from django.urls import path
-from .views import  RegisterPublicKeyView, get_user_by_email, profile_view, update_must_change_password_flag, update_profile_view, change_password_view
+from .views import  RegisterPublicKeyView, get_user_by_email, profile_view, public_key_directory, update_must_change_password_flag, update_profile_view, change_password_view
 
 
 urlpatterns = [
@@ -10,8 +10,9 @@ urlpatterns = [
     path('profile/', profile_view, name='profile'),
     path('profile/update/', update_profile_view, name='update_profile'),
     path('password/change/', change_password_view, name='change_password'),
-    path('users/public-key/', RegisterPublicKeyView.as_view()),
+    path('users/public-key/', RegisterPublicKeyView.as_view(), name='register_public_key'),
     path('users/must-change-password/', update_must_change_password_flag, name='update_must_change_password_flag'),
     path('users/by-email/<str:email>/', get_user_by_email, name='get_user_by_email'),
+    path('users/public-keys/', public_key_directory, name='public_key_directory'),
     
 ]
\ No newline at end of file
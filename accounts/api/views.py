@@ -5,9 +5,14 @@ from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 from rest_framework.views import APIView
 
+from accounts import key_directory
+from accounts.tokens import access_token_for
+
 
 #------------------------------------- User Profile Views -----------------------------------
 @extend_schema(
@@ -47,13 +52,16 @@ def update_profile_view(request):
     user = request.user
     public_key = request.data.get('public_key')
     
+    data = {}
     if public_key and public_key != user.public_key:
-        user.public_key = public_key
-        user.save(update_fields=['public_key'])
+        user.save(update_fields=user.set_public_key(public_key))
+        # L'empreinte de clé du token courant n'est plus valable
+        data['access'] = access_token_for(user)
     
     return Response({
         'email': user.email,
         'public_key': user.public_key,
+        **data,
     })
 
 
@@ -141,11 +149,10 @@ class RegisterPublicKeyView(APIView):
             )
 
         user = request.user
-        user.public_key = public_key
-        user.save(update_fields=['public_key'])
+        user.save(update_fields=user.set_public_key(public_key))
 
         return Response(
-            {'message': 'Public key registered'},
+            {'message': 'Public key registered', 'access': access_token_for(user)},
             status=status.HTTP_200_OK
         )
 
@@ -170,7 +177,11 @@ def update_must_change_password_flag(request):
     try:
         request.user.must_change_password = False
         request.user.save(update_fields=['must_change_password'])
-        return Response({'status': 'success', 'message': 'Flag mis à jour'})
+        return Response({
+            'status': 'success',
+            'message': 'Flag mis à jour',
+            'access': access_token_for(request.user),
+        })
     except Exception as e:
         return Response(
             {'error': 'Erreur lors de la mise à jour du flag'},
@@ -222,4 +233,81 @@ def get_user_by_email(request, email):
         'id': str(user.id),
         'email': user.email,
         'public_key': user.public_key
-    })
\ No newline at end of file
+    })
+
+
+#------------------------------ Public Key Directory View -----------------------------------
+def _directory_params(request):
+    if request.method == 'POST':
+        ids = request.data.get('ids') or []
+        emails = request.data.get('emails') or []
+        if not isinstance(ids, list) or not isinstance(emails, list):
+            return None, None
+        return ids, [str(e) for e in emails]
+    ids = [v for raw in request.query_params.getlist('id') for v in raw.split(',') if v]
+    emails = [v for raw in request.query_params.getlist('email') for v in raw.split(',') if v]
+    return ids, emails
+
+
+@extend_schema(
+    summary="Annuaire des clés publiques",
+    description=(
+        "Retourne en une fois les clés publiques d'une liste d'utilisateurs, par id ou email "
+        "(GET ?id=..&email=.. répétables, ou POST {ids, emails}). "
+        "En GET, If-None-Match / If-Modified-Since permettent une réponse 304."
+    ),
+    tags=['Utilisateurs'],
+    responses={
+        200: OpenApiResponse(description="Clés trouvées et identifiants inconnus"),
+        304: OpenApiResponse(description="Clés inchangées"),
+        400: OpenApiResponse(description="Requête invalide"),
+    }
+)
+@api_view(['GET', 'POST'])
+@permission_classes([IsAuthenticated])
+def public_key_directory(request):
+    ids, emails = _directory_params(request)
+    if ids is None:
+        return Response(
+            {'error': "'ids' et 'emails' doivent être des listes"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if not ids and not emails:
+        return Response(
+            {'error': 'Au moins un id ou un email est requis'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    max_items = key_directory.conf('MAX_ITEMS')
+    if len(ids) + len(emails) > max_items:
+        return Response(
+            {'error': f'{max_items} utilisateurs maximum par requête'},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+
+    entries, not_found = key_directory.lookup(ids=ids, emails=emails)
+    etag = key_directory.etag(entries, not_found)
+    modified = key_directory.last_modified(entries)
+    last_modified = int(modified.timestamp()) if modified else None
+
+    if request.method == 'GET':
+        not_modified = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+    response = Response({
+        'keys': [
+            {
+                'id': str(entry['id']),
+                'email': entry['email'],
+                'public_key': entry['public_key'],
+                'key_version': entry['key_version'],
+            }
+            for entry in entries
+        ],
+        'not_found': not_found,
+    })
+    response['ETag'] = etag
+    if last_modified is not None:
+        response['Last-Modified'] = http_date(last_modified)
+    response['Cache-Control'] = 'private, no-cache'
+    return response
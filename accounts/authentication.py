@@ -0,0 +1,96 @@
+# accounts/authentication.py
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from accounts import user_cache
+from accounts.tokens import claims_are_current
+from secure_doc import metrics
+
+
+def _user_id(validated_token):
+    try:
+        return validated_token[api_settings.USER_ID_CLAIM]
+    except KeyError:
+        raise InvalidToken(_("Token contained no recognizable user identification"))
+
+
+def _check_user(user, validated_token):
+    """
+    Contrôles de JWTAuthentication.get_user, appliqués à l'utilisateur résolu,
+    plus la cohérence des claims applicatifs (accounts/tokens.py).
+    """
+    if user is None:
+        raise AuthenticationFailed(_("User not found"), code="user_not_found")
+    if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+        raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+    if api_settings.CHECK_REVOKE_TOKEN:
+        if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+            raise AuthenticationFailed(
+                _("The user's password has been changed."), code="password_changed"
+            )
+    if not claims_are_current(validated_token, user):
+        raise AuthenticationFailed(
+            _("Token claims are outdated, please refresh the token."), code="token_outdated"
+        )
+    return user
+
+
+class SecureDocJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication de simplejwt, instrumentée (métriques d'authentification),
+    dont l'utilisateur est résolu via le cache accounts.user_cache.
+    """
+
+    def authenticate(self, request):
+        metrics.JWT_AUTHENTICATIONS_IN_PROGRESS.inc()
+        try:
+            result = super().authenticate(request)
+        except (AuthenticationFailed, InvalidToken):
+            metrics.JWT_AUTHENTICATIONS.inc(result='failure')
+            raise
+        finally:
+            metrics.JWT_AUTHENTICATIONS_IN_PROGRESS.dec()
+        metrics.JWT_AUTHENTICATIONS.inc(result='success' if result else 'anonymous')
+        return result
+
+    def get_user(self, validated_token):
+        user = user_cache.get_user(_user_id(validated_token), api_settings.USER_ID_FIELD)
+        return _check_user(user, validated_token)
+
+
+async def aauthenticate(request):
+    """
+    Équivalent async de JWTAuthentication.authenticate pour les vues
+    Django async (hors DRF) : validation du token en mémoire, puis
+    résolution de l'utilisateur via le cache (ORM async en cas d'absence).
+
+    Retourne (user, validated_token) ou None si aucun token n'est fourni ;
+    lève AuthenticationFailed / InvalidToken comme la version DRF.
+    """
+    metrics.JWT_AUTHENTICATIONS_IN_PROGRESS.inc()
+    try:
+        result = await _aauthenticate(request)
+    except (AuthenticationFailed, InvalidToken):
+        metrics.JWT_AUTHENTICATIONS.inc(result='failure')
+        raise
+    finally:
+        metrics.JWT_AUTHENTICATIONS_IN_PROGRESS.dec()
+    metrics.JWT_AUTHENTICATIONS.inc(result='success' if result else 'anonymous')
+    return result
+
+
+async def _aauthenticate(request):
+    auth = JWTAuthentication()
+    header = auth.get_header(request)
+    if header is None:
+        return None
+    raw_token = auth.get_raw_token(header)
+    if raw_token is None:
+        return None
+    validated_token = auth.get_validated_token(raw_token)
+
+    user = await user_cache.aget_user(_user_id(validated_token), api_settings.USER_ID_FIELD)
+    return _check_user(user, validated_token), validated_token
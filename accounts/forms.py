@@ -3,6 +3,11 @@ from django import forms
 import secrets
 import string
 
+def generate_temp_password():
+    alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
+    return ''.join(secrets.choice(alphabet) for _ in range(12))
+
+
 class CreateUserForm(forms.Form):
     email = forms.EmailField(
         label="Email de l'utilisateur",
@@ -10,8 +15,7 @@ class CreateUserForm(forms.Form):
     )
     
     def generate_temp_password(self):
-        alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-        return ''.join(secrets.choice(alphabet) for _ in range(12))
+        return generate_temp_password()
 
 
 
@@ -0,0 +1,167 @@
+# accounts/key_directory.py
+"""
+Annuaire des clés publiques : résolution groupée (une requête SQL pour tous
+les absents du cache) des clés par id ou par email.
+
+Les entrées sont gardées dans un LRU du processus (TTL court), invalidé par
+le signal post_save de User (accounts/signals.py) : RegisterPublicKeyView,
+update_profile_view et l'admin passent tous par save(). Ce signal ne touche
+que le worker qui a traité la modification : chaque lecture revalide donc
+les entrées du cache par (id, email, key_version), en une requête sur la
+clé primaire, et relit les entrées périmées (rotation de clé ou changement
+d'email dans un autre worker, compte supprimé). Le cache évite de relire
+les clés publiques elles-mêmes.
+"""
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+
+from accounts.user_cache import LRUBackend
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_ENTRIES': 10000,
+    'TTL': 60,           # secondes
+    'MAX_ITEMS': 500,    # ids + emails par requête
+}
+
+FIELDS = ('id', 'email', 'public_key', 'key_version', 'public_key_updated_at', 'date_joined')
+VERSION_FIELDS = ('id', 'email', 'key_version')
+
+
+def conf(name):
+    return getattr(settings, 'ACCOUNTS_KEY_DIRECTORY', {}).get(name, DEFAULTS[name])
+
+
+_backend = None
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        _backend = LRUBackend(conf('MAX_ENTRIES'))
+    return _backend
+
+
+def _id_key(user_id):
+    return f'id:{user_id}'
+
+
+def _email_key(email):
+    return f'email:{email}'
+
+
+def parse_id(value):
+    try:
+        return get_user_model()._meta.pk.to_python(value)
+    except (ValidationError, TypeError, ValueError, OverflowError):
+        return None
+
+
+def lookup(ids=(), emails=()):
+    """
+    Retourne (entrées, non trouvés) ; chaque entrée est un dict FIELDS.
+    Les entrées sont triées par email pour une représentation stable (ETag).
+    """
+    found = {}
+    cached_ids, cached_emails = set(), set()
+    missing_ids, missing_emails, not_found = [], [], []
+    backend = _get_backend() if conf('ENABLED') else None
+
+    for raw in dict.fromkeys(ids):
+        user_id = parse_id(raw)
+        if user_id is None:
+            not_found.append(str(raw))
+            continue
+        entry = backend.get(_id_key(user_id)) if backend else None
+        if entry is not None:
+            found[entry['id']] = entry
+            cached_ids.add(user_id)
+        else:
+            missing_ids.append(user_id)
+
+    for email in dict.fromkeys(emails):
+        entry = backend.get(_email_key(email)) if backend else None
+        if entry is not None and entry['email'] == email:
+            found[entry['id']] = entry
+            cached_emails.add(email)
+        else:
+            missing_emails.append(email)
+
+    if found:
+        # Revalidation des entrées du cache (autres workers, emails modifiés)
+        current = {
+            user_id: (email, key_version)
+            for user_id, email, key_version in get_user_model().objects.filter(
+                id__in=list(found)
+            ).values_list(*VERSION_FIELDS)
+        }
+        for user_id, entry in list(found.items()):
+            if current.get(user_id) != (entry['email'], entry['key_version']):
+                del found[user_id]
+                backend.delete(_id_key(user_id))
+                backend.delete(_email_key(entry['email']))
+                # Relue comme elle a été demandée (par id et / ou par email)
+                if user_id in cached_ids:
+                    missing_ids.append(user_id)
+                if entry['email'] in cached_emails:
+                    missing_emails.append(entry['email'])
+
+    if missing_ids or missing_emails:
+        rows = get_user_model().objects.filter(
+            Q(id__in=missing_ids) | Q(email__in=missing_emails)
+        ).values(*FIELDS)
+        for row in rows:
+            found[row['id']] = row
+            if backend:
+                ttl = conf('TTL')
+                backend.set(_id_key(row['id']), row, ttl)
+                backend.set(_email_key(row['email']), row, ttl)
+
+        found_ids = {entry['id'] for entry in found.values()}
+        found_emails = {entry['email'] for entry in found.values()}
+        not_found += [str(i) for i in missing_ids if i not in found_ids]
+        not_found += [e for e in missing_emails if e not in found_emails]
+
+    return sorted(found.values(), key=lambda entry: entry['email']), not_found
+
+
+def etag(entries, not_found):
+    """
+    Empreinte de tous les champs des entrées renvoyées (FIELDS) et des absents :
+    un changement d'email comme de clé change l'ETag.
+    """
+    digest = hashlib.sha256()
+    for entry in entries:
+        digest.update(json.dumps([entry[field] for field in FIELDS], default=str).encode())
+    digest.update('|'.join(sorted(not_found)).encode())
+    return f'"{digest.hexdigest()[:32]}"'
+
+
+def last_modified(entries):
+    dates = [entry['public_key_updated_at'] or entry['date_joined'] for entry in entries]
+    return max(dates) if dates else None
+
+
+def invalidate(user_id, email=None):
+    """
+    Oublie l'utilisateur, sous son id, son email courant et l'email de
+    l'entrée en cache (ancien email après une modification).
+    """
+    backend = _get_backend()
+    entry = backend.get(_id_key(user_id))
+    if entry is not None:
+        backend.delete(_email_key(entry['email']))
+    backend.delete(_id_key(user_id))
+    if email:
+        backend.delete(_email_key(email))
+
+
+def reset():
+    global _backend
+    _backend = None
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_user_must_change_password'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='key_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='public_key_updated_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,32 @@
+from django.db import migrations
+
+
+INDEX_NAME = 'accounts_user_email_lower_prefix_idx'
+
+
+def create_index(apps, schema_editor):
+    # Recherche par préfixe insensible à la casse (list_users ?q=) :
+    # LOWER(email) LIKE 'abc%' ne peut utiliser un index que via text_pattern_ops
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        f'CREATE INDEX IF NOT EXISTS {INDEX_NAME} '
+        'ON accounts_user (LOWER(email) text_pattern_ops)'
+    )
+
+
+def drop_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_user_key_version'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
@@ -21,6 +21,9 @@ class User(AbstractUser):
         related_name='created_users'
     )
     must_change_password = models.BooleanField(default=False)
+    # Incrémenté à chaque changement de clé publique (ETag de l'annuaire de clés)
+    key_version = models.PositiveIntegerField(default=0)
+    public_key_updated_at = models.DateTimeField(null=True, blank=True)
 
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = []
@@ -29,6 +32,42 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.email
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if 'public_key' in field_names:
+            # Clé lue en base : save() détecte son remplacement
+            instance._loaded_public_key = instance.public_key
+        return instance
+
+    def save(self, *args, **kwargs):
+        """
+        Toute modification de la clé publique passant par save() (vues, admin,
+        shell) incrémente key_version et date public_key_updated_at.
+        Les QuerySet.update() doivent le faire eux-mêmes.
+        """
+        update_fields = kwargs.get('update_fields')
+        if (
+            not self._state.adding
+            and hasattr(self, '_loaded_public_key')
+            and self.public_key != self._loaded_public_key
+            and (update_fields is None or 'public_key' in update_fields)
+        ):
+            self.key_version += 1
+            self.public_key_updated_at = timezone.now()
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'key_version', 'public_key_updated_at'}
+        super().save(*args, **kwargs)
+        self._loaded_public_key = self.public_key
+
+    def set_public_key(self, public_key):
+        """
+        Remplace la clé publique (version incrémentée par save()) ; retourne
+        les champs à passer à save(update_fields=...).
+        """
+        self.public_key = public_key
+        return ['public_key', 'key_version', 'public_key_updated_at']
     
 
 
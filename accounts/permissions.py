@@ -0,0 +1,48 @@
+# accounts/permissions.py
+"""
+Permissions décidées sur les claims du token (accounts/tokens.py), sans
+accès base : SecureDocJWTAuthentication garantit qu'ils n'accordent jamais
+plus que l'état actuel de l'utilisateur. Un claim plus restrictif (mot de
+passe changé ou clé enregistrée depuis une autre session) donne un 403
+jusqu'au rafraîchissement du token.
+Pour un token sans claims (émis avant leur ajout), on se rabat sur request.user.
+"""
+from rest_framework.permissions import BasePermission, IsAuthenticated
+
+from accounts.tokens import MUST_CHANGE_PASSWORD_CLAIM, PUBLIC_KEY_CLAIM
+
+
+def _claim(request, claim, fallback):
+    token = request.auth
+    if token is not None and claim in token:
+        return token[claim]
+    return fallback(request.user)
+
+
+class PasswordChangeCompleted(BasePermission):
+    """
+    Refuse l'accès tant que l'utilisateur doit changer son mot de passe temporaire.
+    """
+    message = "Vous devez changer votre mot de passe avant de continuer."
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated) and not _claim(
+            request, MUST_CHANGE_PASSWORD_CLAIM, lambda user: user.must_change_password
+        )
+
+
+class HasPublicKey(BasePermission):
+    """
+    Refuse l'accès tant que l'utilisateur n'a pas enregistré de clé publique.
+    """
+    message = "Vous devez enregistrer votre clé publique avant de continuer."
+
+    def has_permission(self, request, view):
+        return bool(request.user and request.user.is_authenticated) and bool(_claim(
+            request, PUBLIC_KEY_CLAIM, lambda user: user.public_key
+        ))
+
+
+# Endpoints documents (liste, recherche, sync, partage, upload, téléchargement) :
+# mot de passe temporaire changé et clé publique enregistrée
+DOCUMENT_PERMISSIONS = [IsAuthenticated, PasswordChangeCompleted, HasPublicKey]
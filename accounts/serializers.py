@@ -1,8 +1,41 @@
 # accounts/serializers.py
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts.tokens import add_user_claims
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        return add_user_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         data['must_change_password'] = self.user.must_change_password
-        return data
\ No newline at end of file
+        return data
+
+
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Relit l'utilisateur pour que le nouvel access token porte des claims
+    à jour (drapeaux, empreinte de clé publique) et non ceux du refresh token.
+    La rotation et la blacklist restent celles de simplejwt.
+    """
+
+    def validate(self, attrs):
+        user_id = self.token_class(attrs['refresh']).payload.get(api_settings.USER_ID_CLAIM)
+        user = get_user_model().objects.filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+        # simplejwt lèverait DoesNotExist (erreur 500) pour un compte supprimé
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages['no_active_account'],
+                'no_active_account',
+            )
+
+        data = super().validate(attrs)
+        access = self.token_class.access_token_class(data['access'])
+        data['access'] = str(add_user_claims(access, user))
+        return data
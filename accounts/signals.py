@@ -0,0 +1,19 @@
+# accounts/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework_simplejwt.settings import api_settings
+
+from accounts import key_directory, user_cache
+from accounts.models import User
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_cached_user(sender, instance, **kwargs):
+    """
+    Activation / désactivation, mot de passe, profil ou clé publique modifiés :
+    le prochain appel authentifié et la prochaine lecture de l'annuaire de
+    clés relisent l'utilisateur en base.
+    """
+    user_cache.invalidate(getattr(instance, api_settings.USER_ID_FIELD))
+    key_directory.invalidate(instance.pk, instance.email)
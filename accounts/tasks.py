@@ -0,0 +1,49 @@
+# accounts/tasks.py
+"""
+Tâches différées du compte (exécutées par manage.py run_jobs).
+"""
+from django.conf import settings
+from django.core.mail import send_mail
+
+from accounts.forms import generate_temp_password
+from accounts.models import User
+from jobs.queue import enqueue, task
+
+
+WELCOME_EMAIL = """
+Bonjour,
+
+Votre compte SecureDoc a été créé par un administrateur.
+
+📧 Email : {email}
+🔒 Mot de passe temporaire : {temp_password}
+
+⚠️ Vous devrez changer ce mot de passe à votre première connexion.
+
+Connectez-vous ici : https://app.secdoc.example.com/login
+"""
+
+
+@task('accounts.send_welcome_email', max_attempts=6, concurrency=2)
+def send_welcome_email(user_id):
+    """
+    Génère le mot de passe temporaire au moment de l'envoi : il n'est jamais
+    stocké en clair dans la file. Un nouvel essai génère un nouveau mot de passe.
+    """
+    user = User.objects.filter(id=user_id).first()
+    if user is None or not user.must_change_password or user.last_login is not None:
+        # Compte supprimé ou déjà utilisé : ne pas écraser son mot de passe
+        return
+    temp_password = generate_temp_password()
+    user.set_password(temp_password)
+    user.save(update_fields=['password'])
+    send_mail(
+        subject="Bienvenue sur SecureDoc",
+        message=WELCOME_EMAIL.format(email=user.email, temp_password=temp_password),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        recipient_list=[user.email],
+    )
+
+
+def enqueue_welcome_email(user):
+    enqueue('accounts.send_welcome_email', {'user_id': user.id}, key=f'welcome_email:{user.id}')
@@ -1,3 +1,236 @@
-from django.test import TestCase
+# accounts/tests.py
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 
-# Create your tests here.
+from accounts import key_directory, user_cache
+from accounts.models import User
+from accounts.permissions import HasPublicKey, PasswordChangeCompleted
+from accounts.tokens import (
+    IS_STAFF_CLAIM, PUBLIC_KEY_CLAIM, access_token_for, add_user_claims, public_key_fingerprint,
+)
+
+
+def make_user(email, **fields):
+    return User.objects.create_user(email=email, password='x-Password-1', is_active=True, **fields)
+
+
+#------------------------------------------ Cache des utilisateurs JWT ------------------------------------------
+class UserCacheTests(TestCase):
+    def setUp(self):
+        user_cache.reset()
+        self.addCleanup(user_cache.reset)
+        self.user = make_user('user@example.com')
+
+    def conf(self, **values):
+        return lambda name: values.get(name, user_cache.DEFAULTS[name])
+
+    def test_auto_backend(self):
+        local = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+        shared = {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}}
+        with self.settings(CACHES=local):
+            self.assertEqual(user_cache.backend_name(self.conf()), 'locmem')
+            # Plusieurs workers sans cache partagé : pas de cache
+            self.assertIsNone(user_cache.backend_name(self.conf(WORKERS=4)))
+            self.assertEqual(user_cache.backend_name(self.conf(WORKERS=4, BACKEND='locmem')), 'locmem')
+        with self.settings(CACHES=shared):
+            self.assertEqual(user_cache.backend_name(self.conf(WORKERS=4)), 'django')
+
+    def test_hit_returns_a_copy(self):
+        first = user_cache.get_user(self.user.id)
+        first.email = 'changed@example.com'
+        with self.assertNumQueries(0):
+            self.assertEqual(user_cache.get_user(self.user.id).email, 'user@example.com')
+
+    def test_deactivation_is_seen_immediately(self):
+        self.assertTrue(user_cache.get_user(self.user.id).is_active)
+        self.user.is_active = False
+        self.user.save()
+        self.assertFalse(user_cache.get_user(self.user.id).is_active)
+
+    @override_settings(ACCOUNTS_USER_CACHE={'WORKERS': 4})
+    def test_no_cache_with_several_workers(self):
+        user_cache.reset()
+        user_cache.get_user(self.user.id)
+        with self.assertNumQueries(1):
+            user_cache.get_user(self.user.id)
+
+
+#------------------------------------------ Annuaire des clés publiques ------------------------------------------
+class KeyDirectoryTests(TestCase):
+    def setUp(self):
+        key_directory.reset()
+        self.addCleanup(key_directory.reset)
+        self.alice = make_user('alice@example.com', public_key='PEM-A')
+        self.bob = make_user('bob@example.com', public_key='PEM-B')
+
+    def test_lookup_by_id_and_email(self):
+        entries, not_found = key_directory.lookup(
+            ids=[self.alice.id, 'not-an-id'], emails=['bob@example.com', 'nobody@example.com']
+        )
+        self.assertEqual([entry['email'] for entry in entries], ['alice@example.com', 'bob@example.com'])
+        self.assertEqual(sorted(not_found), ['nobody@example.com', 'not-an-id'])
+
+    def test_cached_entries_are_revalidated(self):
+        key_directory.lookup(ids=[self.alice.id], emails=['bob@example.com'])
+        # Modifications faites par un autre worker : aucun signal dans ce processus
+        User.objects.filter(id=self.alice.id).update(public_key='PEM-A2', key_version=1)
+        User.objects.filter(id=self.bob.id).update(email='robert@example.com')
+
+        entries, not_found = key_directory.lookup(ids=[self.alice.id], emails=['bob@example.com'])
+        self.assertEqual([(e['public_key'], e['key_version']) for e in entries], [('PEM-A2', 1)])
+        self.assertEqual(not_found, ['bob@example.com'])
+
+    def test_unchanged_entries_cost_one_query(self):
+        key_directory.lookup(ids=[self.alice.id, self.bob.id])
+        with self.assertNumQueries(1):
+            key_directory.lookup(ids=[self.alice.id, self.bob.id])
+
+    def test_email_change_drops_the_previous_email(self):
+        key_directory.lookup(ids=[self.bob.id], emails=['bob@example.com'])
+        self.bob.email = 'robert@example.com'
+        self.bob.save()
+        self.assertIsNone(key_directory._get_backend().get(key_directory._email_key('bob@example.com')))
+
+    def etag(self):
+        return key_directory.etag(*key_directory.lookup(ids=[self.alice.id]))
+
+    def test_etag_follows_every_returned_field(self):
+        before = self.etag()
+        self.alice.email = 'alice@example.org'
+        self.alice.save()
+        after_email = self.etag()
+        self.assertNotEqual(after_email, before)
+
+        self.alice.save(update_fields=self.alice.set_public_key('PEM-A2'))
+        self.assertNotEqual(self.etag(), after_email)
+
+    def test_key_version_follows_every_key_change(self):
+        self.alice.save(update_fields=self.alice.set_public_key('PEM-A2'))
+        self.assertEqual(self.alice.key_version, 1)
+        # Admin, shell : save() sans set_public_key
+        alice = User.objects.get(id=self.alice.id)
+        alice.public_key = 'PEM-A3'
+        alice.save()
+        alice.first_name = 'Alice'
+        alice.save()
+        alice.refresh_from_db()
+        self.assertEqual(alice.key_version, 2)
+        self.assertIsNotNone(alice.public_key_updated_at)
+
+
+#------------------------------------------ Claims des tokens ------------------------------------------
+class TokenClaimsTests(TestCase):
+    def setUp(self):
+        user_cache.reset()
+        self.addCleanup(user_cache.reset)
+        self.user = make_user('user@example.com', public_key='PEM')
+        self.client = APIClient()
+
+    def login(self):
+        response = self.client.post(
+            '/api/token/', {'email': 'user@example.com', 'password': 'x-Password-1'}, format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def list_documents(self, access):
+        return self.client.get('/api/documents/list/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def refresh(self, tokens):
+        response = self.client.post('/api/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return response.data['access']
+
+    def test_revoked_rights_are_rejected_until_refresh(self):
+        self.user.is_staff = True
+        self.user.save()
+        tokens = self.login()
+        self.assertEqual(AccessToken(tokens['access'])[PUBLIC_KEY_CLAIM], public_key_fingerprint('PEM'))
+        self.assertEqual(self.list_documents(tokens['access']).status_code, 200)
+
+        self.user.is_staff = False
+        self.user.save()
+        response = self.list_documents(tokens['access'])
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.data['code'], 'token_outdated')
+
+        access = self.refresh(tokens)
+        self.assertFalse(AccessToken(access)[IS_STAFF_CLAIM])
+        self.assertEqual(self.list_documents(access).status_code, 200)
+
+    def test_completed_onboarding_keeps_other_sessions(self):
+        self.user.must_change_password = True
+        self.user.public_key = None
+        self.user.save()
+        other = self.login()
+        tokens = self.login()
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+
+        response = self.client.post('/api/accounts/users/must-change-password/', **headers)
+        headers = {'HTTP_AUTHORIZATION': f"Bearer {response.data['access']}"}
+        response = self.client.post('/api/accounts/users/public-key/', {'public_key': 'PEM'}, format='json', **headers)
+        self.assertEqual(self.list_documents(response.data['access']).status_code, 200)
+
+        # L'autre session reste connectée ; ses claims restrictifs valent 403 jusqu'au rafraîchissement
+        profile = self.client.get('/api/accounts/profile/', HTTP_AUTHORIZATION=f"Bearer {other['access']}")
+        self.assertEqual(profile.status_code, 200)
+        self.assertEqual(self.list_documents(other['access']).status_code, 403)
+        self.assertEqual(self.list_documents(self.refresh(other)).status_code, 200)
+
+    def test_key_rotation_keeps_other_sessions(self):
+        tokens = self.login()
+        self.user.save(update_fields=self.user.set_public_key('PEM-2'))
+        self.assertEqual(self.list_documents(tokens['access']).status_code, 200)
+
+    def test_refresh_for_inactive_or_deleted_account(self):
+        refresh = str(add_user_claims(RefreshToken.for_user(self.user), self.user))
+        self.user.is_active = False
+        self.user.save()
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+        self.user.delete()
+        response = self.client.post('/api/token/refresh/', {'refresh': refresh}, format='json')
+        self.assertEqual(response.status_code, 401)
+
+
+#------------------------------------------ Permissions sur les claims ------------------------------------------
+class ClaimPermissionTests(TestCase):
+    def setUp(self):
+        user_cache.reset()
+        self.addCleanup(user_cache.reset)
+        self.client = APIClient()
+
+    def assert_refused_from_claims(self, user, message):
+        headers = {'HTTP_AUTHORIZATION': f'Bearer {access_token_for(user)}'}
+        # Premier appel : l'utilisateur entre dans le cache
+        self.client.get('/api/documents/list/', **headers)
+        for method, url in (('GET', '/api/documents/list/'), ('POST', '/api/documents/upload/confirm/batch/')):
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.generic(method, url, **headers)
+            self.assertEqual(response.status_code, 403)
+            self.assertEqual(response.data['detail'], message)
+
+    def test_must_change_password(self):
+        user = make_user('new@example.com', public_key='PEM', must_change_password=True)
+        self.assert_refused_from_claims(user, PasswordChangeCompleted.message)
+
+    def test_missing_public_key(self):
+        user = make_user('nokey@example.com')
+        self.assert_refused_from_claims(user, HasPublicKey.message)
+
+    async def test_async_views(self):
+        user = await User.objects.acreate(email='async@example.com', is_active=True, must_change_password=True)
+        response = await AsyncClient().get(
+            '/api/async/documents/list/', headers={'Authorization': f'Bearer {access_token_for(user)}'}
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertEqual(response.json()['detail'], PasswordChangeCompleted.message)
+
+    def test_ready_user_is_allowed(self):
+        user = make_user('ready@example.com', public_key='PEM')
+        response = self.client.get(
+            '/api/documents/list/', HTTP_AUTHORIZATION=f'Bearer {access_token_for(user)}'
+        )
+        self.assertEqual(response.status_code, 200)
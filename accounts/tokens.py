@@ -0,0 +1,70 @@
+# accounts/tokens.py
+"""
+Claims applicatifs portés par les tokens JWT : drapeaux de l'utilisateur et
+empreinte de sa clé publique. Les permissions peuvent ainsi se décider sur
+le token seul ; SecureDocJWTAuthentication rejette un token dont les claims
+accordent plus que l'état actuel de l'utilisateur (il faut alors le rafraîchir).
+"""
+import hashlib
+
+from rest_framework_simplejwt.tokens import RefreshToken
+
+
+MUST_CHANGE_PASSWORD_CLAIM = 'must_change_password'
+IS_STAFF_CLAIM = 'is_staff'
+PUBLIC_KEY_CLAIM = 'public_key_fp'
+
+
+def public_key_fingerprint(public_key):
+    """
+    Empreinte courte (SHA-256 tronqué) de la clé publique PEM, None si absente.
+    """
+    if not public_key:
+        return None
+    return hashlib.sha256(public_key.strip().encode()).hexdigest()[:16]
+
+
+def user_claims(user):
+    return {
+        MUST_CHANGE_PASSWORD_CLAIM: user.must_change_password,
+        IS_STAFF_CLAIM: user.is_staff,
+        PUBLIC_KEY_CLAIM: public_key_fingerprint(user.public_key),
+    }
+
+
+def add_user_claims(token, user):
+    for claim, value in user_claims(user).items():
+        token[claim] = value
+    return token
+
+
+def claims_are_current(validated_token, user):
+    """
+    False si un claim présent dans le token accorde plus que l'état actuel de
+    l'utilisateur. Les tokens émis avant l'ajout des claims (claims absents)
+    restent acceptés.
+
+    Seuls les retraits de droits invalident les access tokens déjà émis
+    (401 token_outdated, à rafraîchir via /api/token/refresh/) :
+    is_staff retiré, changement de mot de passe imposé, clé publique supprimée.
+    Un token plus restrictif que l'utilisateur (mot de passe changé, clé
+    enregistrée ou remplacée dans une autre session) reste valide : les
+    permissions documents le refusent (403) jusqu'au rafraîchissement, sans
+    déconnecter les autres sessions. Les vues qui modifient ces champs
+    renvoient un access token à jour (access_token_for).
+    """
+    claims = user_claims(user)
+    if validated_token.get(IS_STAFF_CLAIM) and not claims[IS_STAFF_CLAIM]:
+        return False
+    if validated_token.get(MUST_CHANGE_PASSWORD_CLAIM) is False and claims[MUST_CHANGE_PASSWORD_CLAIM]:
+        return False
+    if validated_token.get(PUBLIC_KEY_CLAIM) and not claims[PUBLIC_KEY_CLAIM]:
+        return False
+    return True
+
+
+def access_token_for(user):
+    """
+    Nouvel access token aux claims à jour, renvoyé par les vues qui les modifient.
+    """
+    return str(add_user_claims(RefreshToken.for_user(user), user).access_token)
@@ -0,0 +1,243 @@
+# accounts/user_cache.py
+"""
+Cache court (TTL) des utilisateurs résolus à partir d'un JWT, par id.
+
+Évite la requête SELECT sur accounts_user à chaque appel API authentifié.
+Backends : "locmem" (LRU en mémoire du processus) ou "django" (cache Django
+configuré, partagé entre workers s'il s'agit de Redis, Memcached ou du cache
+en base).
+
+Invalidation : signaux post_save / post_delete de User (accounts/signals.py),
+ce qui couvre admin_toggle_user_active, change_password_view et les mises à
+jour de profil / clé publique. Un LRU par processus n'est invalidé que dans
+le worker qui a traité la modification : les autres continueraient
+d'accepter un compte désactivé jusqu'à TTL secondes. Le backend par défaut,
+"auto", choisit donc :
+  - "django" si le cache CACHE_ALIAS est partagé entre processus ;
+  - "locmem" s'il n'y a qu'un worker (WORKERS, soit WEB_CONCURRENCY) ;
+  - sinon aucun cache : chaque requête relit l'utilisateur en base.
+BACKEND = "locmem" force le LRU et accepte ce délai.
+"""
+import copy
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+from secure_doc import metrics
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'auto',            # "auto", "locmem" (LRU du processus) ou "django"
+    'CACHE_ALIAS': 'default',
+    'WORKERS': 1,                 # processus servant l'API (WEB_CONCURRENCY)
+    'MAX_ENTRIES': 10000,
+    'TTL': 30,                    # secondes
+}
+
+CACHE_LOOKUPS = metrics.Counter(
+    'securedoc_jwt_user_cache_lookups_total',
+    "Résolutions d'utilisateur JWT par résultat du cache.",
+    ('result',),
+)
+
+
+def _conf(name):
+    return getattr(settings, 'ACCOUNTS_USER_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LRUBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, timeout):
+        with self._lock:
+            self._data[key] = (time.monotonic() + timeout, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    async def aget(self, key):
+        return self.get(key)
+
+    async def aset(self, key, value, timeout):
+        self.set(key, value, timeout)
+
+
+class NullBackend:
+    """
+    Aucun cache : plusieurs workers sans cache partagé.
+    """
+    def get(self, key):
+        return None
+
+    def set(self, key, value, timeout):
+        pass
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+    async def aget(self, key):
+        return None
+
+    async def aset(self, key, value, timeout):
+        pass
+
+
+class DjangoCacheBackend:
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, value, timeout):
+        self.cache.set(key, value, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        pass
+
+    async def aget(self, key):
+        return await self.cache.aget(key)
+
+    async def aset(self, key, value, timeout):
+        await self.cache.aset(key, value, timeout)
+
+
+# Caches Django propres à chaque processus
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def shared_cache(alias):
+    """
+    True si le cache Django `alias` est visible de tous les workers.
+    """
+    return settings.CACHES.get(alias, {}).get('BACKEND') not in PROCESS_LOCAL_CACHES
+
+
+def backend_name(conf):
+    """
+    Backend effectif ("locmem", "django" ou None = pas de cache) selon la
+    configuration `conf` (nom -> valeur) et le nombre de workers.
+    """
+    name = conf('BACKEND')
+    if name != 'auto':
+        return name
+    if shared_cache(conf('CACHE_ALIAS')):
+        return 'django'
+    return 'locmem' if conf('WORKERS') <= 1 else None
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                name = backend_name(_conf)
+                if name == 'django':
+                    _backend = DjangoCacheBackend(_conf('CACHE_ALIAS'))
+                elif name is None:
+                    _backend = NullBackend()
+                else:
+                    _backend = LRUBackend(_conf('MAX_ENTRIES'))
+    return _backend
+
+
+def _key(user_id):
+    return f'accounts:jwt-user:{user_id}'
+
+
+def get_user(user_id, field='id'):
+    """
+    Utilisateur d'id `user_id` (copie propre à l'appelant), ou None s'il n'existe pas.
+    """
+    backend = _get_backend()
+    if not _conf('ENABLED') or isinstance(backend, NullBackend):
+        return get_user_model().objects.filter(**{field: user_id}).first()
+
+    key = _key(user_id)
+    user = backend.get(key)
+    if user is not None:
+        CACHE_LOOKUPS.inc(result='hit')
+        return copy.copy(user)
+
+    CACHE_LOOKUPS.inc(result='miss')
+    user = get_user_model().objects.filter(**{field: user_id}).first()
+    if user is not None:
+        backend.set(key, user, _conf('TTL'))
+        user = copy.copy(user)
+    return user
+
+
+async def aget_user(user_id, field='id'):
+    """
+    Équivalent async de get_user (vues Django async).
+    """
+    backend = _get_backend()
+    if not _conf('ENABLED') or isinstance(backend, NullBackend):
+        return await get_user_model().objects.filter(**{field: user_id}).afirst()
+
+    key = _key(user_id)
+    user = await backend.aget(key)
+    if user is not None:
+        CACHE_LOOKUPS.inc(result='hit')
+        return copy.copy(user)
+
+    CACHE_LOOKUPS.inc(result='miss')
+    user = await get_user_model().objects.filter(**{field: user_id}).afirst()
+    if user is not None:
+        await backend.aset(key, user, _conf('TTL'))
+        user = copy.copy(user)
+    return user
+
+
+def invalidate(user_id):
+    _get_backend().delete(_key(user_id))
+
+
+def reset():
+    """
+    Vide le cache (tests, benchmarks, changement de settings).
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.clear()
+        _backend = None
@@ -1,9 +1,6 @@
 # accounts/views.py
-import threading
 from documents.permissions import IsAdminUser
 from .models import InvitationToken, User
-from django.core.mail import send_mail
-from django.conf import settings
 from rest_framework.decorators import permission_classes
 from django.shortcuts import render, redirect
 from accounts.models import InvitationToken, User
@@ -106,35 +103,12 @@ def admin_users(request):
     users = User.objects.all().order_by('-date_joined')
     return render(request, 'admin_dashboard/users.html', {'users': users})
 
-from django.contrib.auth.password_validation import validate_password
-from django.core.exceptions import ValidationError
+from django.db import transaction
+from accounts.tasks import enqueue_welcome_email
 import logging
 
 logger = logging.getLogger(__name__)
 
-def _send_welcome_email(email, temp_password):
-    """Fonction asynchrone pour envoyer l'email de bienvenue"""
-    try:
-        send_mail(
-            subject="Bienvenue sur SecureDoc",
-            message=f"""
-Bonjour,
-
-Votre compte SecureDoc a été créé par un administrateur.
-
-📧 Email : {email}
-🔒 Mot de passe temporaire : {temp_password}
-
-⚠️ Vous devrez changer ce mot de passe à votre première connexion.
-
-Connectez-vous ici : https://app.secdoc.example.com/login
-            """,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            recipient_list=[email],
-        )
-    except Exception as e:
-        logger.error(f"Échec de l'envoi de l'email à {email}: {e}")
-
 @staff_member_required(login_url='admin_login')
 @permission_classes([IsAdminUser])
 def admin_create_user(request):
@@ -143,34 +117,22 @@ def admin_create_user(request):
         if form.is_valid():
             email = form.cleaned_data['email']
             
-            # Générer mot de passe temporaire
-            temp_password = form.generate_temp_password()
-            
             try:
-                # Valider le mot de passe
-                validate_password(temp_password, user=User(email=email))
-                
-                # Créer l'utilisateur
-                user = User.objects.create_user(
-                    email=email,
-                    password=temp_password,
-                    is_active=True,
-                    must_change_password=True,
-                    created_by=request.user
-                )
-                
-                # ENVOI ASYNCHRONE DE L'EMAIL
-                email_thread = threading.Thread(
-                    target=_send_welcome_email,
-                    args=(email, temp_password)
-                )
-                email_thread.start()
+                # Créer l'utilisateur ; le mot de passe temporaire est généré
+                # par la tâche d'envoi (accounts/tasks.py)
+                with transaction.atomic():
+                    user = User.objects.create_user(
+                        email=email,
+                        password=None,
+                        is_active=True,
+                        must_change_password=True,
+                        created_by=request.user
+                    )
+                    enqueue_welcome_email(user)
                 
-                messages.success(request, f"Utilisateur créé et identifiants envoyés à {email}")
+                messages.success(request, f"Utilisateur créé, identifiants en cours d'envoi à {email}")
                 return redirect('admin_users')
                 
-            except ValidationError as e:
-                messages.error(request, f"Erreur création : {' '.join(e.messages)}")
             except Exception as e:
                 logger.error(f"Erreur création utilisateur {email}: {e}")
                 messages.error(request, "Erreur serveur. Contactez l'administrateur.")
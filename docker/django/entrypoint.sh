@@ -12,5 +12,10 @@ python manage.py collectstatic --noinput
 # Appliquer les migrations
 python manage.py migrate
 
-# Lancer le serveur
-exec gunicorn --bind 0.0.0.0:8000 secure_doc.wsgi:application
\ No newline at end of file
+# Lancer le serveur : WSGI (gunicorn, défaut) ou ASGI (uvicorn, vues /api/async/)
+if [ "$SERVER_MODE" = "asgi" ]; then
+    export WEB_CONCURRENCY="${WEB_CONCURRENCY:-4}"
+    exec uvicorn secure_doc.asgi:application --host 0.0.0.0 --port 8000 \
+        --workers "$WEB_CONCURRENCY"
+fi
+exec gunicorn -c /app/docker/django/gunicorn.conf.py secure_doc.wsgi:application
\ No newline at end of file
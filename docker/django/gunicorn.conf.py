@@ -0,0 +1,25 @@
+# docker/django/gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = '0.0.0.0:8000'
+
+# Les tailles de pool DB (DB_POOL_MAX_SIZE) sont calculées à partir des mêmes
+# variables : connexions max = workers * (threads + 1)
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+# Transmis aux workers : settings.WEB_CONCURRENCY (caches par processus)
+os.environ['WEB_CONCURRENCY'] = str(workers)
+threads = int(os.getenv('GUNICORN_THREADS', 1))
+
+# Garder les connexions HTTP clientes (nginx) ouvertes entre deux requêtes
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+
+
+def on_starting(server):
+    # Repartir d'un répertoire de métriques vide (METRICS_DIR) à chaque démarrage
+    directory = os.getenv('METRICS_DIR')
+    if directory and os.path.isdir(directory):
+        for name in os.listdir(directory):
+            if name.startswith(('metrics-', '.metrics-')):
+                os.remove(os.path.join(directory, name))
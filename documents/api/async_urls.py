@@ -0,0 +1,14 @@
+# documents/api/async_urls.py
+from django.urls import path
+from . import async_views
+
+urlpatterns = [
+    path('list/', async_views.list_documents, name='async_list_documents'),
+    path('search/', async_views.search_documents, name='async_search_documents'),
+    path('download/<uuid:document_id>/', async_views.download_document, name='async_download_document'),
+    path('download/<uuid:document_id>/content/', async_views.download_document_content, name='async_download_document_content'),
+    path('upload/prepare/', async_views.prepare_upload, name='async_prepare_upload'),
+    path('upload/confirm/', async_views.confirm_upload, name='async_confirm_upload'),
+    path('events/', async_views.document_events, name='async_document_events'),
+    path('events/ticket/', async_views.create_event_ticket, name='async_document_event_ticket'),
+]
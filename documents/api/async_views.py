@@ -0,0 +1,379 @@
+# documents/api/async_views.py
+"""
+Versions async (ASGI) des endpoints documents.
+
+Servies par uvicorn / gunicorn -k uvicorn.workers.UvicornWorker : pendant
+qu'une requête attend MinIO (head_object, signature), le worker continue
+à servir les autres. L'ORM est utilisé en async ; les appels boto3,
+bloquants, sont déportés sur l'exécuteur de documents.storage.
+"""
+import functools
+import json
+import uuid
+
+from asgiref.sync import sync_to_async
+from botocore.exceptions import ClientError
+from django.db import transaction
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework.exceptions import APIException
+
+from accounts.authentication import aauthenticate
+from accounts.models import User
+from accounts.permissions import DOCUMENT_PERMISSIONS
+from documents import blobs, download_proxy, events, queries, search, services, storage, tasks, url_cache
+from documents.api import payloads
+from documents.models import Category, Document, DocumentAccess
+from documents.pagination import (
+    InvalidCursor, created_at_cursor_filter, encode_cursor, parse_page_size,
+)
+
+
+def async_api_view(methods, permission_classes=DOCUMENT_PERMISSIONS):
+    """
+    Équivalent minimal de @api_view pour une vue async : méthode HTTP,
+    authentification JWT obligatoire, permissions (décidées sur les claims
+    du token) et erreurs au format JSON.
+    """
+    def decorator(view):
+        @csrf_exempt
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if request.method not in methods:
+                return JsonResponse({'detail': f'Méthode "{request.method}" non autorisée.'}, status=405)
+            try:
+                auth = await aauthenticate(request)
+            except APIException as e:
+                detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+                return JsonResponse(detail, status=e.status_code)
+            if auth is None:
+                return JsonResponse(
+                    {'detail': "Informations d'authentification non fournies."}, status=401
+                )
+            request.user, request.auth = auth
+            for permission_class in permission_classes:
+                permission = permission_class()
+                if not permission.has_permission(request, view):
+                    detail = getattr(permission, 'message', None) or "Vous n'avez pas la permission d'effectuer cette action."
+                    return JsonResponse({'detail': detail}, status=403)
+            return await view(request, *args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def _json_body(request):
+    try:
+        data = json.loads(request.body or b'{}')
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _storage_not_configured():
+    return JsonResponse({'error': 'Stockage objet non configuré'}, status=500)
+
+
+@async_api_view(['GET'])
+async def list_documents(request):
+    """
+    Version async de list_documents (mêmes paramètres et même réponse).
+    """
+    group_by = request.GET.get('group_by', 'category')
+    if group_by not in ('category', 'none'):
+        return JsonResponse({'error': 'group_by invalide'}, status=400)
+
+    rows = queries.accessible_document_rows(request.user)
+    cursor = request.GET.get('cursor')
+    paginated = cursor is not None or 'limit' in request.GET
+
+    if paginated:
+        try:
+            limit = parse_page_size(request.GET.get('limit'))
+            if cursor:
+                rows = rows.filter(created_at_cursor_filter(
+                    cursor, 'document__created_at', 'document_id'
+                ))
+        except (InvalidCursor, ValueError):
+            return JsonResponse({'error': 'Pagination invalide'}, status=400)
+        rows = [row async for row in rows[:limit + 1]]
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        rows = [row async for row in rows]
+
+    items = [(row['category_name'], payloads.serialize_document_row(row)) for row in rows]
+    if group_by == 'category':
+        results = payloads.group_by_category(items)
+    else:
+        results = [item for _, item in items]
+
+    if not paginated:
+        return JsonResponse(results, safe=False)
+
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last['created_at'].isoformat(), last['doc_id'])
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
+
+
+@async_api_view(['GET'])
+async def search_documents(request):
+    """
+    Version async de search_documents (mêmes paramètres et même réponse).
+    """
+    try:
+        filters = search.parse_filters(request.GET)
+        limit = parse_page_size(request.GET.get('limit'))
+        ranked = bool(filters['terms'])
+        rows = search.search_document_rows(request.user, **filters)
+        if request.GET.get('cursor'):
+            rows = rows.filter(search.cursor_filter(request.GET['cursor'], ranked))
+    except (search.InvalidSearch, InvalidCursor, ValueError):
+        return JsonResponse({'error': 'Paramètres de recherche invalides'}, status=400)
+
+    rows = [row async for row in rows[:limit + 1]]
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({
+        'results': [payloads.serialize_search_row(row) for row in rows],
+        'next_cursor': search.next_cursor(rows[-1], ranked) if has_more else None,
+    })
+
+
+@async_api_view(['GET'])
+async def download_document(request, document_id):
+    """
+    Version async de download_document.
+    """
+    row = await queries.download_rows(request.user, [document_id]).afirst()
+    if row is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    if not storage.is_configured():
+        return _storage_not_configured()
+
+    try:
+        download_url = await storage.run_async(
+            url_cache.get_download_url, request.user.id, row['doc_id'], row['storage_path']
+        )
+    except ClientError as e:
+        return JsonResponse({'error': f'Erreur stockage: {str(e)}'}, status=500)
+
+    return JsonResponse(payloads.download_payload(row, download_url))
+
+
+@async_api_view(['GET'])
+async def download_document_content(request, document_id):
+    """
+    Version async du téléchargement relayé : chaque lecture vers S3 passe
+    par l'exécuteur de documents.storage, la boucle reste libre.
+    """
+    if not download_proxy.conf('ENABLED'):
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    row = await queries.download_rows(request.user, [document_id]).afirst()
+    if row is None:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+    if not storage.is_configured():
+        return _storage_not_configured()
+
+    try:
+        if download_proxy.conf('MODE') == download_proxy.ACCEL:
+            return await storage.run_async(download_proxy.accel_response, request.user.id, row)
+        result = await storage.run_async(download_proxy.fetch, row['storage_path'], request.headers)
+    except ClientError as e:
+        return JsonResponse({'error': f'Erreur stockage: {str(e)}'}, status=500)
+    stream = download_proxy.aiter_body(result.body) if result.body is not None else ()
+    return download_proxy.build_response(result, row['filename'], stream)
+
+
+@async_api_view(['POST'])
+async def prepare_upload(request):
+    """
+    Version async de prepare_upload.
+    """
+    if not storage.is_configured():
+        return _storage_not_configured()
+
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    if not data.get('filename'):
+        return JsonResponse({'error': 'Le champ "filename" est requis'}, status=400)
+
+    filename = payloads.clean_filename(data['filename'])
+    if filename is None:
+        return JsonResponse({'error': 'Nom de fichier invalide'}, status=400)
+
+    file_hash = data.get('file_hash')
+    present = await sync_to_async(blobs.existing_upload)(request.user, file_hash)
+    if present:
+        return JsonResponse(present)
+
+    unique_name = f"{uuid.uuid4().hex}_{filename}"
+    try:
+        upload_url = await storage.apresigned_upload_url(unique_name)
+    except ClientError as e:
+        return JsonResponse({'error': f'Erreur génération URL: {str(e)}'}, status=500)
+
+    return JsonResponse({'upload_url': upload_url, 'storage_path': unique_name})
+
+
+def _create_document(owner, data, category, recipients, verify_later, multipart=None):
+    """
+    None si l'upload multipart a déjà été confirmé (requête concurrente).
+    """
+    with transaction.atomic():
+        doc = Document(
+            filename=data['filename'],
+            storage_path=data['storage_path'],
+            file_hash=data['file_hash'],
+            signature=data['signature'],
+            mime_type=data.get('mime_type', ''),
+            uploaded_by=owner,
+            category=category
+        )
+        if multipart is not None and not services.consume_multipart(multipart, doc):
+            return None
+        blobs.attach(owner, [doc])
+        doc.save()
+        keys = dict(recipients)
+        # Ajouter l'uploader
+        keys[owner.id] = services.owner_key(data)
+        DocumentAccess.objects.bulk_create([
+            DocumentAccess(document=doc, user_id=user_id, encrypted_aes_key=key)
+            for user_id, key in keys.items()
+        ])
+        services.record_changes((user_id, doc.id) for user_id in keys)
+        if verify_later:
+            tasks.enqueue_verify_uploads([doc])
+    return doc
+
+
+@async_api_view(['POST'])
+async def confirm_upload(request):
+    """
+    Version async de confirm_upload : le head_object vers MinIO (s'il n'est
+    pas délégué au worker de tâches) ne bloque pas le worker.
+    """
+    data = _json_body(request)
+    if data is None:
+        return JsonResponse({'error': 'JSON invalide'}, status=400)
+    multipart = None
+    if data.get('upload_id'):
+        # Upload multipart terminé : l'objet existe (CompleteMultipartUpload a réussi)
+        multipart = await services.completed_multipart(request.user, data['upload_id']).afirst()
+        if multipart is None:
+            return JsonResponse({'error': services.MULTIPART_NOT_COMPLETED}, status=400)
+        data = {
+            **data,
+            'storage_path': multipart.storage_path,
+            'filename': data.get('filename') or multipart.filename,
+        }
+    storage_path = data.get('storage_path')
+    if services.missing_fields(data, ('storage_path',)):
+        return JsonResponse({'error': 'storage_path requis'}, status=400)
+    if await services.foreign_documents(request.user, [storage_path]).aexists():
+        return JsonResponse({'error': services.STORAGE_PATH_TAKEN}, status=400)
+    missing = services.missing_fields(data, ('filename', 'file_hash', 'signature'))
+    if missing:
+        return JsonResponse({'error': f'Champs requis : {", ".join(missing)}'}, status=400)
+    if services.owner_key(data) is None:
+        return JsonResponse({'error': services.OWNER_KEY_INVALID}, status=400)
+    if not storage.is_configured():
+        return _storage_not_configured()
+
+    # Objet dédupliqué déjà référencé : il existe, rien à vérifier
+    verify = multipart is None and not await blobs.stored(
+        request.user, data['file_hash'], storage_path
+    ).aexists()
+    deferred = verify and tasks.deferred_verification()
+    if verify and not deferred:
+        try:
+            exists = await storage.aobject_exists(storage_path)
+        except ClientError:
+            exists = False
+        if not exists:
+            return JsonResponse({'error': 'Fichier non trouvé dans le stockage'}, status=400)
+
+    category = None
+    if data.get('category_id'):
+        try:
+            category = await Category.objects.aget(id=uuid.UUID(str(data['category_id'])))
+        except (ValueError, Category.DoesNotExist):
+            return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    shared_with = data.get('shared_with', [])
+    if not isinstance(shared_with, list):
+        return JsonResponse({'error': 'shared_with doit être une liste'}, status=400)
+    recipients = services.parse_recipients(shared_with)
+    if recipients is None:
+        return JsonResponse({'error': 'Destinataire invalide'}, status=400)
+    wanted = {user_id for user_id, _ in recipients}
+    known = {
+        user_id async for user_id in
+        User.objects.filter(id__in=wanted).values_list('id', flat=True)
+    } if wanted else set()
+    if wanted - known:
+        return JsonResponse({'detail': 'Not found.'}, status=404)
+
+    doc = await sync_to_async(_create_document)(
+        request.user, data, category, recipients, deferred, multipart
+    )
+    if doc is None:
+        return JsonResponse({'error': services.MULTIPART_NOT_COMPLETED}, status=400)
+    return JsonResponse({'id': str(doc.id), 'message': 'Document confirmé'}, status=201)
+
+
+async def _event_stream(user_id):
+    connected = False
+    async for event in events.subscribe(user_id):
+        if event is None:
+            # Premier message : abonnement en place, délai de reconnexion du client
+            yield ': keepalive\n\n' if connected else 'retry: 5000\n\n'
+            connected = True
+        else:
+            yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+
+
+def _event_response(user):
+    response = StreamingHttpResponse(
+        _event_stream(user.id), content_type='text/event-stream'
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx : ne pas bufferiser le flux
+    return response
+
+
+@async_api_view(['GET'])
+async def _document_events(request):
+    return _event_response(request.user)
+
+
+@csrf_exempt
+async def document_events(request):
+    """
+    Flux Server-Sent Events des partages, retraits et suppressions visant
+    l'utilisateur connecté (document.shared / document.unshared / document.deleted).
+
+    EventSource ne permet pas d'en-têtes : à défaut d'en-tête Authorization,
+    le client passe en ?ticket=... un ticket obtenu par POST events/ticket/
+    (court, usage unique ; jamais le JWT dans l'URL).
+    """
+    if 'ticket' not in request.GET:
+        return await _document_events(request)
+    if request.method != 'GET':
+        return JsonResponse({'detail': f'Méthode "{request.method}" non autorisée.'}, status=405)
+    user = await events.redeem_ticket(request.GET['ticket'])
+    if user is None:
+        return JsonResponse({'detail': 'Ticket invalide ou expiré.'}, status=401)
+    return _event_response(user)
+
+
+@async_api_view(['POST'])
+async def create_event_ticket(request):
+    """
+    Ticket d'ouverture du flux SSE : {"ticket", "expires_in"}.
+    """
+    ticket = await events.issue_ticket(request.user)
+    return JsonResponse({'ticket': ticket, 'expires_in': events.conf('TICKET_TTL')}, status=201)
@@ -0,0 +1,68 @@
+# documents/api/payloads.py
+"""
+Mise en forme des réponses JSON, partagée par les vues sync (views.py)
+et async (async_views.py).
+"""
+import os
+from collections import defaultdict
+
+
+def serialize_document_row(row):
+    return {
+        'id': str(row['doc_id']),
+        'filename': row['filename'],
+        'mime_type': row['mime_type'],
+        'uploaded_by': {
+            'email': row['uploader_email'],
+            'public_key': row['uploader_public_key']
+        },
+        'uploaded_at': row['created_at'].isoformat(),
+        'file_hash': row['file_hash'],
+        'signature': row['signature'],
+        'storage_path': row['storage_path'],
+        'encrypted_aes_key': row['encrypted_aes_key'],
+    }
+
+
+def serialize_search_row(row):
+    item = serialize_document_row(row)
+    item['category'] = row['category_name']
+    if 'rank' in row:
+        item['rank'] = row['rank']
+    return item
+
+
+def group_by_category(items_with_category):
+    grouped = defaultdict(list)
+    for cat_name, item in items_with_category:
+        grouped[cat_name or "Sans catégorie"].append(item)
+    return dict(grouped)
+
+
+def download_payload(row, download_url):
+    return {
+        'document_id': str(row['doc_id']),
+        'filename': row['filename'],
+        'mime_type': row['mime_type'],
+        'download_url': download_url,          # URL temporaire vers le fichier chiffré
+        'file_hash': row['file_hash'],         # SHA-256 du contenu original (non chiffré)
+        'signature': row['signature'],         # Signature du hash (base64)
+        'encrypted_aes_key': row['encrypted_aes_key'],  # À déchiffrer avec la clé privée de l'utilisateur
+        'uploaded_by': {
+            'email': row['uploader_email'],
+            'public_key': row['uploader_public_key']
+        },
+        'uploaded_at': row['created_at']
+    }
+
+
+def clean_filename(filename):
+    """
+    Nettoie un nom de fichier client ; None s'il est invalide.
+    """
+    if not isinstance(filename, str):
+        return None
+    filename = os.path.basename(filename)
+    if not filename or filename.startswith('.') or '/' in filename or '\\' in filename:
+        return None
+    return filename
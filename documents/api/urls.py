@@ -5,16 +5,27 @@ from . import views
 urlpatterns = [
     # path('upload/', views.upload_document, name='upload_document'),
     path('list/', views.list_documents, name='list_documents'),
+    path('sync/', views.sync_documents, name='sync_documents'),
+    path('search/', views.search_documents, name='search_documents'),
     path('share/<uuid:document_id>/', views.share_document, name='share_document'),
+    path('unshare/<uuid:document_id>/', views.unshare_document, name='unshare_document'),
     path('categories/', views.list_categories, name='list-categories'),
     path('users/', views.list_users, name='list-users'),
     path('download/<uuid:document_id>/', views.download_document, name='download_document'),
+    path('download/<uuid:document_id>/content/', views.download_document_content, name='download_document_content'),
+    path('download/batch/', views.download_documents_batch, name='download_documents_batch'),
     path('delete/<uuid:document_id>/', views.delete_document, name='delete_document'),
 
 
     # Upload endpoints (MinIO)
     path('upload/prepare/', views.prepare_upload, name='prepare_upload'),
+    path('upload/prepare/batch/', views.prepare_upload_batch, name='prepare_upload_batch'),
     path('upload/confirm/', views.confirm_upload, name='confirm_upload'),
+    path('upload/confirm/batch/', views.confirm_upload_batch, name='confirm_upload_batch'),
+    path('upload/multipart/', views.initiate_multipart_upload, name='initiate_multipart_upload'),
+    path('upload/multipart/<uuid:upload_id>/parts/', views.multipart_upload_parts, name='multipart_upload_parts'),
+    path('upload/multipart/<uuid:upload_id>/complete/', views.complete_multipart_upload, name='complete_multipart_upload'),
+    path('upload/multipart/<uuid:upload_id>/', views.abort_multipart_upload, name='abort_multipart_upload'),
 
     path('categories_nw/create/', views.create_category, name='create_category'),
     
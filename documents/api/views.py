@@ -1,12 +1,25 @@
 # documents/api/views.py
+import json
 from urllib.parse import urlparse
 
 from rest_framework import status, permissions
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, permission_classes, renderer_classes
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from documents.models import Document, Category, DocumentAccess
+from django.utils import timezone
+from documents import blobs, download_proxy, queries, search, services
+from documents.api import payloads
+from documents.models import Document, Category, DocumentAccess, MultipartUpload
+from documents.pagination import (
+    InvalidCursor, ascending_cursor_filter, created_at_cursor_filter, decode_cursor, encode_cursor,
+    parse_page_size,
+)
 from accounts.models import User
+from accounts.permissions import DOCUMENT_PERMISSIONS
 
 @api_view(['GET'])
 # @permission_classes([permissions.IsAuthenticated])
@@ -83,53 +96,162 @@ def list_categories(request):
 
 
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def list_documents(request):
     """
     Retourne tous les documents accessibles par l'utilisateur,
     groupés par catégorie.
+
+    Paramètres optionnels :
+      - limit / cursor : pagination par curseur (created_at + id) ;
+        la réponse devient {"results": ..., "next_cursor": ...}
+      - group_by : "category" (défaut) ou "none" pour une liste plate
     """
-    # Récupérer tous les documents où l'utilisateur a accès
-    accessible_doc_ids = DocumentAccess.objects.filter(
-        user=request.user
-    ).values_list('document_id', flat=True)
-
-    documents = Document.objects.filter(
-        id__in=accessible_doc_ids
-    ).select_related('category', 'uploaded_by')
-
-    # Grouper par catégorie
-    from collections import defaultdict
-    grouped = defaultdict(list)
-
-    for doc in documents:
-        access = DocumentAccess.objects.get(document=doc, user=request.user)
-        cat_name = doc.category.name if doc.category else "Sans catégorie"
-        grouped[cat_name].append({
-            'id': str(doc.id),
-            'filename': doc.filename,
-            'mime_type': doc.mime_type,
-
-            'uploaded_by': {
-                'email': doc.uploaded_by.email,
-                'public_key': doc.uploaded_by.public_key
-            },
-            # 'uploaded_by': doc.uploaded_by.email,
-            'uploaded_at': doc.created_at.isoformat(),
-            'file_hash': doc.file_hash,
-            'signature': doc.signature,
-            'storage_path': doc.storage_path,
-            'encrypted_aes_key': access.encrypted_aes_key,
+    group_by = request.query_params.get('group_by', 'category')
+    if group_by not in ('category', 'none'):
+        return Response({'error': 'group_by invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = queries.accessible_document_rows(request.user)
+    cursor = request.query_params.get('cursor')
+    paginated = cursor is not None or 'limit' in request.query_params
+
+    if paginated:
+        try:
+            limit = parse_page_size(request.query_params.get('limit'))
+            if cursor:
+                rows = rows.filter(created_at_cursor_filter(
+                    cursor, 'document__created_at', 'document_id'
+                ))
+        except (InvalidCursor, ValueError):
+            return Response({'error': 'Pagination invalide'}, status=status.HTTP_400_BAD_REQUEST)
+        rows = list(rows[:limit + 1])
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+    else:
+        rows = list(rows)
+
+    items = [(row['category_name'], payloads.serialize_document_row(row)) for row in rows]
+    if group_by == 'category':
+        results = payloads.group_by_category(items)
+    else:
+        results = [item for _, item in items]
+
+    if not paginated:
+        return Response(results)
 
+    next_cursor = None
+    if has_more:
+        last = rows[-1]
+        next_cursor = encode_cursor(last['created_at'].isoformat(), last['doc_id'])
+    return Response({'results': results, 'next_cursor': next_cursor})
+
+
+
+#----------------------------------------------Search Documents-----------------------------------------
+@api_view(['GET'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def search_documents(request):
+    """
+    Recherche parmi les documents accessibles, en une requête (cf. documents/search.py).
+
+    Paramètres (tous facultatifs) :
+      - q : termes recherchés par préfixe dans le nom de fichier et le type MIME ;
+        résultats triés par pertinence ("rank"), sinon du plus récent au plus ancien
+      - category (uuid), uploader (email), mime_type (préfixe, ex. "image/")
+      - created_after (inclus) / created_before (exclu) : date ou date-heure ISO 8601
+      - limit / cursor : pagination par curseur
+    Réponse : {"results": [...], "next_cursor": ...}
+    """
+    params = request.query_params
+    try:
+        filters = search.parse_filters(params)
+        limit = parse_page_size(params.get('limit'))
+        ranked = bool(filters['terms'])
+        rows = search.search_document_rows(request.user, **filters)
+        if params.get('cursor'):
+            rows = rows.filter(search.cursor_filter(params['cursor'], ranked))
+    except (search.InvalidSearch, InvalidCursor, ValueError):
+        return Response({'error': 'Paramètres de recherche invalides'}, status=status.HTTP_400_BAD_REQUEST)
+
+    rows = list(rows[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return Response({
+        'results': [payloads.serialize_search_row(row) for row in rows],
+        'next_cursor': search.next_cursor(rows[-1], ranked) if has_more else None,
+    })
+
+
+
+#----------------------------------------------Sync Documents-----------------------------------------
+def _sync_item(row):
+    item = payloads.serialize_document_row(row)
+    item['category'] = row['category_name']
+    return item
+
+
+@api_view(['GET'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def sync_documents(request):
+    """
+    Synchronisation incrémentale.
+
+    Sans sync_token : tous les documents accessibles ("full": true) et un
+    sync_token. Avec sync_token : uniquement les documents ajoutés ou partagés
+    depuis ("documents") et les identifiants supprimés ou retirés ("deleted").
+    Rappeler avec le nouveau sync_token tant que "has_more" est vrai.
+
+    Le sync_token est une position (txid, id) dans l'ordre de validation :
+    un changement d'une transaction encore en cours n'est servi qu'une fois
+    celle-ci validée, jamais sauté (cf. queries.sync_watermark).
+    """
+    token = request.query_params.get('sync_token')
+    # Avant toute lecture : l'état servi couvre au moins ce qui précède la position
+    watermark = queries.sync_watermark()
+
+    if not token:
+        position = queries.latest_change_position(request.user, watermark)
+        rows = queries.accessible_document_rows(request.user)
+        return Response({
+            'full': True,
+            'documents': [_sync_item(row) for row in rows],
+            'deleted': [],
+            'sync_token': encode_cursor(*position),
+            'has_more': False,
         })
 
-    return Response(dict(grouped))
+    try:
+        position = tuple(int(value) for value in decode_cursor(token, 2))
+        limit = parse_page_size(request.query_params.get('limit'), default=500, maximum=1000)
+    except (InvalidCursor, ValueError):
+        return Response({'error': 'sync_token invalide'}, status=status.HTTP_400_BAD_REQUEST)
+
+    changes = list(queries.document_changes(request.user, position, watermark)[:limit + 1])
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+    if changes:
+        position = changes[-1][:2]
+    changed_ids = list(dict.fromkeys(document_id for _, _, document_id in changes))
+
+    # L'état actuel fait foi : un document changé puis retiré devient un tombstone
+    rows = list(
+        queries.accessible_document_rows(request.user).filter(document_id__in=changed_ids)
+    ) if changed_ids else []
+    present = {row['doc_id'] for row in rows}
+
+    return Response({
+        'full': False,
+        'documents': [_sync_item(row) for row in rows],
+        'deleted': [str(doc_id) for doc_id in changed_ids if doc_id not in present],
+        'sync_token': encode_cursor(*position),
+        'has_more': has_more,
+    })
 
 
 
 #----------------------------------------------Share Document-----------------------------------------
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def share_document(request, document_id):
     """
     Payload :
@@ -138,79 +260,155 @@ def share_document(request, document_id):
         {"user_id": "uuid", "encrypted_aes_key": "base64"}
       ]
     }
+
+    Chaque destinataire reçoit un statut : added, already_shared,
+    unknown_user ou invalid.
     """
     doc = get_object_or_404(Document, id=document_id)
 
     # Seul le propriétaire peut partager
-    if doc.uploaded_by != request.user:
+    if doc.uploaded_by_id != request.user.id:
         return Response(
             {'error': 'Seul le propriétaire peut partager ce document'},
             status=status.HTTP_403_FORBIDDEN
         )
 
     shared_with = request.data.get('shared_with', [])
-    access_list = []
-    for item in shared_with:
-        user = get_object_or_404(User, id=item['user_id'])
-        # Éviter les doublons
-        if not DocumentAccess.objects.filter(document=doc, user=user).exists():
-            access = DocumentAccess(
-                document=doc,
-                user=user,
-                encrypted_aes_key=item['encrypted_aes_key']
-            )
-            access_list.append(access)
-
-    if access_list:
-        DocumentAccess.objects.bulk_create(access_list)
+    if not isinstance(shared_with, list):
+        return Response({'error': 'shared_with doit être une liste'}, status=status.HTTP_400_BAD_REQUEST)
+
+    # Résolution et insertion en lots (nombre de requêtes constant)
+    results = services.grant_access(doc, shared_with)
+    added = sum(1 for r in results if r['status'] == services.ADDED)
+
+    return Response({
+        'message': f'{added} utilisateurs ajoutés',
+        'added': added,
+        'results': results,
+    })
+
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def unshare_document(request, document_id):
+    """
+    Payload : {"user_ids": ["id1", "id2"]}
+
+    Retire l'accès des utilisateurs indiqués (le propriétaire garde le sien).
+    Les destinataires sont notifiés (événement document.unshared).
+    """
+    doc = get_object_or_404(Document, id=document_id)
+
+    if doc.uploaded_by_id != request.user.id:
+        return Response(
+            {'error': 'Seul le propriétaire peut retirer un partage'},
+            status=status.HTTP_403_FORBIDDEN
+        )
+
+    user_ids = request.data.get('user_ids', [])
+    if not isinstance(user_ids, list):
+        return Response({'error': 'user_ids doit être une liste'}, status=status.HTTP_400_BAD_REQUEST)
+    parsed = {services.parse_user_id(user_id) for user_id in user_ids} - {None, doc.uploaded_by_id}
+
+    removed = 0
+    if parsed:
+        with transaction.atomic():
+            removed, _ = DocumentAccess.objects.filter(document=doc, user_id__in=parsed).delete()
+
+    return Response({'message': f'{removed} partages retirés', 'removed': removed})
+
+
+USER_STREAM_CHUNK_SIZE = 2000
+
+
+def _stream_users(users, fields):
+    """
+    Lignes NDJSON lues par lots keyset sur l'email : mémoire bornée à un lot,
+    sans curseur serveur ni transaction ouverte pendant l'envoi (PgBouncer).
+    """
+    last_email = None
+    while True:
+        batch = users if last_email is None else users.filter(email__gt=last_email)
+        rows = list(batch.values_list('email', *fields)[:USER_STREAM_CHUNK_SIZE])
+        for row in rows:
+            yield json.dumps(dict(zip(fields, row[1:])), cls=DjangoJSONEncoder) + '\n'
+        if len(rows) < USER_STREAM_CHUNK_SIZE:
+            return
+        last_email = rows[-1][0]
 
-    return Response({'message': f'{len(access_list)} utilisateurs ajoutés'})
 
 @api_view(['GET'])
 @permission_classes([permissions.IsAuthenticated])
 def list_users(request):
-    users = User.objects.exclude(id=request.user.id).values('id', 'email', 'public_key')
-    return Response(users)
+    """
+    Annuaire des autres utilisateurs.
+
+    Sans paramètre : liste complète (id, email, public_key), comme avant.
+    Paramètres optionnels :
+      - q : recherche par début d'email (insensible à la casse)
+      - fields : champs à renvoyer parmi id, email, public_key, key_version
+        (ex. "id,email" pour ne pas transférer les clés publiques)
+      - limit / cursor : pagination par curseur (email) ;
+        la réponse devient {"results": ..., "next_cursor": ...}
+      - stream=ndjson : flux d'un utilisateur JSON par ligne, sans pagination
+    """
+    params = request.query_params
+    fields = params.get('fields')
+    if fields:
+        fields = list(dict.fromkeys(f.strip() for f in fields.split(',') if f.strip()))
+        if not fields or any(f not in queries.USER_DIRECTORY_FIELDS for f in fields):
+            return Response({'error': 'fields invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        fields = ['id', 'email', 'public_key']
+
+    users = queries.directory_users(request.user, params.get('q'))
+
+    if params.get('stream') == 'ndjson':
+        return StreamingHttpResponse(
+            _stream_users(users, fields), content_type='application/x-ndjson'
+        )
+
+    cursor = params.get('cursor')
+    if cursor is None and 'limit' not in params:
+        return Response(users.values(*fields))
+
+    try:
+        limit = parse_page_size(params.get('limit'))
+        if cursor:
+            users = users.filter(ascending_cursor_filter(cursor, 'email'))
+    except (InvalidCursor, ValueError):
+        return Response({'error': 'Pagination invalide'}, status=status.HTTP_400_BAD_REQUEST)
+    rows = list(users.values_list('email', *fields)[:limit + 1])
+    next_cursor = encode_cursor(rows[limit - 1][0]) if len(rows) > limit else None
+    return Response({
+        'results': [dict(zip(fields, row[1:])) for row in rows[:limit]],
+        'next_cursor': next_cursor,
+    })
 
 
 
 #--------------------------------------------Download Document----------------------------------------
 @api_view(['GET'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def download_document(request, document_id):
     """
     Retourne les métadonnées + une URL pré-signée pour télécharger
     un document chiffré auquel l'utilisateur a accès.
     """
     # 1. Vérifier que le document existe et que l'utilisateur y a accès
-    doc = get_object_or_404(Document, id=document_id)
-    access = get_object_or_404(DocumentAccess, document=doc, user=request.user)
+    row = queries.download_rows(request.user, [document_id]).first()
+    if row is None:
+        raise Http404
 
     # 2. Générer une URL pré-signée pour le téléchargement (valide 1h)
-    if not hasattr(settings, 'AWS_S3_ENDPOINT_URL'):
+    if not storage.is_configured():
         return Response(
             {'error': 'Stockage objet non configuré'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    s3_client = boto3.client(
-        's3',
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
-        use_ssl=getattr(settings, 'AWS_S3_USE_SSL', True),
-        verify=getattr(settings, 'AWS_S3_VERIFY', True),
-    )
-
     try:
-        download_url = s3_client.generate_presigned_url(
-            'get_object',
-            Params={
-                'Bucket': settings.AWS_STORAGE_BUCKET_NAME,
-                'Key': doc.storage_path
-            },
-            ExpiresIn=3600  # 1 heure
+        download_url = url_cache.get_download_url(
+            request.user.id, row['doc_id'], row['storage_path']
         )
         # 🔁 Remplacer l’endpoint par l’IP publique
         # parsed = urlparse(download_url)
@@ -224,30 +422,98 @@ def download_document(request, document_id):
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
 
-    # 3. Récupérer la clé publique de l'uploader
-    uploader_public_key = doc.uploaded_by.public_key
+    # 3. Répondre avec toutes les métadonnées nécessaires
+    return Response(payloads.download_payload(row, download_url))
 
-    # 4. Répondre avec toutes les métadonnées nécessaires
-    return Response({
-        'document_id': str(doc.id),
-        'filename': doc.filename,
-        'mime_type': doc.mime_type,
-        'download_url': download_url,          # URL temporaire vers le fichier chiffré
-        'file_hash': doc.file_hash,            # SHA-256 du contenu original (non chiffré)
-        'signature': doc.signature,            # Signature du hash (base64)
-        'encrypted_aes_key': access.encrypted_aes_key,  # À déchiffrer avec la clé privée de l'utilisateur
-        'uploaded_by': {
-            'email': doc.uploaded_by.email,
-            'public_key': uploader_public_key
-        },
-        'uploaded_at': doc.created_at
-    })
+
+@api_view(['GET'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+@renderer_classes([JSONRenderer, download_proxy.OctetStreamRenderer])
+def download_document_content(request, document_id):
+    """
+    Contenu chiffré relayé par le serveur (DOCUMENTS_DOWNLOAD_PROXY), pour
+    les clients qui n'atteignent pas le stockage objet. Range et
+    If-None-Match permettent la reprise et le cache côté client.
+    En mode "accel", nginx sert les octets (X-Accel-Redirect).
+    """
+    if not download_proxy.conf('ENABLED'):
+        raise Http404
+    row = queries.download_rows(request.user, [document_id]).first()
+    if row is None:
+        raise Http404
+    if not storage.is_configured():
+        return Response(
+            {'error': 'Stockage objet non configuré'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    try:
+        if download_proxy.conf('MODE') == download_proxy.ACCEL:
+            return download_proxy.accel_response(request.user.id, row)
+        result = download_proxy.fetch(row['storage_path'], request.headers)
+    except ClientError as e:
+        return Response(
+            {'error': f'Erreur stockage: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+    stream = download_proxy.iter_body(result.body) if result.body is not None else ()
+    return download_proxy.build_response(result, row['filename'], stream)
+
+
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def download_documents_batch(request):
+    """
+    Variante par lot de download_document (ouverture d'un dossier).
+    Payload : {"document_ids": ["uuid", ...]}
+    Les documents inexistants ou non partagés sont listés dans "not_found".
+    """
+    document_ids = request.data.get('document_ids')
+    if not isinstance(document_ids, list) or not document_ids:
+        return Response({'error': 'document_ids doit être une liste non vide'}, status=400)
+
+    max_items = getattr(settings, 'DOCUMENTS_BATCH_MAX_ITEMS', 500)
+    if len(document_ids) > max_items:
+        return Response({'error': f'Maximum {max_items} documents par lot'}, status=400)
+
+    if not storage.is_configured():
+        return Response(
+            {'error': 'Stockage objet non configuré'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    valid_ids = set()
+    for value in document_ids:
+        try:
+            valid_ids.add(uuid.UUID(str(value)))
+        except ValueError:
+            pass
+
+    # Contrôle d'accès pour tout le lot en une requête
+    rows = list(queries.download_rows(request.user, valid_ids)) if valid_ids else []
+
+    try:
+        documents = [
+            payloads.download_payload(row, url_cache.get_download_url(
+                request.user.id, row['doc_id'], row['storage_path']
+            ))
+            for row in rows
+        ]
+    except ClientError as e:
+        return Response(
+            {'error': f'Erreur stockage: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    found = {str(row['doc_id']) for row in rows}
+    not_found = [str(value) for value in document_ids if str(value) not in found]
+    return Response({'documents': documents, 'not_found': not_found})
 
 
 
 #--------------------------------------------Delete Document----------------------------------------
 @api_view(['DELETE'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def delete_document(request, document_id):
     doc = get_object_or_404(Document, id=document_id)
     
@@ -263,11 +529,10 @@ def delete_document(request, document_id):
 
 
 #----------------------------------------Prepare Upload Document--------------------------------------
-import boto3
 from botocore.exceptions import ClientError
 from django.conf import settings
+from documents import storage, tasks, url_cache
 import uuid
-import os
 from drf_spectacular.utils import extend_schema, OpenApiResponse
 
 @extend_schema(
@@ -278,7 +543,8 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
         "application/json": {
             "type": "object",
             "properties": {
-                "filename": {"type": "string", "example": "rapport.pdf"}
+                "filename": {"type": "string", "example": "rapport.pdf"},
+                "file_hash": {"type": "string", "description": "SHA-256 du clair (déduplication, facultatif)"}
             },
             "required": ["filename"]
         }
@@ -294,14 +560,15 @@ from drf_spectacular.utils import extend_schema, OpenApiResponse
     }
 )
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def prepare_upload(request):
     """
     Génère une URL pré-signée pour l'upload direct d'un fichier chiffré vers MinIO.
     
     Payload attendu :
     {
-        "filename": "mon_document.pdf"
+        "filename": "mon_document.pdf",
+        "file_hash": "..."          (facultatif, mode DOCUMENTS_DEDUP)
     }
     
     Réponse :
@@ -309,14 +576,13 @@ def prepare_upload(request):
         "upload_url": "https://minio/...?X-Amz-Signature=...",
         "storage_path": "abc123_mon_document.pdf"
     }
+    Si le propriétaire a déjà stocké ce contenu (DOCUMENTS_DEDUP) : pas
+    d'URL, {"already_present": true, "storage_path", "document_id",
+    "owner_encrypted_aes_key"} ; le client confirme avec ce storage_path
+    et la clé AES existante (rechiffrée pour les destinataires).
     """
     # 1. Vérifier que MinIO est configuré
-    if not all([
-        hasattr(settings, 'AWS_S3_ENDPOINT_URL'),
-        hasattr(settings, 'AWS_STORAGE_BUCKET_NAME'),
-        hasattr(settings, 'AWS_ACCESS_KEY_ID'),
-        hasattr(settings, 'AWS_SECRET_ACCESS_KEY')
-    ]):
+    if not storage.is_configured():
         return Response(
             {'error': 'Stockage objet non configuré'},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -331,41 +597,25 @@ def prepare_upload(request):
         )
 
     # Nettoyer le nom de fichier (sécurité)
-    filename = os.path.basename(filename)
-    if not filename or filename.startswith('.') or '/' in filename or '\\' in filename:
+    filename = payloads.clean_filename(filename)
+    if filename is None:
         return Response(
             {'error': 'Nom de fichier invalide'},
             status=status.HTTP_400_BAD_REQUEST
         )
 
-    # 3. Générer un nom unique pour éviter les collisions
+    # 3. Contenu déjà stocké par l'utilisateur (déduplication) : rien à envoyer
+    file_hash = request.data.get('file_hash')
+    present = blobs.existing_upload(request.user, file_hash)
+    if present:
+        return Response(present)
+
+    # 4. Générer un nom unique pour éviter les collisions
     unique_name = f"{uuid.uuid4().hex}_{filename}"
-    bucket = settings.AWS_STORAGE_BUCKET_NAME
-
-    # 4. Créer le client MinIO
-    s3_client = boto3.client(
-        's3',
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME,
-        use_ssl=settings.AWS_S3_USE_SSL,
-        verify=settings.AWS_S3_VERIFY,
-    )
 
-    # 5. Générer l'URL pré-signée (valide 10 minutes)
+    # 5. Générer l'URL pré-signée (valide 10 minutes) avec le client partagé
     try:
-        upload_url = s3_client.generate_presigned_url(
-            'put_object',
-            Params={
-                'Bucket': bucket,
-                'Key': unique_name,
-                # Important : forcer le type de contenu si nécessaire
-                # 'ContentType': 'application/octet-stream'
-            },
-            ExpiresIn=600,  # 10 minutes
-            HttpMethod='PUT'
-        )
+        upload_url = storage.presigned_upload_url(unique_name)
         # 🔁 Remplacer l’endpoint par l’IP publique
         # parsed = urlparse(upload_url)
         # upload_url = upload_url.replace(
@@ -384,15 +634,281 @@ def prepare_upload(request):
     })
 
 
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def prepare_upload_batch(request):
+    """
+    Variante par lot de prepare_upload.
+    Payload : {"filenames": ["a.pdf", "b.pdf", ...], "file_hashes": ["...", ...]}
+    (file_hashes facultatif, dans le même ordre : déduplication)
+    Réponse : {"uploads": [{"filename", "upload_url", "storage_path"}
+                           | {"filename", "already_present", ...} | {"filename", "error"}]}
+    """
+    if not storage.is_configured():
+        return Response(
+            {'error': 'Stockage objet non configuré'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    filenames = request.data.get('filenames')
+    if not isinstance(filenames, list) or not filenames:
+        return Response({'error': 'filenames doit être une liste non vide'}, status=400)
+
+    max_items = getattr(settings, 'DOCUMENTS_BATCH_MAX_ITEMS', 500)
+    if len(filenames) > max_items:
+        return Response({'error': f'Maximum {max_items} fichiers par lot'}, status=400)
+
+    file_hashes = request.data.get('file_hashes') or [None] * len(filenames)
+    if not isinstance(file_hashes, list) or len(file_hashes) != len(filenames):
+        return Response({'error': 'file_hashes doit avoir la longueur de filenames'}, status=400)
+    present = blobs.existing_uploads(request.user, file_hashes)
+
+    uploads = []
+    try:
+        for original, file_hash in zip(filenames, file_hashes):
+            filename = payloads.clean_filename(original)
+            if filename is None:
+                uploads.append({'filename': original, 'error': 'Nom de fichier invalide'})
+                continue
+            if isinstance(file_hash, str) and file_hash in present:
+                uploads.append({'filename': filename, **present[file_hash]})
+                continue
+            unique_name = f"{uuid.uuid4().hex}_{filename}"
+            uploads.append({
+                'filename': filename,
+                'upload_url': storage.presigned_upload_url(unique_name),
+                'storage_path': unique_name
+            })
+    except ClientError as e:
+        return Response(
+            {'error': f'Erreur génération URL: {str(e)}'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    return Response({'uploads': uploads})
+
+
+#-----------------------------Upload multipart (gros fichiers)--------------
+# Codes S3 renvoyés tels quels au client (le reste est une erreur serveur)
+MULTIPART_CLIENT_ERRORS = {
+    'NoSuchUpload': status.HTTP_404_NOT_FOUND,
+    'InvalidPart': status.HTTP_400_BAD_REQUEST,
+    'InvalidPartOrder': status.HTTP_400_BAD_REQUEST,
+    'EntityTooSmall': status.HTTP_400_BAD_REQUEST,
+}
+
+
+def _multipart_storage_error(e):
+    code = e.response.get('Error', {}).get('Code', '')
+    return Response(
+        {'error': f'Erreur stockage: {code or str(e)}'},
+        status=MULTIPART_CLIENT_ERRORS.get(code, status.HTTP_500_INTERNAL_SERVER_ERROR)
+    )
+
+
+def _not_pending(upload):
+    if upload.status != MultipartUpload.PENDING:
+        return Response(
+            {'error': 'Upload déjà terminé ou abandonné', 'status': upload.status},
+            status=status.HTTP_409_CONFLICT
+        )
+    return None
+
+
+def _multipart_payload(upload):
+    payload = {
+        'upload_id': str(upload.id),
+        'storage_path': upload.storage_path,
+        'status': upload.status,
+    }
+    if upload.document_id:
+        payload['document_id'] = str(upload.document_id)
+    return payload
+
+
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def initiate_multipart_upload(request):
+    """
+    Démarre un upload multipart (fichiers volumineux, envoi parallèle et reprise).
+    Payload : {"filename": "archive.tar", "size": 5368709120, "file_hash": "..."}
+    (size et file_hash facultatifs)
+    Réponse : {"upload_id", "storage_path", "status", "part_size", "part_count"},
+    ou la réponse "already_present" de prepare_upload (DOCUMENTS_DEDUP).
+
+    Enchaînement : URL des parties par lots (/parts/ en POST), parties déjà
+    reçues (/parts/ en GET) pour reprendre, puis /complete/ et /upload/confirm/
+    avec "upload_id".
+    """
+    if not storage.is_configured():
+        return Response(
+            {'error': 'Stockage objet non configuré'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    filename = payloads.clean_filename(request.data.get('filename') or '')
+    if filename is None:
+        return Response({'error': 'Nom de fichier invalide'}, status=400)
+
+    size = request.data.get('size')
+    if size is not None and (isinstance(size, bool) or not isinstance(size, int) or size < 0):
+        return Response({'error': 'size doit être un entier positif'}, status=400)
+    part_size = services.multipart_part_size(size)
+
+    file_hash = request.data.get('file_hash')
+    present = blobs.existing_upload(request.user, file_hash)
+    if present:
+        return Response(present)
+
+    unique_name = f"{uuid.uuid4().hex}_{filename}"
+    try:
+        s3_upload_id = storage.create_multipart_upload(unique_name)
+    except ClientError as e:
+        return _multipart_storage_error(e)
+
+    upload = MultipartUpload.objects.create(
+        owner=request.user,
+        filename=filename,
+        storage_path=unique_name,
+        s3_upload_id=s3_upload_id,
+        part_size=part_size,
+    )
+    return Response({
+        **_multipart_payload(upload),
+        'part_size': part_size,
+        'part_count': -(-size // part_size) if size else None,
+    }, status=status.HTTP_201_CREATED)
+
+
+@api_view(['GET', 'POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def multipart_upload_parts(request, upload_id):
+    """
+    GET : parties déjà reçues, pour reprendre un transfert interrompu.
+      Réponse : {"parts": [{"part_number", "etag", "size"}]}
+    POST : URL pré-signées pour un lot de parties.
+      Payload : {"part_numbers": [1, 2, 3]}
+      Réponse : {"parts": [{"part_number", "url"}], "expires_in"}
+    """
+    upload = get_object_or_404(MultipartUpload, id=upload_id, owner=request.user)
+    error = _not_pending(upload)
+    if error:
+        return error
+
+    if request.method == 'GET':
+        try:
+            parts = storage.list_parts(upload.storage_path, upload.s3_upload_id)
+        except ClientError as e:
+            return _multipart_storage_error(e)
+        return Response({'parts': [
+            {'part_number': part['PartNumber'], 'etag': part['ETag'], 'size': part['Size']}
+            for part in parts
+        ]})
+
+    part_numbers = request.data.get('part_numbers')
+    max_items = getattr(settings, 'DOCUMENTS_MULTIPART_PRESIGN_BATCH', 100)
+    if (
+        not isinstance(part_numbers, list) or not part_numbers
+        or any(
+            isinstance(n, bool) or not isinstance(n, int) or not 1 <= n <= storage.MULTIPART_MAX_PARTS
+            for n in part_numbers
+        )
+    ):
+        return Response(
+            {'error': f'part_numbers doit être une liste d\'entiers entre 1 et {storage.MULTIPART_MAX_PARTS}'},
+            status=400
+        )
+    if len(part_numbers) > max_items:
+        return Response({'error': f'Maximum {max_items} parties par lot'}, status=400)
+
+    try:
+        parts = [
+            {
+                'part_number': n,
+                'url': storage.presigned_part_url(upload.storage_path, upload.s3_upload_id, n),
+            }
+            for n in dict.fromkeys(part_numbers)
+        ]
+    except ClientError as e:
+        return _multipart_storage_error(e)
+    return Response({'parts': parts, 'expires_in': storage.PART_URL_EXPIRES})
+
+
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def complete_multipart_upload(request, upload_id):
+    """
+    Assemble l'objet final.
+    Payload facultatif : {"parts": [{"part_number": 1, "etag": "..."}]} ; sans
+    liste, toutes les parties reçues par le stockage sont assemblées.
+    Réponse : {"upload_id", "storage_path", "status"}. Un nouvel appel sur un
+    upload déjà terminé renvoie la même réponse (reprise après coupure).
+    """
+    upload = get_object_or_404(MultipartUpload, id=upload_id, owner=request.user)
+    if upload.status in (MultipartUpload.COMPLETED, MultipartUpload.CONFIRMED):
+        return Response(_multipart_payload(upload))
+    error = _not_pending(upload)
+    if error:
+        return error
+
+    requested = request.data.get('parts')
+    try:
+        if requested is None:
+            parts = storage.list_parts(upload.storage_path, upload.s3_upload_id)
+        else:
+            if not isinstance(requested, list):
+                return Response({'error': 'parts doit être une liste'}, status=400)
+            parts = []
+            for item in requested:
+                number = item.get('part_number') if isinstance(item, dict) else None
+                etag = item.get('etag') if isinstance(item, dict) else None
+                if isinstance(number, bool) or not isinstance(number, int) or not isinstance(etag, str) or not etag:
+                    return Response({'error': 'Partie invalide'}, status=400)
+                parts.append({'PartNumber': number, 'ETag': etag})
+            parts.sort(key=lambda part: part['PartNumber'])
+        if not parts:
+            return Response({'error': 'Aucune partie reçue'}, status=400)
+        if len({part['PartNumber'] for part in parts}) != len(parts):
+            return Response({'error': 'Numéro de partie en double'}, status=400)
+        storage.complete_multipart_upload(upload.storage_path, upload.s3_upload_id, parts)
+    except ClientError as e:
+        return _multipart_storage_error(e)
+
+    upload.status = MultipartUpload.COMPLETED
+    upload.completed_at = timezone.now()
+    upload.save(update_fields=['status', 'completed_at'])
+    return Response(_multipart_payload(upload))
+
+
+@api_view(['DELETE'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def abort_multipart_upload(request, upload_id):
+    """
+    Abandonne un upload multipart : les parties reçues sont supprimées du stockage.
+    """
+    upload = get_object_or_404(MultipartUpload, id=upload_id, owner=request.user)
+    error = _not_pending(upload)
+    if error:
+        return error
+    try:
+        storage.abort_multipart_upload(upload.storage_path, upload.s3_upload_id)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') != 'NoSuchUpload':
+            return _multipart_storage_error(e)
+    upload.status = MultipartUpload.ABORTED
+    upload.save(update_fields=['status'])
+    return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 #-----------------------------Confirm Upload Document(remplace upload_document)--------------
 @api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated])
+@permission_classes(DOCUMENT_PERMISSIONS)
 def confirm_upload(request):
     """
     Confirmer l'upload après que le fichier a été envoyé à MinIO.
     Payload :
     {
-      "storage_path": "abc123_doc.pdf",
+      "storage_path": "abc123_doc.pdf",   (ou "upload_id" d'un upload multipart terminé)
       "filename": "doc.pdf",
       "file_hash": "...",
       "signature": "...",
@@ -402,59 +918,128 @@ def confirm_upload(request):
     }
     """
     data = request.data
-    storage_path = data.get('storage_path')
-    if not storage_path:
+    multipart = None
+    if data.get('upload_id'):
+        # Upload multipart terminé : l'objet existe (CompleteMultipartUpload a réussi)
+        multipart = services.completed_multipart(request.user, data['upload_id']).first()
+        if multipart is None:
+            return Response({'error': services.MULTIPART_NOT_COMPLETED}, status=400)
+        storage_path = multipart.storage_path
+    else:
+        storage_path = data.get('storage_path')
+    if not storage_path or not isinstance(storage_path, str):
         return Response({'error': 'storage_path requis'}, status=400)
+    if services.foreign_documents(request.user, [storage_path]).exists():
+        return Response({'error': services.STORAGE_PATH_TAKEN}, status=400)
 
-    # Vérifier que le fichier existe dans MinIO (optionnel mais sécurisant)
-    s3_client = boto3.client(
-        's3',
-        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
-        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
-        region_name=settings.AWS_S3_REGION_NAME,
+    filename = data.get('filename')
+    if multipart is not None and not filename:
+        filename = multipart.filename
+    missing = services.missing_fields(
+        {**data, 'filename': filename}, ('filename', 'file_hash', 'signature')
     )
-    try:
-        s3_client.head_object(Bucket=settings.AWS_STORAGE_BUCKET_NAME, Key=storage_path)
-    except ClientError:
-        return Response({'error': 'Fichier non trouvé dans le stockage'}, status=400)
+    if missing:
+        return Response({'error': f'Champs requis : {", ".join(missing)}'}, status=400)
+    if services.owner_key(data) is None:
+        return Response({'error': services.OWNER_KEY_INVALID}, status=400)
+
+    # Vérifier que le fichier existe dans MinIO ; en mode différé
+    # (DOCUMENTS_VERIFY_UPLOADS), c'est le worker de tâches qui s'en charge.
+    # Objet dédupliqué déjà référencé : il existe, rien à vérifier
+    verify = multipart is None and not blobs.stored(
+        request.user, data.get('file_hash'), storage_path
+    ).exists()
+    deferred = verify and tasks.deferred_verification()
+    if verify and not deferred:
+        s3_client = storage.get_s3_client()
+        try:
+            s3_client.head_object(Bucket=storage.bucket_name(), Key=storage_path)
+        except ClientError:
+            return Response({'error': 'Fichier non trouvé dans le stockage'}, status=400)
 
     # Puis créer le Document (comme avant)
     category = None
     if data.get('category_id'):
         category = get_object_or_404(Category, id=data['category_id'])
 
-    doc = Document.objects.create(
-        filename=data['filename'],
-        storage_path=storage_path,  # ex: "abc123_doc.pdf"
-        file_hash=data['file_hash'],
-        signature=data['signature'],
-        mime_type=data.get('mime_type', ''),
-        uploaded_by=request.user,
-        category=category
-    )
+    # Destinataires résolus en une requête, hors transaction
+    recipients = services.parse_recipients(data.get('shared_with', []))
+    if recipients is None:
+        return Response({'error': 'Destinataire invalide'}, status=400)
+    wanted = {user_id for user_id, _ in recipients}
+    if wanted and User.objects.filter(id__in=wanted).count() != len(wanted):
+        raise Http404
+
+    with transaction.atomic():
+        doc = Document(
+            filename=filename,
+            storage_path=storage_path,  # ex: "abc123_doc.pdf"
+            file_hash=data['file_hash'],
+            signature=data['signature'],
+            mime_type=data.get('mime_type', ''),
+            uploaded_by=request.user,
+            category=category
+        )
+        if multipart is not None and not services.consume_multipart(multipart, doc):
+            return Response({'error': services.MULTIPART_NOT_COMPLETED}, status=400)
+        blobs.attach(request.user, [doc])
+        doc.save()
 
-    # Partage (comme avant)
-    shared_with = data.get('shared_with', [])
-    access_list = []
-    for item in shared_with:
-        user = get_object_or_404(User, id=item['user_id'])
-        access_list.append(DocumentAccess(
-            document=doc,
-            user=user,
-            encrypted_aes_key=item['encrypted_aes_key']
-        ))
-    # Ajouter l'uploader
-    access_list.append(DocumentAccess(
-        document=doc,
-        user=request.user,
-        encrypted_aes_key=data.get('owner_encrypted_aes_key', '')
-    ))
-    DocumentAccess.objects.bulk_create(access_list)
+        # Partage (comme avant)
+        keys = dict(recipients)
+        # Ajouter l'uploader
+        keys[request.user.id] = services.owner_key(data)
+        access_list = [
+            DocumentAccess(document=doc, user_id=user_id, encrypted_aes_key=key)
+            for user_id, key in keys.items()
+        ]
+        DocumentAccess.objects.bulk_create(access_list)
+        services.record_changes((access.user_id, doc.id) for access in access_list)
+        if deferred:
+            tasks.enqueue_verify_uploads([doc])
 
     return Response({'id': doc.id, 'message': 'Document confirmé'}, status=201)
 
 
+#-----------------------------Confirm Upload Batch (synchronisation de dossiers)--------------
+@api_view(['POST'])
+@permission_classes(DOCUMENT_PERMISSIONS)
+def confirm_upload_batch(request):
+    """
+    Confirme plusieurs uploads en une seule requête.
+    Payload :
+    {
+      "documents": [
+        {"storage_path": "...", "filename": "...", "file_hash": "...",
+         "signature": "...", "mime_type": "...", "category_id": "...",
+         "shared_with": [...], "owner_encrypted_aes_key": "..."}
+      ]
+    }
+    Réponse : un résultat par document (created + id, ou error).
+    """
+    items = request.data.get('documents')
+    if not isinstance(items, list) or not items:
+        return Response({'error': 'documents doit être une liste non vide'}, status=400)
+
+    max_items = getattr(settings, 'DOCUMENTS_BATCH_MAX_ITEMS', 500)
+    if len(items) > max_items:
+        return Response({'error': f'Maximum {max_items} documents par lot'}, status=400)
+
+    if not storage.is_configured():
+        return Response(
+            {'error': 'Stockage objet non configuré'},
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+    results = services.confirm_uploads(request.user, items)
+    created = sum(1 for r in results if r['status'] == 'created')
+    return Response({
+        'created': created,
+        'failed': len(results) - created,
+        'results': results,
+    }, status=201 if created else 400)
+
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def create_category(request):
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class DocumentsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documents'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+        from documents import signals  # noqa: F401
+        from documents.search import repair_sqlite_index
+
+        post_migrate.connect(
+            lambda sender, using, **kwargs: repair_sqlite_index(using),
+            sender=self, weak=False, dispatch_uid='documents_repair_search_index',
+        )
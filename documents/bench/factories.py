@@ -0,0 +1,73 @@
+# documents/bench/factories.py
+"""
+Jeux de données pour les benchmarks : N utilisateurs, C catégories,
+M documents et K partages, insérés par bulk_create (graine fixe).
+"""
+import random
+import uuid
+
+from django.contrib.auth.hashers import make_password
+
+from accounts.models import User
+from documents.models import Category, Document, DocumentAccess
+
+
+BENCH_PASSWORD = 'Bench-Password-123'
+FAKE_PUBLIC_KEY = (
+    '-----BEGIN PUBLIC KEY-----\n'
+    + 'MIIBIjANBgkqhkiG9w0BAQEFAAOCAQ8AMIIBCgKCAQEA' * 8
+    + '\n-----END PUBLIC KEY-----'
+)
+
+
+def seed(users=100, documents=1000, shares=5000, categories=10, seed=42, put_object=None):
+    """
+    Crée le jeu de données ; put_object(key) est appelé pour chaque
+    document afin de peupler le stockage simulé.
+    Retourne un dict {users, categories, documents} (listes d'objets).
+    """
+    rng = random.Random(seed)
+    # Un seul hachage (PBKDF2 est volontairement lent) partagé par tous les comptes
+    password = make_password(BENCH_PASSWORD)
+
+    user_objs = User.objects.bulk_create([
+        User(
+            email=f'bench{i}@bench.local',
+            password=password,
+            public_key=FAKE_PUBLIC_KEY,
+            is_active=True,
+        )
+        for i in range(users)
+    ])
+    category_objs = Category.objects.bulk_create([
+        Category(name=f'Catégorie {i}') for i in range(categories)
+    ])
+
+    document_objs = []
+    for i in range(documents):
+        storage_path = f'{uuid.UUID(int=rng.getrandbits(128)).hex}_doc{i}.enc'
+        document_objs.append(Document(
+            filename=f'doc{i}.pdf',
+            storage_path=storage_path,
+            file_hash=f'{i:064x}',
+            signature='c2lnbmF0dXJl',
+            mime_type='application/pdf',
+            uploaded_by=rng.choice(user_objs),
+            category=rng.choice(category_objs + [None]),
+        ))
+        if put_object:
+            put_object(storage_path)
+    Document.objects.bulk_create(document_objs, batch_size=500)
+
+    # Chaque propriétaire a accès à son document, puis K partages aléatoires
+    pairs = {(doc.id, doc.uploaded_by_id) for doc in document_objs}
+    target = len(pairs) + shares
+    max_pairs = len(document_objs) * len(user_objs)
+    while len(pairs) < min(target, max_pairs):
+        pairs.add((rng.choice(document_objs).id, rng.choice(user_objs).id))
+    DocumentAccess.objects.bulk_create([
+        DocumentAccess(document_id=doc_id, user_id=user_id, encrypted_aes_key='a2V5' * 64)
+        for doc_id, user_id in pairs
+    ], batch_size=1000)
+
+    return {'users': user_objs, 'categories': category_objs, 'documents': document_objs}
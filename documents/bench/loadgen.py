@@ -0,0 +1,117 @@
+# documents/bench/loadgen.py
+"""
+Générateur de charge HTTP minimal (threads + connexions keep-alive),
+pour comparer deux déploiements (gunicorn sync / uvicorn ASGI) sur le
+même endpoint ou plusieurs chemins de téléchargement.
+"""
+import http.client
+import json
+import threading
+import time
+from urllib.parse import urlsplit
+
+from documents.bench.stats import summarize
+
+
+def _connection(parts, timeout):
+    if parts.scheme == 'https':
+        return http.client.HTTPSConnection(parts.netloc, timeout=timeout)
+    return http.client.HTTPConnection(parts.netloc, timeout=timeout)
+
+
+def _follow(connections, url, timeout):
+    """
+    GET de l'URL renvoyée par l'API (URL pré-signée), sur une connexion
+    keep-alive par hôte ; retourne (statut, octets lus).
+    """
+    parts = urlsplit(url)
+    conn = connections.get(parts.netloc)
+    if conn is None:
+        conn = connections[parts.netloc] = _connection(parts, timeout)
+    try:
+        conn.request('GET', parts.path + (f'?{parts.query}' if parts.query else ''))
+        response = conn.getresponse()
+        return response.status, len(response.read())
+    except (OSError, http.client.HTTPException):
+        conn.close()
+        del connections[parts.netloc]
+        raise
+
+
+def run_load(url, method='GET', body=None, headers=None, concurrency=10, requests=100, timeout=30,
+             follow=None):
+    """
+    Envoie `requests` requêtes réparties sur `concurrency` threads ;
+    retourne le résumé des latences, le débit (requêtes et octets reçus) et
+    la répartition des statuts.
+
+    `follow` : clé JSON d'une URL à télécharger ensuite dans la même mesure
+    (ex. "download_url" : parcours complet du téléchargement pré-signé).
+    """
+    parts = urlsplit(url)
+    path = parts.path + (f'?{parts.query}' if parts.query else '')
+    headers = dict(headers or {})
+    if body is not None:
+        body = body.encode() if isinstance(body, str) else body
+        headers.setdefault('Content-Type', 'application/json')
+
+    remaining = [requests]
+    lock = threading.Lock()
+    samples = []
+    statuses = {}
+    received = [0]
+
+    def worker():
+        conn = _connection(parts, timeout)
+        followed = {}
+        local_samples = []
+        local_statuses = {}
+        local_bytes = 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            start = time.perf_counter()
+            try:
+                conn.request(method, path, body=body, headers=headers)
+                response = conn.getresponse()
+                payload = response.read()
+                code = response.status
+            except (OSError, http.client.HTTPException):
+                conn.close()
+                conn = _connection(parts, timeout)
+                code, payload = 'error', b''
+            if follow and code == 200:
+                try:
+                    code, size = _follow(followed, json.loads(payload)[follow], timeout)
+                    local_bytes += size
+                except (ValueError, KeyError, TypeError, OSError, http.client.HTTPException):
+                    code = 'error'
+            else:
+                local_bytes += len(payload)
+            local_samples.append((time.perf_counter() - start) * 1000)
+            local_statuses[code] = local_statuses.get(code, 0) + 1
+        conn.close()
+        for other in followed.values():
+            other.close()
+        with lock:
+            received[0] += local_bytes
+            samples.extend(local_samples)
+            for code, count in local_statuses.items():
+                statuses[code] = statuses.get(code, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    summary = summarize(samples)
+    summary['throughput_rps'] = round(len(samples) / elapsed, 1) if elapsed else 0.0
+    summary['throughput_mib_s'] = round(received[0] / elapsed / 2 ** 20, 1) if elapsed else 0.0
+    summary['bytes_received'] = received[0]
+    summary['statuses'] = {str(code): count for code, count in statuses.items()}
+    return summary
@@ -0,0 +1,285 @@
+# documents/bench/s3_stub.py
+"""
+Serveur S3 minimal en mémoire pour les benchmarks locaux.
+
+Il ne vérifie pas les signatures : il sert uniquement de cible HTTP
+réaliste (keep-alive, latence réseau locale) à la place de MinIO.
+Adressage "path-style" : /<bucket>/<key>. Opérations prises en charge :
+objets (HEAD/PUT/DELETE, GET avec Range et conditions), ListObjectsV2, DeleteObjects et upload multipart.
+"""
+import hashlib
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.utils import formatdate
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlsplit
+from xml.etree import ElementTree
+from xml.sax.saxutils import escape
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # En-têtes et corps sont écrits séparément : sans TCP_NODELAY, chaque
+    # réponse subit le délai d'ACK différé (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _split(self):
+        parts = urlsplit(self.path)
+        bucket, _, key = parts.path.lstrip('/').partition('/')
+        return bucket, unquote(key), parts.query
+
+    def _send(self, code, body=b'', headers=None):
+        self.send_response(code)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if body and self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _object_headers(self, obj):
+        return {
+            'ETag': f'"{obj["etag"]}"',
+            'Last-Modified': formatdate(obj['mtime'], usegmt=True),
+            'Content-Type': 'application/octet-stream',
+        }
+
+    def _read_body(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return self.rfile.read(length) if length else b''
+
+    def do_HEAD(self):
+        bucket, key, _ = self._split()
+        obj = self.server.objects.get((bucket, key))
+        if obj is None:
+            return self._send(404)
+        headers = self._object_headers(obj)
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(obj['data'])))
+        self.end_headers()
+
+    def _list_objects_v2(self, bucket, query):
+        params = _params(query)
+        prefix = params.get('prefix', '')
+        max_keys = int(params.get('max-keys', 1000))
+        after = params.get('continuation-token') or params.get('start-after', '')
+        keys = sorted(
+            key for (b, key) in list(self.server.objects)
+            if b == bucket and key.startswith(prefix) and key > after
+        )
+        page, truncated = keys[:max_keys], len(keys) > max_keys
+        contents = ''.join(
+            f'<Contents><Key>{escape(key)}</Key>'
+            f'<LastModified>{_iso(self.server.objects[(bucket, key)]["mtime"])}</LastModified>'
+            f'<ETag>"{self.server.objects[(bucket, key)]["etag"]}"</ETag>'
+            f'<Size>{len(self.server.objects[(bucket, key)]["data"])}</Size></Contents>'
+            for key in page
+        )
+        token = f'<NextContinuationToken>{escape(page[-1])}</NextContinuationToken>' if truncated else ''
+        body = (
+            f'<ListBucketResult><Name>{bucket}</Name><Prefix>{escape(prefix)}</Prefix>'
+            f'<KeyCount>{len(page)}</KeyCount><MaxKeys>{max_keys}</MaxKeys>'
+            f'<IsTruncated>{"true" if truncated else "false"}</IsTruncated>{token}{contents}</ListBucketResult>'
+        ).encode()
+        return self._send(200, body, {'Content-Type': 'application/xml'})
+
+    def _list_parts(self, bucket, key, params):
+        upload = self.server.uploads.get(params.get('uploadId'))
+        if upload is None:
+            return self._send(404, b'<Error><Code>NoSuchUpload</Code></Error>')
+        marker = int(params.get('part-number-marker', 0))
+        max_parts = int(params.get('max-parts', 1000))
+        numbers = sorted(n for n in list(upload['parts']) if n > marker)
+        page, truncated = numbers[:max_parts], len(numbers) > max_parts
+        parts = ''.join(
+            f'<Part><PartNumber>{n}</PartNumber><ETag>"{upload["parts"][n]["etag"]}"</ETag>'
+            f'<Size>{len(upload["parts"][n]["data"])}</Size>'
+            f'<LastModified>{_iso(upload["parts"][n]["mtime"])}</LastModified></Part>'
+            for n in page
+        )
+        marker_xml = f'<NextPartNumberMarker>{page[-1]}</NextPartNumberMarker>' if truncated else ''
+        body = (
+            f'<ListPartsResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>'
+            f'<UploadId>{params["uploadId"]}</UploadId><MaxParts>{max_parts}</MaxParts>'
+            f'<IsTruncated>{"true" if truncated else "false"}</IsTruncated>{marker_xml}{parts}</ListPartsResult>'
+        ).encode()
+        return self._send(200, body, {'Content-Type': 'application/xml'})
+
+    def _list_multipart_uploads(self, bucket, params):
+        prefix = params.get('prefix', '')
+        uploads = ''.join(
+            f'<Upload><Key>{escape(upload["key"])}</Key><UploadId>{upload_id}</UploadId>'
+            f'<Initiated>{_iso(upload["initiated"])}</Initiated></Upload>'
+            for upload_id, upload in sorted(self.server.uploads.items())
+            if upload['bucket'] == bucket and upload['key'].startswith(prefix)
+        )
+        body = (
+            f'<ListMultipartUploadsResult><Bucket>{bucket}</Bucket>'
+            f'<IsTruncated>false</IsTruncated>{uploads}</ListMultipartUploadsResult>'
+        ).encode()
+        return self._send(200, body, {'Content-Type': 'application/xml'})
+
+    def do_GET(self):
+        bucket, key, query = self._split()
+        params = _params(query)
+        if not key and 'list-type=2' in query:
+            return self._list_objects_v2(bucket, query)
+        if not key and 'uploads' in params:
+            return self._list_multipart_uploads(bucket, params)
+        if 'uploadId' in params:
+            return self._list_parts(bucket, key, params)
+        obj = self.server.objects.get((bucket, key))
+        if obj is None:
+            return self._send(404, b'<Error><Code>NoSuchKey</Code></Error>')
+        headers = self._object_headers(obj)
+        if self.headers.get('If-Match') not in (None, headers['ETag']):
+            return self._send(412, b'<Error><Code>PreconditionFailed</Code></Error>')
+        if self.headers.get('If-None-Match') == headers['ETag']:
+            return self._send(304, headers={'ETag': headers['ETag']})
+        byte_range = self.headers.get('Range')
+        if byte_range:
+            size = len(obj['data'])
+            start, _, end = byte_range.removeprefix('bytes=').partition('-')
+            if start:
+                start, end = int(start), min(int(end) if end else size - 1, size - 1)
+            else:
+                start, end = max(size - int(end), 0), size - 1
+            if start >= size:
+                return self._send(416, b'<Error><Code>InvalidRange</Code></Error>')
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            return self._send(206, obj['data'][start:end + 1], headers)
+        return self._send(200, obj['data'], headers)
+
+    def do_PUT(self):
+        bucket, key, query = self._split()
+        params = _params(query)
+        if 'uploadId' in params:
+            upload = self.server.uploads.get(params['uploadId'])
+            if upload is None:
+                return self._send(404, b'<Error><Code>NoSuchUpload</Code></Error>')
+            data = self._read_body()
+            etag = hashlib.md5(data).hexdigest()
+            upload['parts'][int(params['partNumber'])] = {'data': data, 'etag': etag, 'mtime': time.time()}
+            return self._send(200, headers={'ETag': f'"{etag}"'})
+        self.server.put_object(bucket, key, self._read_body())
+        obj = self.server.objects[(bucket, key)]
+        return self._send(200, headers={'ETag': f'"{obj["etag"]}"'})
+
+    def _complete_multipart_upload(self, bucket, key, upload_id):
+        upload = self.server.uploads.get(upload_id)
+        if upload is None:
+            return self._send(404, b'<Error><Code>NoSuchUpload</Code></Error>')
+        root = ElementTree.fromstring(self._read_body())
+        requested = []
+        for part in root:
+            fields = {child.tag.rsplit('}', 1)[-1]: child.text for child in part}
+            requested.append((int(fields['PartNumber']), fields['ETag'].strip('"')))
+        chunks = []
+        for number, etag in requested:
+            stored = upload['parts'].get(number)
+            if stored is None or stored['etag'] != etag:
+                return self._send(400, b'<Error><Code>InvalidPart</Code></Error>')
+            chunks.append(stored['data'])
+        del self.server.uploads[upload_id]
+        self.server.put_object(bucket, key, b''.join(chunks))
+        etag = f'{self.server.objects[(bucket, key)]["etag"]}-{len(chunks)}'
+        body = (
+            f'<CompleteMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>'
+            f'<ETag>"{etag}"</ETag></CompleteMultipartUploadResult>'
+        ).encode()
+        return self._send(200, body, {'Content-Type': 'application/xml'})
+
+    def do_POST(self):
+        bucket, key, query = self._split()
+        params = _params(query)
+        if key and 'uploads' in params:
+            upload_id = self.server.create_upload(bucket, key)
+            body = (
+                f'<InitiateMultipartUploadResult><Bucket>{bucket}</Bucket><Key>{escape(key)}</Key>'
+                f'<UploadId>{upload_id}</UploadId></InitiateMultipartUploadResult>'
+            ).encode()
+            return self._send(200, body, {'Content-Type': 'application/xml'})
+        if key and 'uploadId' in params:
+            return self._complete_multipart_upload(bucket, key, params['uploadId'])
+        if key or 'delete' not in params:
+            return self._send(501)
+        root = ElementTree.fromstring(self._read_body())
+        deleted = []
+        for element in root.iter():
+            if element.tag.endswith('Key'):
+                self.server.objects.pop((bucket, element.text), None)
+                deleted.append(f'<Deleted><Key>{escape(element.text)}</Key></Deleted>')
+        body = f'<DeleteResult>{"".join(deleted)}</DeleteResult>'.encode()
+        return self._send(200, body, {'Content-Type': 'application/xml'})
+
+    def do_DELETE(self):
+        bucket, key, query = self._split()
+        params = _params(query)
+        if 'uploadId' in params:
+            if self.server.uploads.pop(params['uploadId'], None) is None:
+                return self._send(404, b'<Error><Code>NoSuchUpload</Code></Error>')
+            return self._send(204)
+        self.server.objects.pop((bucket, key), None)
+        return self._send(204)
+
+
+def _params(query):
+    return {name: values[0] for name, values in parse_qs(query, keep_blank_values=True).items()}
+
+
+def _iso(timestamp):
+    return datetime.fromtimestamp(timestamp, timezone.utc).strftime('%Y-%m-%dT%H:%M:%S.000Z')
+
+
+class S3Stub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, host='127.0.0.1', port=0):
+        super().__init__((host, port), _Handler)
+        self.objects = {}
+        self.uploads = {}   # upload multipart : UploadId -> {bucket, key, initiated, parts}
+        self._thread = None
+
+    @property
+    def endpoint_url(self):
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def put_object(self, bucket, key, data=b'', mtime=None):
+        self.objects[(bucket, key)] = {
+            'data': data,
+            'etag': hashlib.md5(data).hexdigest(),
+            'mtime': time.time() if mtime is None else mtime,
+        }
+
+    def create_upload(self, bucket, key, initiated=None):
+        upload_id = uuid.uuid4().hex
+        self.uploads[upload_id] = {
+            'bucket': bucket,
+            'key': key,
+            'initiated': time.time() if initiated is None else initiated,
+            'parts': {},
+        }
+        return upload_id
+
+    def start(self):
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
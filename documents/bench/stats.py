@@ -0,0 +1,31 @@
+# documents/bench/stats.py
+import statistics
+
+
+def percentile(samples, pct):
+    """
+    Percentile par interpolation linéaire (samples non vide).
+    """
+    ordered = sorted(samples)
+    if len(ordered) == 1:
+        return ordered[0]
+    rank = (len(ordered) - 1) * pct / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def summarize(samples_ms):
+    """
+    Résumé des latences (en millisecondes) d'une série de mesures.
+    """
+    if not samples_ms:
+        return {'count': 0}
+    return {
+        'count': len(samples_ms),
+        'mean_ms': round(statistics.fmean(samples_ms), 3),
+        'p50_ms': round(percentile(samples_ms, 50), 3),
+        'p90_ms': round(percentile(samples_ms, 90), 3),
+        'p99_ms': round(percentile(samples_ms, 99), 3),
+        'max_ms': round(max(samples_ms), 3),
+    }
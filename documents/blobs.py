@@ -0,0 +1,156 @@
+# documents/blobs.py
+"""
+Déduplication des objets chiffrés par contenu (settings.DOCUMENTS_DEDUP).
+
+Un même propriétaire qui renvoie un fichier déjà stocké (même file_hash,
+SHA-256 du clair) réutilise l'objet existant : prepare_upload répond
+"already_present" avec le storage_path et la clé AES chiffrée du
+propriétaire, que le client rechiffre pour ses destinataires au lieu
+d'envoyer à nouveau le fichier. La recherche est limitée aux objets du
+propriétaire : elle ne révèle rien des fichiers des autres utilisateurs.
+
+Les Document pointent vers un Blob compté par références ; l'objet n'est
+supprimé du stockage qu'avec le dernier document (documents/signals.py).
+"""
+from collections import Counter
+
+from django.conf import settings
+from django.db.models import F
+
+from documents import tasks
+from documents.models import Blob, DocumentAccess
+
+
+def enabled():
+    return getattr(settings, 'DOCUMENTS_DEDUP', False)
+
+
+def existing_uploads(owner, file_hashes):
+    """
+    Objets déjà stockés par `owner` pour ces file_hash, en deux requêtes :
+    file_hash -> {"already_present", "storage_path", "document_id",
+    "owner_encrypted_aes_key"} (réponse de prepare_upload).
+    """
+    file_hashes = {h for h in file_hashes if h and isinstance(h, str)}
+    if not enabled() or not file_hashes:
+        return {}
+    blobs = {
+        blob.id: blob
+        for blob in Blob.objects.filter(owner=owner, file_hash__in=file_hashes, ref_count__gt=0)
+    }
+    if not blobs:
+        return {}
+    present = {}
+    accesses = DocumentAccess.objects.filter(
+        user=owner, document__blob_id__in=blobs
+    ).values_list('document__blob_id', 'document_id', 'encrypted_aes_key')
+    for blob_id, document_id, key in accesses:
+        blob = blobs[blob_id]
+        if blob.file_hash not in present and key:
+            present[blob.file_hash] = {
+                'already_present': True,
+                'storage_path': blob.storage_path,
+                'document_id': str(document_id),
+                'owner_encrypted_aes_key': key,
+            }
+    return present
+
+
+def existing_upload(owner, file_hash):
+    """
+    existing_uploads() pour un seul file_hash : réponse "already_present" ou None.
+    """
+    if not isinstance(file_hash, str):
+        return None
+    return existing_uploads(owner, [file_hash]).get(file_hash)
+
+
+def stored(owner, file_hash, storage_path):
+    """
+    Blob de `owner` déjà stocké à `storage_path` (l'objet existe : pas de
+    vérification à la confirmation), sous forme de queryset.
+    """
+    if not enabled() or not file_hash or not isinstance(file_hash, str):
+        return Blob.objects.none()
+    return Blob.objects.filter(
+        owner=owner, file_hash=file_hash, storage_path=storage_path, ref_count__gt=0
+    )
+
+
+def stored_paths(owner, items):
+    """
+    Variante par lot de stored() : parmi les couples (file_hash, storage_path),
+    ensemble des storage_path déjà stockés par `owner` (une requête).
+    """
+    items = {
+        (file_hash, path) for file_hash, path in items
+        if isinstance(file_hash, str) and isinstance(path, str) and file_hash and path
+    }
+    if not enabled() or not items:
+        return set()
+    rows = Blob.objects.filter(
+        owner=owner, storage_path__in={path for _, path in items}, ref_count__gt=0
+    ).values_list('file_hash', 'storage_path')
+    return {path for file_hash, path in rows if (file_hash, path) in items}
+
+
+def attach(owner, documents):
+    """
+    Rattache des Document non encore enregistrés de `owner` à leur Blob (créé
+    au besoin) et incrémente les compteurs. À appeler dans la transaction
+    qui crée les documents. Un document dont le contenu est déjà stocké sous
+    une autre clé garde son propre objet (pas de dédup a posteriori).
+    """
+    if not enabled():
+        return
+    documents = [doc for doc in documents if doc.file_hash]
+    if not documents:
+        return
+    blobs = {
+        blob.file_hash: blob
+        for blob in Blob.objects.select_for_update().filter(
+            owner=owner, file_hash__in={doc.file_hash for doc in documents}
+        )
+    }
+    existing = set(blobs.values())
+    increments = Counter()
+    for doc in documents:
+        blob = blobs.get(doc.file_hash)
+        if blob is None:
+            blob = blobs[doc.file_hash] = Blob(
+                owner=owner, file_hash=doc.file_hash, storage_path=doc.storage_path
+            )
+        if blob.storage_path == doc.storage_path:
+            doc.blob = blob
+            increments[blob] += 1
+
+    for blob, count in increments.items():
+        if blob in existing:
+            Blob.objects.filter(id=blob.id).update(ref_count=F('ref_count') + count)
+        else:
+            blob.ref_count = count
+
+    new = [blob for blob in increments if blob not in existing]
+    if new:
+        # Confirmation concurrente du même contenu : un seul Blob est créé,
+        # les autres documents gardent leur propre objet
+        Blob.objects.bulk_create(new, ignore_conflicts=True)
+        created = set(Blob.objects.filter(id__in=[blob.id for blob in new]).values_list('id', flat=True))
+        for doc in documents:
+            if doc.blob is not None and doc.blob.id not in created and doc.blob not in existing:
+                doc.blob = None
+
+
+def release(document):
+    """
+    Document supprimé : décrémente son Blob et supprime l'objet (via le
+    worker) quand plus aucun document n'y fait référence.
+    """
+    if document.blob_id is not None:
+        blob = Blob.objects.select_for_update().filter(id=document.blob_id).first()
+        if blob is not None:
+            if blob.ref_count > 1:
+                Blob.objects.filter(id=blob.id).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+    tasks.enqueue_delete_object(document)
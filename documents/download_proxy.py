@@ -0,0 +1,194 @@
+# documents/download_proxy.py
+"""
+Téléchargement relayé par le serveur, pour les clients qui n'atteignent pas
+MinIO directement : l'objet chiffré est lu par morceaux de CHUNK_SIZE et
+transmis au fur et à mesure (mémoire constante par téléchargement).
+
+Range (une seule plage) et If-None-Match sont transmis à S3 ; If-Range
+(ETag) permet de reprendre un téléchargement sans mélanger deux versions.
+
+Deux modes (DOCUMENTS_DOWNLOAD_PROXY['MODE']) :
+  - "stream" : les octets passent par le worker Python ;
+  - "accel"  : la vue ne fait que le contrôle d'accès et renvoie un
+    X-Accel-Redirect vers une location interne de nginx qui relaie une URL
+    pré-signée de MinIO (docker/nginx/nginx.conf). Les octets ne passent
+    plus par Python ; nginx transmet lui-même Range et If-None-Match.
+"""
+import json
+import re
+from urllib.parse import urlsplit
+
+from botocore.exceptions import ClientError
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import content_disposition_header, http_date
+from rest_framework.renderers import BaseRenderer
+
+from documents import storage, url_cache
+
+
+STREAM = 'stream'
+ACCEL = 'accel'
+
+DEFAULTS = {
+    'ENABLED': False,
+    'MODE': STREAM,
+    'CHUNK_SIZE': 256 * 1024,
+    'ACCEL_LOCATION': '/_protected_s3/',   # location "internal" de nginx
+}
+
+# Lu par la location interne de nginx ($upstream_http_x_accel_s3_uri)
+ACCEL_TARGET_HEADER = 'X-Accel-S3-Uri'
+
+_RANGE_RE = re.compile(r'^bytes=(\d+-\d*|-\d+)$')
+
+
+def conf(name):
+    return getattr(settings, 'DOCUMENTS_DOWNLOAD_PROXY', {}).get(name, DEFAULTS[name])
+
+
+class OctetStreamRenderer(BaseRenderer):
+    """
+    Accepte "Accept: application/octet-stream" sur les vues DRF qui
+    renvoient directement un StreamingHttpResponse ; les erreurs restent en JSON.
+    """
+    media_type = 'application/octet-stream'
+    format = 'bin'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return json.dumps(data).encode() if data is not None else b''
+
+
+def parse_range(header):
+    """
+    Plage unique "bytes=a-b", "bytes=a-" ou "bytes=-n", transmise telle quelle
+    à S3. Plages multiples ou invalides : None (réponse complète, RFC 9110).
+    """
+    if header and _RANGE_RE.match(header.replace(' ', '')):
+        return header.replace(' ', '')
+    return None
+
+
+class ObjectResult:
+    def __init__(self, status, headers, body=None):
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+
+def _error_code(e):
+    return e.response.get('Error', {}).get('Code', '')
+
+
+def _http_headers(e):
+    return e.response.get('ResponseMetadata', {}).get('HTTPHeaders', {})
+
+
+def fetch(storage_path, request_headers):
+    """
+    GetObject conditionnel. Retourne un ObjectResult (200, 206, 304, 404 ou 416) ;
+    les autres erreurs de stockage sont propagées (ClientError).
+    """
+    client = storage.get_s3_client()
+    params = {'Bucket': storage.bucket_name(), 'Key': storage_path}
+    byte_range = parse_range(request_headers.get('Range'))
+    if_range = request_headers.get('If-Range')
+    if byte_range and if_range and not if_range.startswith(('"', 'W/')):
+        # If-Range par date : non pris en charge, on renvoie l'objet complet
+        byte_range = None
+    if request_headers.get('If-None-Match'):
+        params['IfNoneMatch'] = request_headers['If-None-Match']
+
+    try:
+        if byte_range:
+            ranged = dict(params, Range=byte_range)
+            if if_range:
+                ranged['IfMatch'] = if_range
+            try:
+                obj = client.get_object(**ranged)
+            except ClientError as e:
+                if _error_code(e) not in ('PreconditionFailed', '412'):
+                    raise
+                # L'objet a changé depuis le début du téléchargement : tout renvoyer
+                obj = client.get_object(**params)
+        else:
+            obj = client.get_object(**params)
+    except ClientError as e:
+        code = _error_code(e)
+        if code in ('304', 'NotModified'):
+            etag = _http_headers(e).get('etag') or request_headers['If-None-Match']
+            return ObjectResult(304, {'ETag': etag})
+        if code in ('NoSuchKey', '404', 'NotFound'):
+            return ObjectResult(404, {})
+        if code in ('InvalidRange', '416'):
+            size = client.head_object(Bucket=storage.bucket_name(), Key=storage_path)['ContentLength']
+            return ObjectResult(416, {'Content-Range': f'bytes */{size}'})
+        raise
+
+    headers = {
+        'Content-Length': str(obj['ContentLength']),
+        'Accept-Ranges': 'bytes',
+    }
+    if obj.get('ETag'):
+        headers['ETag'] = obj['ETag']
+    if obj.get('LastModified'):
+        headers['Last-Modified'] = http_date(obj['LastModified'].timestamp())
+    if obj.get('ContentRange'):
+        headers['Content-Range'] = obj['ContentRange']
+    return ObjectResult(206 if obj.get('ContentRange') else 200, headers, obj['Body'])
+
+
+def iter_body(body, chunk_size=None):
+    try:
+        yield from body.iter_chunks(chunk_size or conf('CHUNK_SIZE'))
+    finally:
+        # Client déconnecté : libère la connexion vers S3
+        body.close()
+
+
+async def aiter_body(body, chunk_size=None):
+    chunk_size = chunk_size or conf('CHUNK_SIZE')
+    try:
+        while True:
+            chunk = await storage.run_async(body.read, chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        body.close()
+
+
+def build_response(result, filename, stream):
+    """
+    Réponse HTTP pour un ObjectResult ; `stream` itère sur le corps (sync ou async).
+    """
+    if result.status == 304:
+        response = HttpResponseNotModified()
+    elif result.status != 200 and result.status != 206:
+        response = HttpResponse(status=result.status)
+    else:
+        response = StreamingHttpResponse(stream, status=result.status, content_type='application/octet-stream')
+        response['Content-Disposition'] = content_disposition_header(True, filename)
+    for name, value in result.headers.items():
+        response[name] = value
+    # L'accès peut être révoqué : toujours revalider (ETag) avant de servir un cache
+    response['Cache-Control'] = 'private, no-cache'
+    return response
+
+
+def accel_response(user_id, row):
+    """
+    Mode "accel" : redirection interne vers ACCEL_LOCATION ; nginx relaie
+    l'URL pré-signée (mise en cache par url_cache) transmise dans l'en-tête
+    ACCEL_TARGET_HEADER, chemin et signature conservés tels quels (un URI
+    dans X-Accel-Redirect serait décodé par nginx avant d'atteindre MinIO).
+    """
+    url = urlsplit(url_cache.get_download_url(user_id, row['doc_id'], row['storage_path']))
+    response = HttpResponse(content_type='application/octet-stream')
+    response['X-Accel-Redirect'] = conf('ACCEL_LOCATION')
+    response[ACCEL_TARGET_HEADER] = f'{url.path}?{url.query}'
+    # Conservés par nginx sur la réponse finale
+    response['Content-Disposition'] = content_disposition_header(True, row['filename'])
+    response['Cache-Control'] = 'private, no-cache'
+    return response
@@ -0,0 +1,297 @@
+# documents/events.py
+"""
+Notifications temps réel (partage, retrait, suppression) vers les
+utilisateurs connectés au flux SSE (documents/api/async_views.py).
+
+Backends de diffusion (settings.DOCUMENTS_EVENTS['BACKEND']) :
+  - "inprocess" : un seul processus / nœud ;
+  - "postgres"  : NOTIFY sur un canal PostgreSQL, chaque processus ASGI
+    écoute (LISTEN) sur une connexion dédiée et relaie à ses abonnés.
+    Derrière PgBouncer en mode transaction, LISTEN ne fonctionne pas :
+    renseigner LISTEN_DSN avec une connexion directe au serveur.
+
+Les événements sont des indications : le client se resynchronise via
+/api/documents/sync/ (source de vérité), notamment après une reconnexion.
+
+Ouverture du flux : EventSource ne permet pas d'en-têtes et un JWT en
+paramètre d'URL finirait dans les journaux (proxy, serveur). Le client
+échange son JWT contre un ticket (TICKET_TTL secondes, usage unique) qu'il
+passe en ?ticket=... ; rejoué ou expiré, il est refusé.
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import secrets
+import select
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, transaction
+from django.utils import timezone
+
+from documents.models import EventStreamTicket
+
+
+logger = logging.getLogger(__name__)
+
+SHARED = 'document.shared'
+UNSHARED = 'document.unshared'
+DELETED = 'document.deleted'
+
+DEFAULTS = {
+    'BACKEND': 'inprocess',             # "inprocess" ou "postgres"
+    'CHANNEL': 'securedoc_events',
+    'DATABASE_ALIAS': 'default',
+    'LISTEN_DSN': '',                   # connexion directe pour LISTEN (PgBouncer)
+    'QUEUE_SIZE': 100,                  # événements en attente par connexion SSE
+    'HEARTBEAT_SECONDS': 15,
+    'TICKET_TTL': 30,                   # secondes de validité d'un ticket de connexion
+}
+
+# pg_notify refuse les charges utiles de plus de 8000 octets
+NOTIFY_USERS_PER_MESSAGE = 200
+
+
+def conf(name):
+    return getattr(settings, 'DOCUMENTS_EVENTS', {}).get(name, DEFAULTS[name])
+
+
+#------------------------------------------ Tickets de connexion ------------------------------------------
+def _ticket_digest(ticket):
+    return hashlib.sha256(ticket.encode()).hexdigest()
+
+
+async def issue_ticket(user):
+    """
+    Nouveau ticket d'ouverture du flux pour `user` (valeur à transmettre au client).
+    """
+    now = timezone.now()
+    # Tickets expirés de l'utilisateur : jamais consommés
+    await EventStreamTicket.objects.filter(user=user, expires_at__lte=now).adelete()
+    ticket = secrets.token_urlsafe(32)
+    await EventStreamTicket.objects.acreate(
+        digest=_ticket_digest(ticket),
+        user=user,
+        expires_at=now + timedelta(seconds=conf('TICKET_TTL')),
+    )
+    return ticket
+
+
+async def redeem_ticket(ticket):
+    """
+    Consomme un ticket : utilisateur actif associé, ou None (inconnu,
+    expiré ou déjà utilisé).
+    """
+    if not isinstance(ticket, str) or not ticket:
+        return None
+    tickets = EventStreamTicket.objects.filter(digest=_ticket_digest(ticket))
+    found = await tickets.select_related('user').afirst()
+    # Suppression conditionnelle : une seule des connexions concurrentes l'emporte
+    if found is None or (await tickets.adelete())[0] != 1:
+        return None
+    if found.expires_at <= timezone.now() or not found.user.is_active:
+        return None
+    return found.user
+
+
+#------------------------------------------ Abonnés locaux ------------------------------------------
+class LocalHub:
+    """
+    Abonnés SSE du processus : user_id -> files asyncio (une par connexion).
+    deliver() peut être appelé depuis n'importe quel thread.
+    """
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id):
+        queue = asyncio.Queue(maxsize=conf('QUEUE_SIZE'))
+        entry = (asyncio.get_running_loop(), queue)
+        with self._lock:
+            self._subscribers.setdefault(str(user_id), set()).add(entry)
+        return entry
+
+    def unsubscribe(self, user_id, entry):
+        with self._lock:
+            entries = self._subscribers.get(str(user_id))
+            if entries is not None:
+                entries.discard(entry)
+                if not entries:
+                    del self._subscribers[str(user_id)]
+
+    def deliver(self, user_ids, event):
+        with self._lock:
+            targets = [
+                entry
+                for user_id in user_ids
+                for entry in self._subscribers.get(str(user_id), ())
+            ]
+        for loop, queue in targets:
+            try:
+                loop.call_soon_threadsafe(_put, queue, event)
+            except RuntimeError:
+                # Boucle fermée : la connexion est en cours de fermeture
+                pass
+
+
+def _put(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # Client trop lent : on abandonne l'événement, la synchro le rattrapera
+        pass
+
+
+#------------------------------------------ Backends ------------------------------------------
+class InProcessBroker:
+    def __init__(self):
+        self.hub = LocalHub()
+
+    def publish(self, user_ids, event):
+        self.hub.deliver(user_ids, event)
+
+    def start(self):
+        pass
+
+
+class PostgresBroker:
+    def __init__(self):
+        self.hub = LocalHub()
+        self.channel = conf('CHANNEL')
+        self.alias = conf('DATABASE_ALIAS')
+        self._listener = None
+        self._lock = threading.Lock()
+
+    def publish(self, user_ids, event):
+        user_ids = [str(user_id) for user_id in user_ids]
+        with connections[self.alias].cursor() as cursor:
+            for i in range(0, len(user_ids), NOTIFY_USERS_PER_MESSAGE):
+                payload = json.dumps({
+                    'users': user_ids[i:i + NOTIFY_USERS_PER_MESSAGE],
+                    'event': event,
+                })
+                cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def start(self):
+        """
+        Démarre (une fois par processus) le thread qui écoute le canal.
+        """
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(
+                    target=self._listen_forever, name='documents-events', daemon=True
+                )
+                self._listener.start()
+
+    def _connect(self):
+        wrapper = connections[self.alias]
+        dsn = conf('LISTEN_DSN')
+        if dsn:
+            conn = wrapper.Database.connect(dsn)
+        else:
+            conn = wrapper.Database.connect(**wrapper.get_connection_params())
+        conn.autocommit = True
+        return conn
+
+    def _dispatch(self, payload):
+        try:
+            message = json.loads(payload)
+            self.hub.deliver(message['users'], message['event'])
+        except (ValueError, KeyError, TypeError):
+            logger.warning("Notification invalide sur %s : %r", self.channel, payload[:200])
+
+    def _listen_forever(self):
+        delay = 1
+        while True:
+            try:
+                conn = self._connect()
+                try:
+                    cursor = conn.cursor()
+                    cursor.execute(f'LISTEN "{self.channel}"')
+                    delay = 1
+                    if hasattr(conn, 'notifies') and callable(conn.notifies):
+                        # psycopg 3
+                        for notify in conn.notifies():
+                            self._dispatch(notify.payload)
+                    else:
+                        # psycopg2
+                        while True:
+                            if select.select([conn], [], [], 30) != ([], [], []):
+                                conn.poll()
+                                while conn.notifies:
+                                    self._dispatch(conn.notifies.pop(0).payload)
+                finally:
+                    conn.close()
+            except Exception:
+                logger.exception("Écoute du canal %s interrompue, reconnexion dans %ss", self.channel, delay)
+                time.sleep(delay)
+                delay = min(delay * 2, 30)
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                if conf('BACKEND') == 'postgres':
+                    _broker = PostgresBroker()
+                else:
+                    _broker = InProcessBroker()
+    return _broker
+
+
+def reset():
+    global _broker
+    with _broker_lock:
+        _broker = None
+
+
+#------------------------------------------ API ------------------------------------------
+def publish(user_ids, event_type, document_id):
+    """
+    Diffuse un événement aux utilisateurs, une fois la transaction courante validée.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    if not user_ids:
+        return
+    event = {'type': event_type, 'document_id': str(document_id)}
+    broker = get_broker()
+
+    def send():
+        try:
+            broker.publish(user_ids, event)
+        except Exception:
+            # Une notification perdue ne doit pas faire échouer l'opération
+            logger.exception("Publication de l'événement %s impossible", event_type)
+
+    transaction.on_commit(send)
+
+
+async def subscribe(user_id):
+    """
+    Générateur async des événements destinés à `user_id`. Produit None dès
+    l'abonnement effectif, puis à chaque intervalle HEARTBEAT_SECONDS sans
+    événement (maintien de la connexion).
+    """
+    broker = get_broker()
+    broker.start()
+    entry = broker.hub.subscribe(user_id)
+    queue = entry[1]
+    heartbeat = conf('HEARTBEAT_SECONDS')
+    try:
+        yield None
+        while True:
+            try:
+                yield await asyncio.wait_for(queue.get(), timeout=heartbeat)
+            except asyncio.TimeoutError:
+                yield None
+    finally:
+        broker.hub.unsubscribe(user_id, entry)
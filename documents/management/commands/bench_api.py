@@ -0,0 +1,226 @@
+# documents/management/commands/bench_api.py
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from datetime import datetime, timezone
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+
+from accounts.models import User
+from documents import storage, url_cache
+from documents.bench import factories
+from documents.bench.s3_stub import S3Stub
+from documents.bench.stats import summarize
+from documents.models import Document, DocumentAccess
+
+
+BENCH_BUCKET = 'bench-bucket'
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark reproductible des endpoints API sur une base de test jetable "
+        "et un S3 simulé : latences (p50/p90/p99) et nombre de requêtes SQL par appel."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--documents', type=int, default=1000)
+        parser.add_argument('--shares', type=int, default=5000)
+        parser.add_argument('--categories', type=int, default=10)
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--only', action='append', help="Limiter à ce scénario (répétable)")
+        parser.add_argument('--json', dest='json_path', help="Écrit les résultats dans ce fichier")
+        parser.add_argument('--compare', help="Fichier JSON d'un run précédent à comparer")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True)
+        try:
+            with S3Stub() as stub, override_settings(
+                AWS_S3_ENDPOINT_URL=stub.endpoint_url,
+                AWS_STORAGE_BUCKET_NAME=BENCH_BUCKET,
+                AWS_ACCESS_KEY_ID='bench',
+                AWS_SECRET_ACCESS_KEY='bench',
+                AWS_S3_REGION_NAME='us-east-1',
+                AWS_S3_USE_SSL=False,
+                AWS_S3_VERIFY=False,
+            ):
+                storage.reset_s3_client()
+                url_cache.reset()
+                results = self._run(stub, options)
+        finally:
+            storage.reset_s3_client()
+            url_cache.reset()
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {
+            'meta': {
+                'commit': self._git_commit(),
+                'date': datetime.now(timezone.utc).isoformat(),
+                'database': connection.vendor,
+                'params': {k: options[k] for k in (
+                    'users', 'documents', 'shares', 'categories', 'iterations', 'seed'
+                )},
+            },
+            'endpoints': results,
+        }
+        self._print(results)
+        if options['compare']:
+            self._compare(results, options['compare'])
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump(report, fh, indent=2)
+
+    # ------------------------------------------------------------------ scénarios
+
+    def _run(self, stub, options):
+        rng = random.Random(options['seed'])
+        data = factories.seed(
+            users=options['users'],
+            documents=options['documents'],
+            shares=options['shares'],
+            categories=options['categories'],
+            seed=options['seed'],
+            put_object=lambda key: stub.put_object(BENCH_BUCKET, key, b'\0' * 256),
+        )
+        users = data['users']
+        # Utilisateur le plus chargé : pire cas pour le listing
+        heavy = User.objects.annotate(n=Count('documentaccess')).order_by('-n').first()
+        accessible = list(
+            DocumentAccess.objects.filter(user=heavy).values_list('document_id', flat=True)
+        )
+        owned = list(Document.objects.filter(uploaded_by=heavy).values_list('id', flat=True)) or accessible
+
+        client = Client()
+        tokens = client.post('/api/token/', {
+            'email': heavy.email, 'password': factories.BENCH_PASSWORD,
+        }, content_type='application/json').json()
+        auth = {'HTTP_AUTHORIZATION': f"Bearer {tokens['access']}"}
+
+        def share(i):
+            recipients = rng.sample(users, min(50, len(users)))
+            return client.post(
+                f'/api/documents/share/{owned[i % len(owned)]}/',
+                {'shared_with': [
+                    {'user_id': u.id, 'encrypted_aes_key': 'a2V5'} for u in recipients
+                ]},
+                content_type='application/json', **auth
+            )
+
+        def confirm(i):
+            key = f'{uuid.uuid4().hex}_bench.enc'
+            stub.put_object(BENCH_BUCKET, key, b'\0' * 256)
+            recipients = rng.sample(users, min(5, len(users)))
+            return client.post('/api/documents/upload/confirm/', {
+                'storage_path': key,
+                'filename': 'bench.pdf',
+                'file_hash': '0' * 64,
+                'signature': 'c2ln',
+                'mime_type': 'application/pdf',
+                'shared_with': [
+                    {'user_id': u.id, 'encrypted_aes_key': 'a2V5'}
+                    for u in recipients if u.id != heavy.id
+                ],
+                'owner_encrypted_aes_key': 'a2V5',
+            }, content_type='application/json', **auth)
+
+        scenarios = {
+            'list_documents': (
+                lambda i: client.get('/api/documents/list/', **auth), 200),
+            'list_documents_paginated': (
+                lambda i: client.get('/api/documents/list/', {'limit': 100}, **auth), 200),
+            'download_document': (
+                lambda i: client.get(f'/api/documents/download/{rng.choice(accessible)}/', **auth), 200),
+            'share_document': (share, 200),
+            'confirm_upload': (confirm, 201),
+            'list_users': (
+                lambda i: client.get('/api/documents/users/', **auth), 200),
+            'token_obtain': (
+                lambda i: client.post('/api/token/', {
+                    'email': heavy.email, 'password': factories.BENCH_PASSWORD,
+                }, content_type='application/json'), 200),
+            'token_refresh': (
+                lambda i: client.post('/api/token/refresh/', {
+                    'refresh': tokens['refresh'],
+                }, content_type='application/json'), 200),
+        }
+        if options['only']:
+            scenarios = {k: v for k, v in scenarios.items() if k in options['only']}
+
+        results = {}
+        for name, (call, expected) in scenarios.items():
+            self.stdout.write(f"{name}…")
+            results[name] = self._measure(call, expected, options['warmup'], options['iterations'])
+        return results
+
+    def _measure(self, call, expected, warmup, iterations):
+        for i in range(warmup):
+            call(i)
+        latencies, query_counts, query_times, errors = [], [], [], 0
+        for i in range(iterations):
+            with CaptureQueriesContext(connection) as ctx:
+                start = time.perf_counter()
+                response = call(warmup + i)
+                latencies.append((time.perf_counter() - start) * 1000)
+            if response.status_code != expected:
+                errors += 1
+            query_counts.append(len(ctx.captured_queries))
+            query_times.append(sum(float(q['time']) for q in ctx.captured_queries) * 1000)
+        summary = summarize(latencies)
+        summary.update({
+            'queries_mean': round(statistics.fmean(query_counts), 2),
+            'queries_max': max(query_counts),
+            'db_time_mean_ms': round(statistics.fmean(query_times), 3),
+            'errors': errors,
+        })
+        return summary
+
+    # ------------------------------------------------------------------ sorties
+
+    def _print(self, results):
+        self.stdout.write('')
+        self.stdout.write(f"{'endpoint':<26}{'p50 ms':>10}{'p90 ms':>10}{'p99 ms':>10}{'SQL':>8}{'err':>6}")
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<26}{r['p50_ms']:>10}{r['p90_ms']:>10}{r['p99_ms']:>10}"
+                f"{r['queries_mean']:>8}{r['errors']:>6}"
+            )
+
+    def _compare(self, results, path):
+        with open(path) as fh:
+            previous = json.load(fh).get('endpoints', {})
+        self.stdout.write('')
+        self.stdout.write(f"Comparaison avec {path} (p50, requêtes SQL) :")
+        for name, r in results.items():
+            old = previous.get(name)
+            if not old:
+                continue
+            delta = (r['p50_ms'] - old['p50_ms']) / old['p50_ms'] * 100 if old['p50_ms'] else 0
+            line = (
+                f"{name:<26}{old['p50_ms']:>10} -> {r['p50_ms']:<10} ({delta:+.1f} %)"
+                f"  SQL {old['queries_mean']} -> {r['queries_mean']}"
+            )
+            regression = delta > 20 or r['queries_mean'] > old['queries_mean']
+            self.stdout.write(self.style.ERROR(line) if regression else line)
+
+    def _git_commit(self):
+        try:
+            return subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'],
+                capture_output=True, text=True, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            return None
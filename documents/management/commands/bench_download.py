@@ -0,0 +1,71 @@
+# documents/management/commands/bench_download.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.bench.loadgen import run_load
+
+
+# Parcours comparés : nom -> (chemin de l'API, clé JSON de l'URL à suivre)
+PATHS = {
+    'presigned': ('/api/documents/download/{id}/', 'download_url'),
+    'stream': ('/api/documents/download/{id}/content/', None),
+    'accel': ('/api/documents/download/{id}/content/', None),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare le débit des trois chemins de téléchargement d'un document : "
+        "URL pré-signée (API puis GET direct sur MinIO), relais Python "
+        "(DOCUMENTS_DOWNLOAD_PROXY_MODE=stream) et relais nginx (mode accel). "
+        "Ex. :\n"
+        "  manage.py bench_download --document-id <uuid> --token <JWT> "
+        "--presigned http://localhost:8000 --stream http://localhost:8001 "
+        "--accel http://localhost --concurrency 20 --requests 200"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--document-id', required=True)
+        parser.add_argument('--token', required=True, help="Access token JWT d'un utilisateur ayant accès")
+        for name in PATHS:
+            parser.add_argument(f'--{name}', metavar='BASE_URL', help=f"Déploiement à mesurer pour « {name} »")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=100)
+        parser.add_argument('--json', dest='json_path', help="Écrit les résultats dans ce fichier")
+
+    def handle(self, *args, **options):
+        targets = {name: options[name] for name in PATHS if options[name]}
+        if not targets:
+            raise CommandError("Indiquer au moins un de --presigned, --stream, --accel")
+        headers = {'Authorization': f"Bearer {options['token']}"}
+
+        results = {}
+        for name, base_url in targets.items():
+            path, follow = PATHS[name]
+            url = base_url.rstrip('/') + path.format(id=options['document_id'])
+            self.stdout.write(f"{name}: {options['requests']} téléchargements, {options['concurrency']} en parallèle…")
+            results[name] = run_load(
+                url,
+                headers=headers,
+                concurrency=options['concurrency'],
+                requests=options['requests'],
+                follow=follow,
+            )
+
+        for name, summary in results.items():
+            self.stdout.write(
+                f"{name:<10} {summary.get('throughput_mib_s', 0)} Mio/s "
+                f"{summary.get('throughput_rps', 0)} req/s "
+                f"p50={summary.get('p50_ms')}ms p99={summary.get('p99_ms')}ms "
+                f"statuts={summary.get('statuses')}"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({
+                    'document_id': options['document_id'],
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'results': results,
+                }, fh, indent=2)
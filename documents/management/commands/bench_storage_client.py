@@ -0,0 +1,81 @@
+# documents/management/commands/bench_storage_client.py
+import json
+import time
+
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+
+from documents import storage
+from documents.bench.s3_stub import S3Stub
+from documents.bench.stats import summarize
+
+
+BENCH_BUCKET = 'bench-bucket'
+BENCH_KEY = 'bench/object.enc'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare la construction d'un client boto3 par requête "
+        "au client partagé de documents.storage, contre un S3 local simulé."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--operation', choices=['head', 'presign'], default='head',
+            help="head_object (aller-retour HTTP) ou generate_presigned_url (CPU seul)",
+        )
+        parser.add_argument('--json', dest='json_path', help="Écrit les résultats dans ce fichier")
+
+    def handle(self, *args, **options):
+        iterations = options['iterations']
+        operation = options['operation']
+
+        with S3Stub() as stub:
+            stub.put_object(BENCH_BUCKET, BENCH_KEY, b'x' * 1024)
+            with override_settings(
+                AWS_S3_ENDPOINT_URL=stub.endpoint_url,
+                AWS_STORAGE_BUCKET_NAME=BENCH_BUCKET,
+                AWS_ACCESS_KEY_ID='bench',
+                AWS_SECRET_ACCESS_KEY='bench',
+                AWS_S3_REGION_NAME='us-east-1',
+                AWS_S3_USE_SSL=False,
+                AWS_S3_VERIFY=False,
+            ):
+                storage.reset_s3_client()
+                try:
+                    results = {
+                        'per_request_client': self._run(storage.build_s3_client, operation, iterations),
+                        'shared_client': self._run(storage.get_s3_client, operation, iterations),
+                    }
+                finally:
+                    storage.reset_s3_client()
+
+        for name, summary in results.items():
+            self.stdout.write(
+                f"{name:<20} n={summary['count']} mean={summary['mean_ms']}ms "
+                f"p50={summary['p50_ms']}ms p90={summary['p90_ms']}ms p99={summary['p99_ms']}ms"
+            )
+        speedup = results['per_request_client']['mean_ms'] / max(results['shared_client']['mean_ms'], 1e-9)
+        self.stdout.write(self.style.SUCCESS(f"Gain moyen : x{speedup:.1f}"))
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({'operation': operation, 'iterations': iterations, 'results': results}, fh, indent=2)
+
+    def _run(self, client_factory, operation, iterations):
+        samples = []
+        for _ in range(iterations):
+            start = time.perf_counter()
+            client = client_factory()
+            if operation == 'head':
+                client.head_object(Bucket=BENCH_BUCKET, Key=BENCH_KEY)
+            else:
+                client.generate_presigned_url(
+                    'get_object',
+                    Params={'Bucket': BENCH_BUCKET, 'Key': BENCH_KEY},
+                    ExpiresIn=3600,
+                )
+            samples.append((time.perf_counter() - start) * 1000)
+        return summarize(samples)
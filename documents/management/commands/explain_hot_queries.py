@@ -0,0 +1,74 @@
+# documents/management/commands/explain_hot_queries.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from accounts.models import User
+from documents import queries, search
+from documents.models import Document, DocumentAccess
+from documents.pagination import created_at_cursor_filter, encode_cursor
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche le plan d'exécution (EXPLAIN) de chaque requête des endpoints chauds, "
+        "pour détecter une régression d'index."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--email', help="Utilisateur servant d'exemple (défaut : celui qui a le plus d'accès)")
+        parser.add_argument('--analyze', action='store_true', help="EXPLAIN ANALYZE (PostgreSQL uniquement)")
+
+    def handle(self, *args, **options):
+        user = self._sample_user(options['email'])
+        access = DocumentAccess.objects.filter(user=user).order_by().first()
+        if access is None:
+            raise CommandError(f"{user.email} n'a accès à aucun document")
+        doc = Document.objects.get(id=access.document_id)
+        cursor = encode_cursor(doc.created_at.isoformat(), doc.id)
+
+        hot_queries = [
+            ('list_documents (1re page)', queries.accessible_document_rows(user)[:101]),
+            ('list_documents (curseur)', queries.accessible_document_rows(user).filter(
+                created_at_cursor_filter(cursor, 'document__created_at', 'document_id')
+            )[:101]),
+            ('download_document', queries.download_rows(user, [doc.id])),
+            ('share_document (accès existants)', DocumentAccess.objects.filter(
+                document=doc, user_id__in=[user.id]
+            ).values_list('user_id', flat=True)),
+            ('share_document (destinataires)', User.objects.filter(
+                id__in=[user.id]
+            ).values_list('id', flat=True)),
+            ('documents du propriétaire', Document.objects.filter(
+                uploaded_by=doc.uploaded_by_id
+            ).order_by('-created_at')[:100]),
+            ('search_documents', search.search_document_rows(
+                user, terms=search.parse_terms(doc.filename)[:1]
+            )[:101]),
+            ('list_users (legacy)', User.objects.exclude(id=user.id).values('id', 'email', 'public_key')),
+            ('list_users (recherche par préfixe)', queries.directory_users(
+                user, user.email[:3]
+            ).values('id', 'email')[:101]),
+        ]
+
+        explain_options = {}
+        if options['analyze']:
+            if connection.vendor != 'postgresql':
+                raise CommandError("--analyze n'est disponible que sur PostgreSQL")
+            explain_options = {'analyze': True, 'buffers': True}
+
+        for name, queryset in hot_queries:
+            self.stdout.write(self.style.MIGRATE_HEADING(f"== {name}"))
+            self.stdout.write(queryset.explain(**explain_options))
+            self.stdout.write('')
+
+    def _sample_user(self, email):
+        if email:
+            try:
+                return User.objects.get(email=email)
+            except User.DoesNotExist:
+                raise CommandError(f"Utilisateur introuvable : {email}")
+        from django.db.models import Count
+        user = User.objects.annotate(n=Count('documentaccess')).order_by('-n').first()
+        if user is None:
+            raise CommandError("Aucun utilisateur en base")
+        return user
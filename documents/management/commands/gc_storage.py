@@ -0,0 +1,150 @@
+# documents/management/commands/gc_storage.py
+from datetime import timedelta
+
+from botocore.exceptions import ClientError
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from documents import storage
+from documents.models import Document, MultipartUpload
+
+
+class Command(BaseCommand):
+    help = (
+        "Supprime du bucket les objets qu'aucun Document ne référence "
+        "(uploads jamais confirmés, suppressions antérieures à la file de tâches) "
+        "et abandonne les uploads multipart restés inachevés."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grace-hours', type=float, default=24,
+            help="Âge minimal d'un objet pour être supprimé (uploads en cours ; défaut 24)",
+        )
+        parser.add_argument(
+            '--multipart-grace-hours', type=float, default=168,
+            help="Âge à partir duquel un upload multipart inachevé est abandonné (défaut 168)",
+        )
+        parser.add_argument('--prefix', default='', help="Limiter le parcours à ce préfixe de clé")
+        parser.add_argument('--dry-run', action='store_true', help="Lister les orphelins sans les supprimer")
+        parser.add_argument(
+            '--lookup-chunk', type=int, default=1000,
+            help="Clés vérifiées par requête SQL (IN)",
+        )
+        parser.add_argument(
+            '--delete-batch', type=int, default=storage.DELETE_OBJECTS_MAX_KEYS,
+            help="Clés par appel DeleteObjects (1000 au plus)",
+        )
+
+    def handle(self, *args, **options):
+        if not storage.is_configured():
+            raise CommandError("Stockage objet non configuré")
+        if not 1 <= options['delete_batch'] <= storage.DELETE_OBJECTS_MAX_KEYS:
+            raise CommandError(f"--delete-batch doit être entre 1 et {storage.DELETE_OBJECTS_MAX_KEYS}")
+        if options['grace_hours'] * 3600 < storage.UPLOAD_URL_EXPIRES:
+            # Un client peut encore envoyer un objet avec une URL signée non expirée
+            raise CommandError(
+                f"--grace-hours doit couvrir la validité des URL d'upload ({storage.UPLOAD_URL_EXPIRES} s)"
+            )
+        if options['lookup_chunk'] < 1:
+            raise CommandError("--lookup-chunk doit être >= 1")
+
+        self.dry_run = options['dry_run']
+        self.verbosity = options['verbosity']
+        self.stats = dict.fromkeys(
+            (
+                'scanned', 'recent', 'referenced', 'orphans', 'orphan_bytes', 'deleted',
+                'stale_uploads', 'errors',
+            ), 0
+        )
+        cutoff = timezone.now() - timedelta(hours=options['grace_hours'])
+        chunk_size = options['lookup_chunk']
+        batch_size = options['delete_batch']
+
+        # Mémoire bornée : une page de listing et un lot de suppression à la fois
+        batch = []
+        for page in storage.iter_object_pages(options['prefix']):
+            self.stats['scanned'] += len(page)
+            old = [obj for obj in page if obj['LastModified'] < cutoff]
+            self.stats['recent'] += len(page) - len(old)
+
+            for i in range(0, len(old), chunk_size):
+                chunk = old[i:i + chunk_size]
+                referenced = set(
+                    Document.objects.filter(
+                        storage_path__in=[obj['Key'] for obj in chunk]
+                    ).values_list('storage_path', flat=True)
+                )
+                for obj in chunk:
+                    if obj['Key'] in referenced:
+                        self.stats['referenced'] += 1
+                        continue
+                    self.stats['orphans'] += 1
+                    self.stats['orphan_bytes'] += obj.get('Size', 0)
+                    batch.append(obj['Key'])
+                    if len(batch) >= batch_size:
+                        self._delete(batch)
+                        batch = []
+        if batch:
+            self._delete(batch)
+
+        multipart_cutoff = timezone.now() - timedelta(hours=options['multipart_grace_hours'])
+        self._abort_stale_multipart(options['prefix'], multipart_cutoff, batch_size)
+
+        stats = self.stats
+        action = "à supprimer" if self.dry_run else "supprimés"
+        self.stdout.write(
+            f"{stats['scanned']} objets parcourus : {stats['referenced']} référencés, "
+            f"{stats['recent']} récents (délai de grâce), {stats['orphans']} orphelins "
+            f"({stats['orphan_bytes'] / 1024 / 1024:.1f} Mo)"
+        )
+        done = stats['orphans'] if self.dry_run else stats['deleted']
+        style = self.style.ERROR if stats['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f"{done} objets {action}, {stats['stale_uploads']} uploads multipart inachevés "
+            f"{'à abandonner' if self.dry_run else 'abandonnés'}, {stats['errors']} erreurs"
+        ))
+
+    def _delete(self, keys):
+        if self.verbosity >= 2:
+            for key in keys:
+                self.stdout.write(f"  orphelin : {key}")
+        if self.dry_run:
+            return
+        errors = storage.delete_objects(keys)
+        for key, code in errors:
+            self.stderr.write(f"Suppression impossible : {key} ({code})")
+        self.stats['errors'] += len(errors)
+        self.stats['deleted'] += len(keys) - len(errors)
+
+    def _abort_stale_multipart(self, prefix, cutoff, batch_size):
+        """
+        Les parties d'un upload multipart jamais terminé ne sont pas visibles
+        dans list_objects_v2 mais occupent de l'espace : on les abandonne.
+        """
+        aborted = []
+        for upload in storage.iter_multipart_uploads(prefix):
+            if upload['Initiated'] >= cutoff:
+                continue
+            self.stats['stale_uploads'] += 1
+            if self.verbosity >= 2:
+                self.stdout.write(f"  upload inachevé : {upload['Key']}")
+            if self.dry_run:
+                continue
+            try:
+                storage.abort_multipart_upload(upload['Key'], upload['UploadId'])
+            except ClientError as e:
+                self.stderr.write(f"Abandon impossible : {upload['Key']} ({e})")
+                self.stats['errors'] += 1
+                continue
+            aborted.append(upload['UploadId'])
+            if len(aborted) >= batch_size:
+                self._mark_aborted(aborted)
+                aborted = []
+        if aborted:
+            self._mark_aborted(aborted)
+
+    def _mark_aborted(self, s3_upload_ids):
+        MultipartUpload.objects.filter(
+            s3_upload_id__in=s3_upload_ids, status=MultipartUpload.PENDING
+        ).update(status=MultipartUpload.ABORTED)
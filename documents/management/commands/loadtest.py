@@ -0,0 +1,64 @@
+# documents/management/commands/loadtest.py
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from documents.bench.loadgen import run_load
+
+
+class Command(BaseCommand):
+    help = (
+        "Test de charge d'un ou plusieurs déploiements sur le même endpoint. "
+        "Ex. comparer gunicorn sync et uvicorn ASGI :\n"
+        "  manage.py loadtest --target sync=http://localhost:8000/api/documents/upload/confirm/ "
+        "--target async=http://localhost:8001/api/async/documents/upload/confirm/ "
+        "--method POST --body '{...}' --token <JWT> --concurrency 50 --requests 2000"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--target', action='append', required=True,
+            help="nom=URL (répétable) ; chaque cible reçoit la même charge",
+        )
+        parser.add_argument('--method', default='GET')
+        parser.add_argument('--body', help="Corps JSON de la requête")
+        parser.add_argument('--token', help="Access token JWT (en-tête Authorization: Bearer)")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--json', dest='json_path', help="Écrit les résultats dans ce fichier")
+
+    def handle(self, *args, **options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f"Bearer {options['token']}"
+
+        results = {}
+        for target in options['target']:
+            name, sep, url = target.partition('=')
+            if not sep or not url:
+                raise CommandError(f"--target attendu au format nom=URL : {target}")
+            self.stdout.write(f"{name}: {options['requests']} requêtes, {options['concurrency']} en parallèle…")
+            results[name] = run_load(
+                url,
+                method=options['method'].upper(),
+                body=options['body'],
+                headers=headers,
+                concurrency=options['concurrency'],
+                requests=options['requests'],
+            )
+
+        for name, summary in results.items():
+            self.stdout.write(
+                f"{name:<12} {summary.get('throughput_rps', 0)} req/s "
+                f"p50={summary.get('p50_ms')}ms p90={summary.get('p90_ms')}ms "
+                f"p99={summary.get('p99_ms')}ms statuts={summary.get('statuses')}"
+            )
+
+        if options['json_path']:
+            with open(options['json_path'], 'w') as fh:
+                json.dump({
+                    'method': options['method'].upper(),
+                    'concurrency': options['concurrency'],
+                    'requests': options['requests'],
+                    'results': results,
+                }, fh, indent=2)
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.18 on 2026-10-18 10:39
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0002_document_mime_type'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        # Index composites d'abord, puis suppression des index FK devenus redondants
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['uploaded_by', '-created_at'], name='document_owner_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='document',
+            index=models.Index(fields=['-created_at', '-id'], name='document_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='documentaccess',
+            index=models.Index(fields=['user', 'document'], include=('encrypted_aes_key',), name='docaccess_user_doc_idx'),
+        ),
+        migrations.AlterField(
+            model_name='document',
+            name='uploaded_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='documentaccess',
+            name='user',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+
+# DDL figé ici (et non importé de documents.search) : l'historique des
+# migrations ne doit pas dépendre du code de l'application.
+
+PG_INDEX = 'document_search_idx'
+PG_VECTOR = (
+    "to_tsvector('simple'::regconfig, regexp_replace("
+    "coalesce(filename, '') || ' ' || coalesce(mime_type, ''), "
+    "'[^[:alnum:]]+', ' ', 'g'))"
+)
+
+# SQLite : table FTS5 dont le rowid est l'INTEGER PRIMARY KEY de
+# documents_document_fts_key (stable, contrairement au rowid implicite
+# de documents_document qu'un VACUUM peut renuméroter)
+SQLITE_CREATE = [
+    'CREATE TABLE IF NOT EXISTS documents_document_fts_key ('
+    'id INTEGER PRIMARY KEY AUTOINCREMENT, document_id char(32) NOT NULL UNIQUE)',
+    "CREATE VIRTUAL TABLE IF NOT EXISTS documents_document_fts USING fts5("
+    "filename, mime_type, tokenize='unicode61 remove_diacritics 2')",
+    'CREATE TRIGGER IF NOT EXISTS documents_document_fts_ai AFTER INSERT ON documents_document BEGIN '
+    'INSERT INTO documents_document_fts_key(document_id) VALUES (new.id); '
+    'INSERT INTO documents_document_fts(rowid, filename, mime_type) VALUES ('
+    '(SELECT id FROM documents_document_fts_key WHERE document_id = new.id), new.filename, new.mime_type); END',
+    'CREATE TRIGGER IF NOT EXISTS documents_document_fts_ad AFTER DELETE ON documents_document BEGIN '
+    'DELETE FROM documents_document_fts WHERE rowid = '
+    '(SELECT id FROM documents_document_fts_key WHERE document_id = old.id); '
+    'DELETE FROM documents_document_fts_key WHERE document_id = old.id; END',
+    'CREATE TRIGGER IF NOT EXISTS documents_document_fts_au AFTER UPDATE OF filename, mime_type '
+    'ON documents_document BEGIN '
+    'UPDATE documents_document_fts SET filename = new.filename, mime_type = new.mime_type WHERE rowid = '
+    '(SELECT id FROM documents_document_fts_key WHERE document_id = old.id); END',
+    'INSERT INTO documents_document_fts_key(document_id) SELECT id FROM documents_document',
+    'INSERT INTO documents_document_fts(rowid, filename, mime_type) '
+    'SELECT k.id, d.filename, d.mime_type FROM documents_document d '
+    'JOIN documents_document_fts_key k ON k.document_id = d.id',
+]
+
+SQLITE_DROP = [
+    'DROP TRIGGER IF EXISTS documents_document_fts_ai',
+    'DROP TRIGGER IF EXISTS documents_document_fts_ad',
+    'DROP TRIGGER IF EXISTS documents_document_fts_au',
+    'DROP TABLE IF EXISTS documents_document_fts',
+    'DROP TABLE IF EXISTS documents_document_fts_key',
+]
+
+
+def create_index(apps, schema_editor):
+    # PostgreSQL : index GIN sur to_tsvector(filename, mime_type) ;
+    # SQLite : table FTS5 + triggers (cf. documents/search.py)
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {PG_INDEX} ON documents_document USING GIN (({PG_VECTOR}))'
+        )
+    elif vendor == 'sqlite':
+        for sql in SQLITE_CREATE:
+            schema_editor.execute(sql)
+
+
+def drop_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(f'DROP INDEX IF EXISTS {PG_INDEX}')
+    elif vendor == 'sqlite':
+        for sql in SQLITE_DROP:
+            schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0007_blob_dedup'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_index, drop_index),
+    ]
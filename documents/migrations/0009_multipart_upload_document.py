@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0008_document_search_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='multipartupload',
+            name='document_id',
+            field=models.UUIDField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='multipartupload',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En cours'), ('completed', 'Terminé'), ('confirmed', 'Confirmé'), ('aborted', 'Abandonné')], default='pending', max_length=10),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 11:48
+
+import documents.models
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documents', '0010_event_stream_ticket'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='documentchange',
+            name='docchange_user_seq_idx',
+        ),
+        migrations.AddField(
+            model_name='documentchange',
+            name='txid',
+            field=models.BigIntegerField(db_default=documents.models.CurrentTransactionId(), editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='documentchange',
+            index=models.Index(fields=['user', 'txid', 'id'], name='docchange_user_txid_seq_idx'),
+        ),
+    ]
@@ -11,25 +11,150 @@ class Category(models.Model):
     def __str__(self):
         return self.name
 
+class Blob(models.Model):
+    """
+    Objet chiffré partagé par les documents d'un même propriétaire ayant le
+    même contenu (file_hash), en mode déduplication (DOCUMENTS_DEDUP).
+    ref_count : nombre de Document qui y font référence ; l'objet n'est
+    supprimé du stockage qu'avec le dernier.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False, related_name='+')
+    file_hash = models.CharField(max_length=64)
+    storage_path = models.CharField(max_length=512)
+    ref_count = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # Un seul objet par contenu et par propriétaire (sert aussi d'index de recherche)
+            models.UniqueConstraint(fields=['owner', 'file_hash'], name='blob_owner_hash_uniq'),
+        ]
+
+    def __str__(self):
+        return f'{self.storage_path} ({self.ref_count})'
+
 class Document(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     filename = models.CharField(max_length=255)
     storage_path = models.CharField(max_length=512)  # ex: secure-docs/abc123.enc
     file_hash = models.CharField(max_length=64)      # SHA-256
     signature = models.TextField()                   # Base64
-    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexé par document_owner_created_idx (uploaded_by en tête)
+    uploaded_by = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True)
     mime_type = models.CharField(max_length=100, blank=True)
+    # Objet partagé (déduplication) ; None : objet propre au document
+    blob = models.ForeignKey(Blob, on_delete=models.SET_NULL, null=True, blank=True, related_name='documents')
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Documents d'un propriétaire, du plus récent au plus ancien
+            models.Index(fields=['uploaded_by', '-created_at'], name='document_owner_created_idx'),
+            # Tri / pagination par curseur (created_at, id)
+            models.Index(fields=['-created_at', '-id'], name='document_created_id_idx'),
+            # Recherche par clé d'objet (gc_storage, vérification des uploads)
+            models.Index(fields=['storage_path'], name='document_storage_path_idx'),
+        ]
+
     def __str__(self):
         return self.filename
 
 class DocumentAccess(models.Model):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     document = models.ForeignKey(Document, on_delete=models.CASCADE, related_name='accesses')
-    user = models.ForeignKey(User, on_delete=models.CASCADE)
+    # Indexé par docaccess_user_doc_idx (user en tête)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, db_index=False)
     encrypted_aes_key = models.TextField()  # Clé AES chiffrée avec clé publique de user
 
     class Meta:
-        unique_together = ('document', 'user')
\ No newline at end of file
+        unique_together = ('document', 'user')
+        indexes = [
+            # Accès d'un utilisateur (listing, téléchargement) ; sur PostgreSQL la clé
+            # AES chiffrée est incluse dans l'index (index-only scan)
+            models.Index(
+                fields=['user', 'document'],
+                include=['encrypted_aes_key'],
+                name='docaccess_user_doc_idx',
+            ),
+        ]
+
+class CurrentTransactionId(models.Func):
+    """
+    Identifiant (64 bits) de la transaction qui écrit la ligne sous PostgreSQL ;
+    0 ailleurs (SQLite sérialise les écritures : l'ordre des id suffit).
+    """
+    template = '0'
+    output_field = models.BigIntegerField()
+
+    def as_postgresql(self, compiler, connection, **extra_context):
+        return 'pg_current_xact_id()::text::bigint', []
+
+
+class DocumentChange(models.Model):
+    """
+    Journal des changements visibles par un utilisateur, pour la synchronisation
+    incrémentale : la position d'un changement est (txid, id), dans l'ordre de
+    validation des transactions (cf. queries.document_changes).
+    Pas de FK vers Document : l'entrée doit survivre à sa suppression (tombstone).
+    """
+    UPSERT = 'upsert'
+    REMOVED = 'removed'
+    KIND_CHOICES = [(UPSERT, 'Ajouté ou partagé'), (REMOVED, 'Supprimé ou retiré')]
+
+    id = models.BigAutoField(primary_key=True)
+    # Sans contrainte ni cascade : le journal n'empêche pas la suppression d'un utilisateur
+    user = models.ForeignKey(
+        User, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+'
+    )
+    document_id = models.UUIDField()
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    created_at = models.DateTimeField(auto_now_add=True)
+    # Renseigné par la base, y compris pour les bulk_create
+    txid = models.BigIntegerField(db_default=CurrentTransactionId(), editable=False)
+
+    class Meta:
+        indexes = [
+            # Changements d'un utilisateur après une position (txid, id)
+            models.Index(fields=['user', 'txid', 'id'], name='docchange_user_txid_seq_idx'),
+        ]
+
+
+class MultipartUpload(models.Model):
+    """
+    Upload multipart S3 en cours pour un utilisateur : relie l'identifiant
+    exposé au client à l'UploadId S3, que seul son propriétaire peut utiliser.
+    """
+    PENDING = 'pending'
+    COMPLETED = 'completed'
+    CONFIRMED = 'confirmed'
+    ABORTED = 'aborted'
+    STATUS_CHOICES = [
+        (PENDING, 'En cours'), (COMPLETED, 'Terminé'), (CONFIRMED, 'Confirmé'), (ABORTED, 'Abandonné'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    filename = models.CharField(max_length=255)
+    storage_path = models.CharField(max_length=512)
+    s3_upload_id = models.CharField(max_length=1024)
+    part_size = models.PositiveBigIntegerField()
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    created_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    # Document créé par confirm_upload (statut CONFIRMED) : un upload n'est confirmé qu'une fois
+    document_id = models.UUIDField(null=True, blank=True)
+
+    def __str__(self):
+        return f'{self.filename} ({self.status})'
+
+
+class EventStreamTicket(models.Model):
+    """
+    Ticket d'ouverture du flux SSE (EventSource n'envoie pas d'en-tête
+    Authorization) : court, à usage unique, seul son SHA-256 est stocké.
+    """
+    digest = models.CharField(max_length=64, primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    expires_at = models.DateTimeField(db_index=True)
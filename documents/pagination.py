@@ -0,0 +1,77 @@
+# documents/pagination.py
+import base64
+import binascii
+import json
+import uuid
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(*values):
+    """
+    Encode les valeurs de la dernière ligne d'une page en curseur opaque.
+    """
+    raw = json.dumps([str(value) for value in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, size):
+    """
+    Décode un curseur produit par encode_cursor ; lève InvalidCursor s'il est mal formé.
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, ValueError, UnicodeDecodeError):
+        raise InvalidCursor(cursor)
+    # encode_cursor ne produit que des chaînes : tout autre type est un curseur forgé
+    if not isinstance(values, list) or len(values) != size or not all(isinstance(v, str) for v in values):
+        raise InvalidCursor(cursor)
+    return values
+
+
+def parse_page_size(value, default=DEFAULT_PAGE_SIZE, maximum=MAX_PAGE_SIZE):
+    """
+    Valide le paramètre "limit" ; lève ValueError si ce n'est pas un entier positif.
+    """
+    if value in (None, ''):
+        return default
+    size = int(value)
+    if size <= 0:
+        raise ValueError(value)
+    return min(size, maximum)
+
+
+def created_at_cursor_filter(cursor, created_at_field='created_at', id_field='id'):
+    """
+    Filtre keyset pour un tri (created_at DESC, id DESC) à partir d'un curseur.
+    """
+    created_at, pk = decode_cursor(cursor, 2)
+    created_at = parse_datetime(created_at)
+    try:
+        pk = uuid.UUID(pk)
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if created_at is None:
+        raise InvalidCursor(cursor)
+    return (
+        Q(**{f'{created_at_field}__lt': created_at})
+        | Q(**{created_at_field: created_at, f'{id_field}__lt': pk})
+    )
+
+
+def ascending_cursor_filter(cursor, field):
+    """
+    Filtre keyset pour un tri ascendant sur un champ unique (ex. email).
+    """
+    value, = decode_cursor(cursor, 1)
+    return Q(**{f'{field}__gt': value})
@@ -0,0 +1,115 @@
+# documents/queries.py
+"""
+Requêtes des endpoints chauds, partagées par les vues et par la commande
+explain_hot_queries (qui affiche leurs plans d'exécution).
+"""
+from django.db import connection
+from django.db.models import F, Q
+from django.db.models.functions import Lower
+
+from accounts.models import User
+from documents.models import DocumentAccess, DocumentChange
+
+
+# Champs exposés par list_users (?fields=...)
+USER_DIRECTORY_FIELDS = ('id', 'email', 'public_key', 'key_version')
+
+
+def accessible_document_rows(user):
+    """
+    Une seule requête : documents accessibles + catégorie + uploader
+    + clé AES chiffrée de l'utilisateur, triés du plus récent au plus ancien.
+    """
+    return DocumentAccess.objects.filter(user=user).values(
+        'encrypted_aes_key',
+        doc_id=F('document_id'),
+        filename=F('document__filename'),
+        mime_type=F('document__mime_type'),
+        file_hash=F('document__file_hash'),
+        signature=F('document__signature'),
+        storage_path=F('document__storage_path'),
+        created_at=F('document__created_at'),
+        category_name=F('document__category__name'),
+        uploader_email=F('document__uploaded_by__email'),
+        uploader_public_key=F('document__uploaded_by__public_key'),
+    ).order_by('-document__created_at', '-document_id')
+
+
+def download_rows(user, document_ids):
+    """
+    Une seule requête DocumentAccess pour un ou plusieurs documents :
+    ne retourne que ceux auxquels l'utilisateur a accès.
+    """
+    return DocumentAccess.objects.filter(
+        user=user, document_id__in=document_ids
+    ).values(
+        'encrypted_aes_key',
+        doc_id=F('document_id'),
+        filename=F('document__filename'),
+        mime_type=F('document__mime_type'),
+        file_hash=F('document__file_hash'),
+        signature=F('document__signature'),
+        storage_path=F('document__storage_path'),
+        created_at=F('document__created_at'),
+        uploader_email=F('document__uploaded_by__email'),
+        uploader_public_key=F('document__uploaded_by__public_key'),
+    )
+
+
+def directory_users(user, prefix=None):
+    """
+    Utilisateurs autres que `user`, triés par email (pagination par curseur).
+    prefix : recherche par début d'email, insensible à la casse ; sur
+    PostgreSQL elle utilise l'index accounts_user_email_lower_prefix_idx.
+    """
+    users = User.objects.exclude(id=user.id)
+    if prefix:
+        users = users.annotate(email_lower=Lower('email')).filter(
+            email_lower__startswith=prefix.lower()
+        )
+    return users.order_by('email')
+
+
+def sync_watermark():
+    """
+    PostgreSQL : plus petit identifiant de transaction encore en cours
+    (xmin du snapshot). Toute transaction d'identifiant inférieur est validée
+    ou annulée ; toute transaction validée plus tard aura un identifiant
+    supérieur ou égal. None ailleurs : SQLite sérialise les écritures, l'ordre
+    des id est celui des validations.
+    """
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint')
+        return cursor.fetchone()[0]
+
+
+def _settled_changes(user, watermark):
+    changes = DocumentChange.objects.filter(user=user)
+    if watermark is not None:
+        changes = changes.filter(txid__lt=watermark)
+    return changes
+
+
+def document_changes(user, after, watermark):
+    """
+    Journal de synchronisation de l'utilisateur après la position `after`
+    (txid, id), dans l'ordre de validation (index docchange_user_txid_seq_idx).
+    Les changements de transactions pas encore terminées (txid >= watermark)
+    ne sont pas servis : ils apparaîtront après la position retournée.
+    """
+    txid, seq = after
+    return _settled_changes(user, watermark).filter(
+        Q(txid__gt=txid) | Q(txid=txid, id__gt=seq)
+    ).order_by('txid', 'id').values_list('txid', 'id', 'document_id')
+
+
+def latest_change_position(user, watermark):
+    """
+    Dernière position (txid, id) de l'utilisateur parmi les transactions
+    terminées ((0, 0) si aucune).
+    """
+    return _settled_changes(user, watermark).order_by('-txid', '-id').values_list(
+        'txid', 'id'
+    ).first() or (0, 0)
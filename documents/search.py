@@ -0,0 +1,229 @@
+# documents/search.py
+"""
+Recherche dans les documents accessibles (nom de fichier, type MIME,
+catégorie, uploader, dates), en une seule requête classée et paginée.
+
+Index plein texte sur filename + mime_type :
+  - PostgreSQL : index GIN sur l'expression to_tsvector (PG_VECTOR), créé
+    par la migration 0008 ; la requête reprend exactement la même expression
+    pour que le planificateur l'utilise ;
+  - SQLite (tests, développement) : table FTS5 tenue à jour par des
+    triggers ; son rowid est l'INTEGER PRIMARY KEY d'une table de
+    correspondance avec Document.id (le rowid implicite d'une table à clé
+    UUID peut être renuméroté par VACUUM) ;
+  - autres bases : filename__icontains, sans classement.
+
+Les termes sont recherchés par préfixe ("rapp" trouve "rapport_2024.pdf").
+"""
+import math
+import re
+import uuid
+from datetime import datetime, time
+
+from django.db import connection, connections
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from documents.models import Document
+from documents.pagination import created_at_cursor_filter, decode_cursor, encode_cursor, InvalidCursor
+from documents.queries import accessible_document_rows
+
+
+MAX_TERMS = 8
+
+PG_INDEX = 'document_search_idx'
+FTS_TABLE = 'documents_document_fts'
+FTS_KEY_TABLE = 'documents_document_fts_key'
+
+DOCUMENT_TABLE = Document._meta.db_table
+
+# Ponctuation (., _, -, /) remplacée par des espaces : "rapport_2024.pdf" -> rapport, 2024, pdf.
+# Même expression que l'index de la migration 0008.
+PG_VECTOR = (
+    "to_tsvector('simple'::regconfig, regexp_replace("
+    "coalesce({table}filename, '') || ' ' || coalesce({table}mime_type, ''), "
+    "'[^[:alnum:]]+', ' ', 'g'))"
+)
+
+# Triggers SQLite (identiques à la migration 0008), recréés par repair_sqlite_index()
+_FTS_ROWID = f"(SELECT id FROM {FTS_KEY_TABLE} WHERE document_id = {{row}}.id)"
+SQLITE_TRIGGERS_SQL = [
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ai AFTER INSERT ON {DOCUMENT_TABLE} BEGIN "
+    f"INSERT INTO {FTS_KEY_TABLE}(document_id) VALUES (new.id); "
+    f"INSERT INTO {FTS_TABLE}(rowid, filename, mime_type) "
+    f"VALUES ({_FTS_ROWID.format(row='new')}, new.filename, new.mime_type); END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_ad AFTER DELETE ON {DOCUMENT_TABLE} BEGIN "
+    f"DELETE FROM {FTS_TABLE} WHERE rowid = {_FTS_ROWID.format(row='old')}; "
+    f"DELETE FROM {FTS_KEY_TABLE} WHERE document_id = old.id; END",
+    f"CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_au AFTER UPDATE OF filename, mime_type ON {DOCUMENT_TABLE} BEGIN "
+    f"UPDATE {FTS_TABLE} SET filename = new.filename, mime_type = new.mime_type "
+    f"WHERE rowid = {_FTS_ROWID.format(row='old')}; END",
+]
+
+SQLITE_REINDEX_SQL = [
+    f"DELETE FROM {FTS_TABLE}",
+    f"DELETE FROM {FTS_KEY_TABLE}",
+    f"INSERT INTO {FTS_KEY_TABLE}(document_id) SELECT id FROM {DOCUMENT_TABLE}",
+    f"INSERT INTO {FTS_TABLE}(rowid, filename, mime_type) "
+    f"SELECT k.id, d.filename, d.mime_type FROM {DOCUMENT_TABLE} d "
+    f"JOIN {FTS_KEY_TABLE} k ON k.document_id = d.id",
+]
+
+
+class InvalidSearch(ValueError):
+    pass
+
+
+#------------------------------------------ Index ------------------------------------------
+def repair_sqlite_index(using):
+    """
+    Sur SQLite, une migration qui modifie documents_document recrée la table
+    (copie + DROP) : ses triggers disparaissent. Appelé après chaque
+    migrate : si l'index existe sans ses triggers, les recrée et réindexe.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        cursor.execute(
+            "SELECT name FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [FTS_TABLE, f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'],
+        )
+        found = {name for name, in cursor.fetchall()}
+        if FTS_TABLE not in found or len(found) == 4:
+            return
+        for sql in SQLITE_TRIGGERS_SQL + SQLITE_REINDEX_SQL:
+            cursor.execute(sql)
+
+
+#------------------------------------------ Requête ------------------------------------------
+def parse_terms(q):
+    """
+    Termes alphanumériques de la saisie (au plus MAX_TERMS), en minuscules.
+    """
+    return [term.lower() for term in re.findall(r'[^\W_]+', q or '')][:MAX_TERMS]
+
+
+def _parse_bound(value):
+    parsed = parse_datetime(value)
+    if parsed is None:
+        day = parse_date(value)
+        if day is None:
+            raise InvalidSearch(value)
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        parsed = timezone.make_aware(parsed)
+    return parsed
+
+
+def parse_filters(params):
+    """
+    Paramètres de requête -> arguments de search_document_rows().
+    Lève InvalidSearch pour une catégorie ou une date mal formée.
+    """
+    try:
+        filters = {
+            'terms': parse_terms(params.get('q')),
+            'category_id': uuid.UUID(params['category']) if params.get('category') else None,
+            'uploader': params.get('uploader') or None,
+            'mime_type': params.get('mime_type') or None,
+            'created_after': _parse_bound(params['created_after']) if params.get('created_after') else None,
+            'created_before': _parse_bound(params['created_before']) if params.get('created_before') else None,
+        }
+    except ValueError as e:
+        raise InvalidSearch(str(e))
+    return filters
+
+
+def _full_text(terms):
+    """
+    (condition, score) pour la base courante ; score plus élevé = plus pertinent.
+    """
+    if connection.vendor == 'postgresql':
+        vector = PG_VECTOR.format(table=f'"{DOCUMENT_TABLE}".')
+        query = ' & '.join(f'{term}:*' for term in terms)
+        return (
+            RawSQL(f"{vector} @@ to_tsquery('simple', %s)", [query], output_field=BooleanField()),
+            # float8 : le score revient tel quel dans le curseur (égalité exacte)
+            RawSQL(f"ts_rank({vector}, to_tsquery('simple', %s))::float8", [query], output_field=FloatField()),
+        )
+    if connection.vendor == 'sqlite':
+        query = ' '.join(f'"{term}"*' for term in terms)
+        return (
+            RawSQL(
+                f'"{DOCUMENT_TABLE}"."id" IN (SELECT k.document_id FROM {FTS_TABLE} '
+                f'JOIN {FTS_KEY_TABLE} k ON k.id = {FTS_TABLE}.rowid WHERE {FTS_TABLE} MATCH %s)',
+                [query], output_field=BooleanField(),
+            ),
+            RawSQL(
+                f'(SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+                f'JOIN {FTS_KEY_TABLE} k ON k.id = {FTS_TABLE}.rowid '
+                f'WHERE {FTS_TABLE} MATCH %s AND k.document_id = "{DOCUMENT_TABLE}"."id")',
+                [query], output_field=FloatField(),
+            ),
+        )
+    condition = Q()
+    for term in terms:
+        condition &= Q(document__filename__icontains=term)
+    return condition, Value(0.0, output_field=FloatField())
+
+
+def search_document_rows(user, terms=(), category_id=None, uploader=None, mime_type=None,
+                         created_after=None, created_before=None):
+    """
+    Documents accessibles par `user` (mêmes colonnes que list_documents)
+    filtrés par métadonnées ; avec des termes, annotés d'un score "rank" et
+    triés par pertinence, sinon du plus récent au plus ancien.
+    created_after est inclusif, created_before exclusif.
+    """
+    rows = accessible_document_rows(user)
+    if category_id is not None:
+        rows = rows.filter(document__category_id=category_id)
+    if uploader:
+        rows = rows.filter(document__uploaded_by__email__iexact=uploader)
+    if mime_type:
+        rows = rows.filter(document__mime_type__startswith=mime_type)
+    if created_after is not None:
+        rows = rows.filter(document__created_at__gte=created_after)
+    if created_before is not None:
+        rows = rows.filter(document__created_at__lt=created_before)
+    if terms:
+        condition, score = _full_text(terms)
+        rows = rows.annotate(rank=score).filter(condition).order_by(
+            '-rank', '-document__created_at', '-document_id'
+        )
+    return rows
+
+
+def ranked_cursor_filter(cursor):
+    """
+    Filtre keyset pour le tri (rank DESC, created_at DESC, id DESC).
+    """
+    rank, created_at, pk = decode_cursor(cursor, 3)
+    try:
+        rank = float(rank)
+        pk = uuid.UUID(pk)
+        created_at = parse_datetime(created_at)
+    except ValueError:
+        raise InvalidCursor(cursor)
+    if created_at is None or not math.isfinite(rank):
+        raise InvalidCursor(cursor)
+    return (
+        Q(rank__lt=rank)
+        | Q(rank=rank, document__created_at__lt=created_at)
+        | Q(rank=rank, document__created_at=created_at, document_id__lt=pk)
+    )
+
+
+def cursor_filter(cursor, ranked):
+    if ranked:
+        return ranked_cursor_filter(cursor)
+    return created_at_cursor_filter(cursor, 'document__created_at', 'document_id')
+
+
+def next_cursor(row, ranked):
+    if ranked:
+        return encode_cursor(row['rank'], row['created_at'].isoformat(), row['doc_id'])
+    return encode_cursor(row['created_at'].isoformat(), row['doc_id'])
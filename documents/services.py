@@ -0,0 +1,361 @@
+# documents/services.py
+import math
+import uuid
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from accounts.models import User
+from documents import blobs, events, storage, tasks
+from documents.models import Category, Document, DocumentAccess, DocumentChange, MultipartUpload
+
+
+SHARE_BATCH_SIZE = 500
+
+ADDED = 'added'
+ALREADY_SHARED = 'already_shared'
+UNKNOWN_USER = 'unknown_user'
+INVALID = 'invalid'
+
+STORAGE_PATH_TAKEN = 'storage_path déjà utilisé par un autre document'
+
+
+def parse_user_id(value):
+    """
+    Convertit un identifiant reçu du client vers le type de la clé primaire User.
+    """
+    if value is None or isinstance(value, (bool, dict, list)):
+        return None
+    try:
+        return User._meta.pk.to_python(value)
+    except ValidationError:
+        return None
+
+
+def record_changes(pairs, kind=DocumentChange.UPSERT, event=events.SHARED):
+    """
+    Ajoute au journal de synchronisation un changement par (user_id, document_id)
+    et notifie les utilisateurs concernés (après validation de la transaction).
+    Les créations/suppressions unitaires passent par les signaux
+    (documents/signals.py) ; les bulk_create, qui n'en émettent pas, appellent
+    cette fonction dans leur transaction.
+    """
+    pairs = list(pairs)
+    if not pairs:
+        return
+    DocumentChange.objects.bulk_create([
+        DocumentChange(user_id=user_id, document_id=document_id, kind=kind)
+        for user_id, document_id in pairs
+    ], batch_size=SHARE_BATCH_SIZE)
+
+    recipients = {}
+    for user_id, document_id in pairs:
+        recipients.setdefault(document_id, []).append(user_id)
+    for document_id, user_ids in recipients.items():
+        events.publish(user_ids, event, document_id)
+
+
+def grant_access(document, shared_with, batch_size=SHARE_BATCH_SIZE):
+    """
+    Partage un document avec une liste de destinataires en un nombre
+    constant de requêtes :
+      - un IN sur User pour résoudre tous les identifiants,
+      - un IN sur DocumentAccess pour les partages déjà existants,
+      - des bulk_create par lots (ignore_conflicts, grâce au unique_together),
+      - un IN sur les clés primaires insérées : un partage concurrent du même
+        destinataire a gagné la course, il est rapporté already_shared.
+
+    shared_with : [{"user_id": "uuid", "encrypted_aes_key": "base64"}, ...]
+    Retourne une liste [{"user_id": ..., "status": ...}] dans l'ordre reçu.
+    """
+    parsed = []
+    for item in shared_with:
+        if not isinstance(item, dict):
+            parsed.append((None, None, None))
+            continue
+        parsed.append((
+            item.get('user_id'),
+            parse_user_id(item.get('user_id')),
+            item.get('encrypted_aes_key'),
+        ))
+
+    wanted_ids = {user_id for _, user_id, key in parsed if user_id and key}
+    known_ids = set(
+        User.objects.filter(id__in=wanted_ids).values_list('id', flat=True)
+    ) if wanted_ids else set()
+    existing_ids = set(
+        DocumentAccess.objects.filter(
+            document=document, user_id__in=known_ids
+        ).values_list('user_id', flat=True)
+    ) if known_ids else set()
+
+    results = []
+    to_create = {}
+    for raw_id, user_id, key in parsed:
+        if user_id is None or not key:
+            outcome = INVALID
+        elif user_id not in known_ids:
+            outcome = UNKNOWN_USER
+        elif user_id in existing_ids:
+            outcome = ALREADY_SHARED
+        else:
+            outcome = ADDED
+            existing_ids.add(user_id)
+            to_create[len(results)] = DocumentAccess(
+                document=document,
+                user_id=user_id,
+                encrypted_aes_key=key
+            )
+        results.append({'user_id': str(raw_id) if raw_id is not None else None, 'status': outcome})
+
+    if to_create:
+        with transaction.atomic():
+            DocumentAccess.objects.bulk_create(
+                list(to_create.values()), batch_size=batch_size, ignore_conflicts=True
+            )
+            # ignore_conflicts ne dit pas quelles lignes ont été écartées : les
+            # clés primaires (générées ici) absentes sont celles d'un partage concurrent
+            inserted = set(DocumentAccess.objects.filter(
+                id__in=[access.id for access in to_create.values()]
+            ).values_list('id', flat=True))
+            for index, access in to_create.items():
+                if access.id not in inserted:
+                    results[index]['status'] = ALREADY_SHARED
+            record_changes(
+                (access.user_id, document.id) for access in to_create.values() if access.id in inserted
+            )
+
+    return results
+
+
+def foreign_documents(owner, storage_paths):
+    """
+    Documents d'autres propriétaires qui utilisent déjà ces clés d'objet.
+    Les storage_path sont visibles des destinataires d'un partage : confirmer
+    la clé d'autrui puis supprimer ce document ferait supprimer son objet.
+    """
+    return Document.objects.filter(storage_path__in=list(storage_paths)).exclude(uploaded_by=owner)
+
+
+CONFIRM_REQUIRED_FIELDS = ('storage_path', 'filename', 'file_hash', 'signature')
+
+
+def missing_fields(data, fields=CONFIRM_REQUIRED_FIELDS):
+    """
+    Champs absents, vides ou qui ne sont pas des chaînes.
+    """
+    return [f for f in fields if not isinstance(data.get(f), str) or not data.get(f)]
+
+
+OWNER_KEY_INVALID = 'owner_encrypted_aes_key doit être une chaîne'
+
+
+def owner_key(data):
+    """
+    Clé AES chiffrée du propriétaire (facultative, '' par défaut) ; None si
+    elle est fournie sans être une chaîne.
+    """
+    key = data.get('owner_encrypted_aes_key', '')
+    return key if isinstance(key, str) else None
+
+
+def parse_recipients(shared_with):
+    """
+    shared_with de confirm_upload -> [(user_id, encrypted_aes_key)] ;
+    None si la liste ou l'un des destinataires est mal formé.
+    """
+    if not isinstance(shared_with, list):
+        return None
+    recipients = []
+    for item in shared_with:
+        if not isinstance(item, dict):
+            return None
+        user_id = parse_user_id(item.get('user_id'))
+        key = item.get('encrypted_aes_key')
+        if user_id is None or not key or not isinstance(key, str):
+            return None
+        recipients.append((user_id, key))
+    return recipients
+
+
+def _parse_category_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def confirm_uploads(owner, items):
+    """
+    Confirme plusieurs uploads en une fois (synchronisation de dossiers).
+
+    - head_object en parallèle pour tous les storage_path (ou, en mode
+      DOCUMENTS_VERIFY_UPLOADS = "deferred", vérification par le worker),
+      sauf objets dédupliqués déjà référencés (DOCUMENTS_DEDUP),
+    - un IN pour les catégories, un IN pour tous les destinataires,
+    - Document et DocumentAccess écrits par bulk_create dans une transaction.
+
+    Chaque élément a le format du payload de confirm_upload.
+    Retourne une liste de résultats dans l'ordre reçu :
+    {"index", "storage_path", "status": "created"|"error", "id"|"error"}.
+    """
+    results = [None] * len(items)
+    pending = []
+    seen_paths = set()
+
+    # 1. Validation locale (aucune requête)
+    for index, item in enumerate(items):
+        storage_path = item.get('storage_path') if isinstance(item, dict) else None
+        result = {'index': index, 'storage_path': storage_path if isinstance(storage_path, str) else None}
+        results[index] = result
+        if not isinstance(item, dict) or missing_fields(item):
+            result.update(status='error', error='Champs requis : ' + ', '.join(CONFIRM_REQUIRED_FIELDS))
+            continue
+        if storage_path in seen_paths:
+            result.update(status='error', error='storage_path en double dans le lot')
+            continue
+        shared_with = item.get('shared_with', [])
+        if not isinstance(shared_with, list):
+            result.update(status='error', error='shared_with doit être une liste')
+            continue
+        if owner_key(item) is None:
+            result.update(status='error', error=OWNER_KEY_INVALID)
+            continue
+        seen_paths.add(storage_path)
+        pending.append((index, item))
+
+    # 2. Existence des objets dans le stockage (en parallèle), sauf vérification
+    # différée ou objet dédupliqué déjà stocké
+    reused = blobs.stored_paths(owner, ((item['file_hash'], item['storage_path']) for _, item in pending))
+    to_check = [item['storage_path'] for _, item in pending if item['storage_path'] not in reused]
+    deferred = tasks.deferred_verification()
+    if deferred:
+        exists = dict.fromkeys(to_check, True)
+    else:
+        exists = storage.objects_exist(to_check)
+    exists.update(dict.fromkeys(reused, True))
+
+    # 3. Résolution ensembliste des catégories et des destinataires
+    category_ids = {
+        _parse_category_id(item['category_id'])
+        for _, item in pending if item.get('category_id')
+    } - {None}
+    categories = set(
+        Category.objects.filter(id__in=category_ids).values_list('id', flat=True)
+    ) if category_ids else set()
+
+    recipient_ids = {
+        parse_user_id(entry.get('user_id'))
+        for _, item in pending
+        for entry in item.get('shared_with', []) if isinstance(entry, dict)
+    } - {None}
+    known_users = set(
+        User.objects.filter(id__in=recipient_ids).values_list('id', flat=True)
+    ) if recipient_ids else set()
+
+    taken = set(foreign_documents(
+        owner, [item['storage_path'] for _, item in pending]
+    ).values_list('storage_path', flat=True)) if pending else set()
+
+    documents = []
+    accesses = []
+    for index, item in pending:
+        result = results[index]
+        if item['storage_path'] in taken:
+            result.update(status='error', error=STORAGE_PATH_TAKEN)
+            continue
+        if not exists.get(item['storage_path']):
+            result.update(status='error', error='Fichier non trouvé dans le stockage')
+            continue
+
+        category_id = None
+        if item.get('category_id'):
+            category_id = _parse_category_id(item['category_id'])
+            if category_id not in categories:
+                result.update(status='error', error='Catégorie introuvable')
+                continue
+
+        recipients = parse_recipients(item.get('shared_with', []))
+        if recipients is None:
+            result.update(status='error', error='Destinataire invalide')
+            continue
+        unknown = next((user_id for user_id, _ in recipients if user_id not in known_users), None)
+        if unknown is not None:
+            result.update(status='error', error=f'Utilisateur introuvable : {unknown}')
+            continue
+        item_accesses = dict(recipients)
+        # Ajouter l'uploader
+        item_accesses[owner.id] = owner_key(item)
+
+        doc = Document(
+            filename=item['filename'],
+            storage_path=item['storage_path'],
+            file_hash=item['file_hash'],
+            signature=item['signature'],
+            mime_type=item.get('mime_type', ''),
+            uploaded_by=owner,
+            category_id=category_id
+        )
+        documents.append(doc)
+        accesses.extend(
+            DocumentAccess(document=doc, user_id=user_id, encrypted_aes_key=key)
+            for user_id, key in item_accesses.items()
+        )
+        result.update(status='created', id=str(doc.id))
+
+    # 4. Écriture groupée
+    if documents:
+        with transaction.atomic():
+            blobs.attach(owner, documents)
+            Document.objects.bulk_create(documents, batch_size=SHARE_BATCH_SIZE)
+            DocumentAccess.objects.bulk_create(accesses, batch_size=SHARE_BATCH_SIZE)
+            record_changes((access.user_id, access.document_id) for access in accesses)
+            if deferred:
+                tasks.enqueue_verify_uploads(
+                    [doc for doc in documents if doc.storage_path not in reused]
+                )
+
+    return results
+
+
+def multipart_part_size(size=None):
+    """
+    Taille de partie conseillée : DOCUMENTS_MULTIPART_PART_SIZE, augmentée
+    (au Mo supérieur) si le fichier dépasse 10 000 parties de cette taille.
+    """
+    part_size = max(
+        getattr(settings, 'DOCUMENTS_MULTIPART_PART_SIZE', 16 * 1024 * 1024),
+        storage.MULTIPART_MIN_PART_SIZE,
+    )
+    if size:
+        mib = 1024 * 1024
+        needed = math.ceil(size / storage.MULTIPART_MAX_PARTS)
+        part_size = max(part_size, math.ceil(needed / mib) * mib)
+    return part_size
+
+
+MULTIPART_NOT_COMPLETED = 'Upload multipart introuvable, non terminé ou déjà confirmé'
+
+
+def completed_multipart(owner, upload_id):
+    """
+    Upload multipart terminé de `owner` (pour confirm_upload), sous forme de queryset.
+    """
+    try:
+        upload_id = uuid.UUID(str(upload_id))
+    except ValueError:
+        return MultipartUpload.objects.none()
+    return MultipartUpload.objects.filter(
+        id=upload_id, owner=owner, status=MultipartUpload.COMPLETED
+    )
+
+
+def consume_multipart(upload, document):
+    """
+    Marque l'upload multipart confirmé par `document`, dans la transaction
+    qui crée le document. False si une autre confirmation l'a déjà consommé.
+    """
+    return MultipartUpload.objects.filter(
+        id=upload.id, status=MultipartUpload.COMPLETED
+    ).update(status=MultipartUpload.CONFIRMED, document_id=document.id) == 1
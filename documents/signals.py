@@ -0,0 +1,44 @@
+# documents/signals.py
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from documents import blobs, events, services, storage, url_cache
+from documents.models import Document, DocumentAccess, DocumentChange
+
+
+@receiver(post_delete, sender=DocumentAccess)
+def invalidate_download_url(sender, instance, **kwargs):
+    """
+    Accès révoqué ou document supprimé (CASCADE) : l'URL signée en cache
+    ne doit plus être servie à cet utilisateur.
+    """
+    url_cache.invalidate(instance.user_id, instance.document_id)
+
+
+@receiver(post_delete, sender=Document)
+def delete_stored_object(sender, instance, **kwargs):
+    """
+    L'objet chiffré est supprimé du stockage par le worker, une fois la
+    suppression du Document validée (la tâche est écrite dans la même transaction).
+    Objet dédupliqué : seulement avec le dernier document qui le référence.
+    """
+    if storage.is_configured():
+        blobs.release(instance)
+
+
+@receiver(post_save, sender=DocumentAccess)
+def record_access_granted(sender, instance, created, **kwargs):
+    if created:
+        services.record_changes([(instance.user_id, instance.document_id)])
+
+
+@receiver(post_delete, sender=DocumentAccess)
+def record_access_removed(sender, instance, origin=None, **kwargs):
+    """
+    Tombstone pour la synchronisation : partage retiré ou document supprimé
+    (dans ce cas la suppression part du Document, cf. `origin`).
+    """
+    event = events.DELETED if isinstance(origin, Document) else events.UNSHARED
+    services.record_changes(
+        [(instance.user_id, instance.document_id)], DocumentChange.REMOVED, event
+    )
@@ -0,0 +1,328 @@
+# documents/storage.py
+"""
+Client S3/MinIO partagé par toutes les vues documents.
+
+Le client boto3 est construit une seule fois par processus (worker gunicorn)
+puis réutilisé : les clients boto3 sont thread-safe, et on évite ainsi de
+recharger le modèle de service et de rouvrir un pool de connexions HTTP
+à chaque requête.
+"""
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import ClientError
+from django.conf import settings
+
+from secure_doc import instrumentation
+
+
+_client = None
+_client_pid = None
+_client_lock = threading.Lock()
+
+
+def is_configured():
+    """
+    True si les paramètres minimaux du stockage objet sont présents.
+    """
+    return all(
+        getattr(settings, name, None)
+        for name in (
+            'AWS_S3_ENDPOINT_URL',
+            'AWS_STORAGE_BUCKET_NAME',
+            'AWS_ACCESS_KEY_ID',
+            'AWS_SECRET_ACCESS_KEY',
+        )
+    )
+
+
+def bucket_name():
+    return settings.AWS_STORAGE_BUCKET_NAME
+
+
+def build_s3_client():
+    """
+    Construit un nouveau client S3 à partir des settings.
+    Préférer get_s3_client() dans les vues.
+    """
+    config = Config(
+        max_pool_connections=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 10),
+        tcp_keepalive=getattr(settings, 'AWS_S3_TCP_KEEPALIVE', True),
+        connect_timeout=getattr(settings, 'AWS_S3_CONNECT_TIMEOUT', 5),
+        read_timeout=getattr(settings, 'AWS_S3_READ_TIMEOUT', 60),
+        retries={
+            'mode': getattr(settings, 'AWS_S3_RETRY_MODE', 'standard'),
+            'max_attempts': getattr(settings, 'AWS_S3_MAX_ATTEMPTS', 3),
+        },
+    )
+    # Session dédiée : la session boto3 par défaut n'est pas thread-safe
+    session = boto3.session.Session()
+    client = session.client(
+        's3',
+        endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+        aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+        aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+        region_name=getattr(settings, 'AWS_S3_REGION_NAME', 'us-east-1'),
+        use_ssl=getattr(settings, 'AWS_S3_USE_SSL', True),
+        verify=getattr(settings, 'AWS_S3_VERIFY', True),
+        config=config,
+    )
+    # Compteurs d'appels S3 (Server-Timing, métriques)
+    instrumentation.register_s3_hooks(client)
+    return client
+
+
+def get_s3_client():
+    """
+    Retourne le client S3 du processus courant, créé à la première demande.
+
+    Le pid est vérifié pour qu'un worker forké après un import
+    ne réutilise pas les sockets du processus parent.
+    """
+    global _client, _client_pid
+    pid = os.getpid()
+    client = _client
+    if client is not None and _client_pid == pid:
+        return client
+    with _client_lock:
+        if _client is None or _client_pid != pid:
+            _client = build_s3_client()
+            _client_pid = pid
+        return _client
+
+
+def reset_s3_client():
+    """
+    Oublie le client partagé (changement de settings, benchmarks).
+    """
+    global _client, _client_pid
+    with _client_lock:
+        _client = None
+        _client_pid = None
+
+
+def object_exists(key, client=None):
+    """
+    head_object sur la clé ; False si l'objet est absent (404).
+    """
+    client = client or get_s3_client()
+    try:
+        client.head_object(Bucket=bucket_name(), Key=key)
+    except ClientError as e:
+        if e.response.get('Error', {}).get('Code') in ('404', 'NoSuchKey', 'NotFound'):
+            return False
+        raise
+    return True
+
+
+def objects_exist(keys, max_workers=None):
+    """
+    Vérifie l'existence de plusieurs objets en parallèle sur un pool de threads
+    (le client partagé est thread-safe). Retourne {clé: bool}.
+    Une erreur de stockage autre que 404 est considérée comme "absent".
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return {}
+    if max_workers is None:
+        max_workers = getattr(settings, 'DOCUMENTS_HEAD_CONCURRENCY', 8)
+    client = get_s3_client()
+
+    def check(key):
+        try:
+            return object_exists(key, client)
+        except ClientError:
+            return False
+
+    # Une copie du contexte par appel (un contexte ne s'exécute que dans un
+    # thread à la fois) : les HEAD comptent dans les statistiques de la requête
+    contexts = [contextvars.copy_context() for _ in keys]
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(keys)))) as executor:
+        return dict(zip(keys, executor.map(lambda context, key: context.run(check, key), contexts, keys)))
+
+
+LIST_PAGE_SIZE = 1000
+DELETE_OBJECTS_MAX_KEYS = 1000  # limite de l'API DeleteObjects
+
+
+def iter_object_pages(prefix='', page_size=LIST_PAGE_SIZE):
+    """
+    Parcourt le bucket page par page (list_objects_v2) : une seule page
+    ({Key, LastModified, Size...}) est en mémoire à la fois.
+    """
+    paginator = get_s3_client().get_paginator('list_objects_v2')
+    pages = paginator.paginate(
+        Bucket=bucket_name(), Prefix=prefix, PaginationConfig={'PageSize': page_size}
+    )
+    for page in pages:
+        yield page.get('Contents', [])
+
+
+def delete_objects(keys):
+    """
+    Supprime les clés par appels DeleteObjects de 1000 clés au plus.
+    Retourne la liste des échecs [(clé, code d'erreur)].
+    """
+    keys = list(keys)
+    client = get_s3_client()
+    errors = []
+    for i in range(0, len(keys), DELETE_OBJECTS_MAX_KEYS):
+        response = client.delete_objects(
+            Bucket=bucket_name(),
+            Delete={
+                'Objects': [{'Key': key} for key in keys[i:i + DELETE_OBJECTS_MAX_KEYS]],
+                'Quiet': True,
+            },
+        )
+        errors += [(error['Key'], error.get('Code', '')) for error in response.get('Errors', [])]
+    return errors
+
+
+DOWNLOAD_URL_EXPIRES = 3600  # 1 heure
+UPLOAD_URL_EXPIRES = 600     # 10 minutes
+
+
+def presigned_download_url(key, expires_in=DOWNLOAD_URL_EXPIRES):
+    started = time.perf_counter()
+    url = get_s3_client().generate_presigned_url(
+        'get_object',
+        Params={'Bucket': bucket_name(), 'Key': key},
+        ExpiresIn=expires_in
+    )
+    instrumentation.record_s3('presign_get_object', time.perf_counter() - started, http=False)
+    return url
+
+
+def presigned_upload_url(key, expires_in=UPLOAD_URL_EXPIRES):
+    started = time.perf_counter()
+    url = get_s3_client().generate_presigned_url(
+        'put_object',
+        Params={
+            'Bucket': bucket_name(),
+            'Key': key,
+            # Important : forcer le type de contenu si nécessaire
+            # 'ContentType': 'application/octet-stream'
+        },
+        ExpiresIn=expires_in,
+        HttpMethod='PUT'
+    )
+    instrumentation.record_s3('presign_put_object', time.perf_counter() - started, http=False)
+    return url
+
+
+#------------------------------------------ Upload multipart ------------------------------------------
+MULTIPART_MIN_PART_SIZE = 5 * 1024 * 1024   # minimum S3 (sauf dernière partie)
+MULTIPART_MAX_PARTS = 10000
+PART_URL_EXPIRES = 3600                     # 1 heure par lot d'URL
+
+
+def create_multipart_upload(key):
+    response = get_s3_client().create_multipart_upload(Bucket=bucket_name(), Key=key)
+    return response['UploadId']
+
+
+def presigned_part_url(key, upload_id, part_number, expires_in=PART_URL_EXPIRES):
+    started = time.perf_counter()
+    url = get_s3_client().generate_presigned_url(
+        'upload_part',
+        Params={
+            'Bucket': bucket_name(),
+            'Key': key,
+            'UploadId': upload_id,
+            'PartNumber': part_number,
+        },
+        ExpiresIn=expires_in,
+        HttpMethod='PUT'
+    )
+    instrumentation.record_s3('presign_upload_part', time.perf_counter() - started, http=False)
+    return url
+
+
+def list_parts(key, upload_id):
+    """
+    Parties déjà reçues, par numéro croissant : [{PartNumber, ETag, Size}].
+    """
+    paginator = get_s3_client().get_paginator('list_parts')
+    parts = []
+    for page in paginator.paginate(Bucket=bucket_name(), Key=key, UploadId=upload_id):
+        parts += [
+            {'PartNumber': part['PartNumber'], 'ETag': part['ETag'], 'Size': part['Size']}
+            for part in page.get('Parts', [])
+        ]
+    return parts
+
+
+def complete_multipart_upload(key, upload_id, parts):
+    """
+    parts : [{PartNumber, ETag}] par numéro croissant.
+    """
+    get_s3_client().complete_multipart_upload(
+        Bucket=bucket_name(),
+        Key=key,
+        UploadId=upload_id,
+        MultipartUpload={'Parts': [
+            {'PartNumber': part['PartNumber'], 'ETag': part['ETag']} for part in parts
+        ]},
+    )
+
+
+def abort_multipart_upload(key, upload_id):
+    get_s3_client().abort_multipart_upload(Bucket=bucket_name(), Key=key, UploadId=upload_id)
+
+
+def iter_multipart_uploads(prefix=''):
+    """
+    Uploads multipart non terminés du bucket : {Key, UploadId, Initiated}.
+    """
+    paginator = get_s3_client().get_paginator('list_multipart_uploads')
+    for page in paginator.paginate(Bucket=bucket_name(), Prefix=prefix):
+        yield from page.get('Uploads', [])
+
+
+# Exécuteur dédié aux appels S3 des vues async : boto3 est bloquant, on le
+# déporte sur des threads (au plus un par connexion du pool HTTP).
+_executor = None
+_executor_pid = None
+
+
+def _get_executor():
+    global _executor, _executor_pid
+    pid = os.getpid()
+    if _executor is None or _executor_pid != pid:
+        with _client_lock:
+            if _executor is None or _executor_pid != pid:
+                _executor = ThreadPoolExecutor(
+                    max_workers=getattr(settings, 'AWS_S3_MAX_POOL_CONNECTIONS', 10),
+                    thread_name_prefix='s3',
+                )
+                _executor_pid = pid
+    return _executor
+
+
+async def run_async(func, *args):
+    """
+    Exécute un appel S3 bloquant sans bloquer la boucle d'événements, dans
+    une copie du contexte de l'appelant : les statistiques de la requête
+    (secure_doc.instrumentation, Server-Timing) comptent l'appel.
+    """
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(_get_executor(), context.run, func, *args)
+
+
+async def aobject_exists(key):
+    return await run_async(object_exists, key)
+
+
+async def apresigned_download_url(key, expires_in=DOWNLOAD_URL_EXPIRES):
+    return await run_async(presigned_download_url, key, expires_in)
+
+
+async def apresigned_upload_url(key, expires_in=UPLOAD_URL_EXPIRES):
+    return await run_async(presigned_upload_url, key, expires_in)
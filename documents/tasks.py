@@ -0,0 +1,58 @@
+# documents/tasks.py
+"""
+Tâches différées sur le stockage objet (exécutées par manage.py run_jobs).
+"""
+from django.conf import settings
+
+from documents import storage
+from documents.models import Document
+from jobs.queue import enqueue, enqueue_many, task
+
+
+@task('documents.delete_object', max_attempts=8)
+def delete_object(storage_path):
+    # Objet encore référencé par un autre document (déduplication, ou clé
+    # confirmée par un autre document) : on le garde
+    if Document.objects.filter(storage_path=storage_path).exists():
+        return
+    # DeleteObject est idempotent : un objet déjà absent n'est pas une erreur
+    storage.get_s3_client().delete_object(Bucket=storage.bucket_name(), Key=storage_path)
+
+
+@task('documents.verify_upload', max_attempts=5)
+def verify_upload(document_id, storage_path):
+    """
+    Vérifie qu'un document confirmé a bien son objet dans le stockage ;
+    sinon il est retiré (les destinataires en sont notifiés par les signaux).
+    """
+    if storage.object_exists(storage_path):
+        return
+    Document.objects.filter(id=document_id, storage_path=storage_path).delete()
+
+
+def deferred_verification():
+    """
+    True si confirm_upload délègue le head_object au worker
+    (settings.DOCUMENTS_VERIFY_UPLOADS = "deferred").
+    """
+    return getattr(settings, 'DOCUMENTS_VERIFY_UPLOADS', 'inline') == 'deferred'
+
+
+def enqueue_delete_object(document):
+    # Clé par document supprimé : une clé par storage_path ignorerait toute
+    # suppression ultérieure du même objet tant que l'ancienne tâche est conservée
+    enqueue(
+        'documents.delete_object',
+        {'storage_path': document.storage_path},
+        key=f'delete_object:{document.id}',
+    )
+
+
+def enqueue_verify_uploads(documents):
+    enqueue_many('documents.verify_upload', [
+        (
+            {'document_id': str(doc.id), 'storage_path': doc.storage_path},
+            f'verify_upload:{doc.id}',
+        )
+        for doc in documents
+    ])
@@ -1,3 +1,553 @@
-from django.test import TestCase
+# documents/tests.py
+import base64
+import json
+import uuid
 
-# Create your tests here.
+from django.db import connection, transaction
+from django.test import AsyncClient, TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from accounts.tokens import access_token_for
+from documents import blobs, queries, services, storage, tasks
+from documents.bench.s3_stub import S3Stub
+from documents.pagination import InvalidCursor, decode_cursor, encode_cursor
+from documents.models import Blob, Document, DocumentAccess, DocumentChange, MultipartUpload
+from jobs import queue
+from jobs.models import Job
+
+
+def make_user(email):
+    return User.objects.create_user(email=email, password='x-Password-1', is_active=True, public_key='PEM')
+
+
+def make_document(owner, storage_path='obj_doc.pdf', **fields):
+    doc = Document.objects.create(
+        filename=fields.pop('filename', 'doc.pdf'),
+        storage_path=storage_path,
+        file_hash=fields.pop('file_hash', 'hash'),
+        signature='sig',
+        uploaded_by=owner,
+        **fields,
+    )
+    DocumentAccess.objects.create(document=doc, user=owner, encrypted_aes_key='owner-key')
+    return doc
+
+
+def api_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+class StorageStubMixin:
+    """
+    Stockage objet local (documents/bench/s3_stub.py) à la place de MinIO.
+    """
+    bucket = 'test-bucket'
+
+    def setUp(self):
+        super().setUp()
+        self.stub = S3Stub().start()
+        self.addCleanup(self.stub.stop)
+        overrides = self.settings(
+            AWS_S3_ENDPOINT_URL=self.stub.endpoint_url, AWS_STORAGE_BUCKET_NAME=self.bucket,
+            AWS_ACCESS_KEY_ID='key', AWS_SECRET_ACCESS_KEY='secret', AWS_S3_USE_SSL=False,
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        storage.reset_s3_client()
+        self.addCleanup(storage.reset_s3_client)
+
+    def stored(self, key):
+        return (self.bucket, key) in self.stub.objects
+
+
+#------------------------------------------ Partage ------------------------------------------
+class GrantAccessTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner@example.com')
+        self.bob = make_user('bob@example.com')
+        self.alice = make_user('alice@example.com')
+        self.doc = make_document(self.owner)
+
+    def test_statuses_in_request_order(self):
+        DocumentAccess.objects.create(document=self.doc, user=self.alice, encrypted_aes_key='k')
+        results = services.grant_access(self.doc, [
+            {'user_id': self.bob.id, 'encrypted_aes_key': 'kb'},
+            {'user_id': self.alice.id, 'encrypted_aes_key': 'ka'},
+            {'user_id': 999999, 'encrypted_aes_key': 'kx'},
+            {'user_id': self.bob.id},
+            'not-a-dict',
+            {'user_id': self.bob.id, 'encrypted_aes_key': 'again'},
+        ])
+        self.assertEqual([r['status'] for r in results], [
+            services.ADDED, services.ALREADY_SHARED, services.UNKNOWN_USER,
+            services.INVALID, services.INVALID, services.ALREADY_SHARED,
+        ])
+        self.assertEqual(
+            DocumentAccess.objects.get(document=self.doc, user=self.bob).encrypted_aes_key, 'kb'
+        )
+
+    def test_added_recipients_are_journaled(self):
+        services.grant_access(self.doc, [{'user_id': self.bob.id, 'encrypted_aes_key': 'kb'}])
+        self.assertTrue(DocumentChange.objects.filter(
+            user=self.bob, document_id=self.doc.id, kind=DocumentChange.UPSERT
+        ).exists())
+
+    def test_concurrent_share_is_already_shared(self):
+        def concurrent_share(execute, sql, params, many, context):
+            # Partage du même destinataire validé juste avant notre bulk_create
+            if sql.startswith('INSERT') and '"documents_documentaccess"' in sql and not shared:
+                shared.append(self.bob)
+                DocumentAccess.objects.create(document=self.doc, user=self.bob, encrypted_aes_key='k1')
+            return execute(sql, params, many, context)
+
+        shared = []
+        with connection.execute_wrapper(concurrent_share):
+            results = services.grant_access(self.doc, [
+                {'user_id': self.bob.id, 'encrypted_aes_key': 'k2'},
+                {'user_id': self.alice.id, 'encrypted_aes_key': 'ka'},
+            ])
+        self.assertEqual([r['status'] for r in results], [services.ALREADY_SHARED, services.ADDED])
+        self.assertEqual(DocumentAccess.objects.get(document=self.doc, user=self.bob).encrypted_aes_key, 'k1')
+        # Seul le partage concurrent a journalisé bob
+        self.assertEqual(DocumentChange.objects.filter(user=self.bob).count(), 1)
+        self.assertEqual(DocumentChange.objects.filter(user=self.alice).count(), 1)
+
+    def test_share_endpoint_is_owner_only(self):
+        response = api_client(self.bob).post(
+            f'/api/documents/share/{self.doc.id}/',
+            {'shared_with': [{'user_id': self.alice.id, 'encrypted_aes_key': 'ka'}]}, format='json',
+        )
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(DocumentAccess.objects.filter(document=self.doc, user=self.alice).exists())
+
+
+#------------------------------------------ Confirmation d'upload ------------------------------------------
+@override_settings(DOCUMENTS_VERIFY_UPLOADS='deferred')
+class ConfirmUploadsTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner@example.com')
+        self.bob = make_user('bob@example.com')
+
+    def item(self, storage_path, **fields):
+        return {
+            'storage_path': storage_path, 'filename': 'f.pdf', 'file_hash': 'h',
+            'signature': 's', 'owner_encrypted_aes_key': 'ko', **fields,
+        }
+
+    def test_invalid_items_fail_individually(self):
+        results = services.confirm_uploads(self.owner, [
+            self.item('ok'),
+            self.item(['not', 'a', 'string']),
+            self.item('no-signature', signature=''),
+            self.item('bad-hash', file_hash=3),
+            self.item('ok'),
+            self.item('bad-recipient', shared_with=[{'user_id': 'x', 'encrypted_aes_key': 'k'}]),
+            self.item('unknown', shared_with=[{'user_id': 999999, 'encrypted_aes_key': 'k'}]),
+            'not-a-dict',
+            self.item('bad-owner-key', owner_encrypted_aes_key={'not': 'a string'}),
+        ])
+        self.assertEqual([r['status'] for r in results], ['created'] + ['error'] * 8)
+        self.assertEqual(results[8]['error'], services.OWNER_KEY_INVALID)
+        self.assertIsNone(results[1]['storage_path'])
+        self.assertEqual(results[4]['error'], 'storage_path en double dans le lot')
+        self.assertEqual(Document.objects.filter(uploaded_by=self.owner).count(), 1)
+
+    def test_created_documents_are_shared_and_verified_later(self):
+        results = services.confirm_uploads(self.owner, [
+            self.item('a', shared_with=[{'user_id': self.bob.id, 'encrypted_aes_key': 'kb'}]),
+            self.item('b'),
+        ])
+        self.assertEqual([r['status'] for r in results], ['created', 'created'])
+        doc = Document.objects.get(storage_path='a')
+        self.assertEqual(
+            dict(DocumentAccess.objects.filter(document=doc).values_list('user_id', 'encrypted_aes_key')),
+            {self.owner.id: 'ko', self.bob.id: 'kb'},
+        )
+        self.assertTrue(Job.objects.filter(name='documents.verify_upload').exists())
+
+    def test_single_confirm_checks_owner_key(self):
+        response = api_client(self.owner).post(
+            '/api/documents/upload/confirm/', self.item('single', owner_encrypted_aes_key=['k']), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], services.OWNER_KEY_INVALID)
+
+    def test_storage_path_of_another_owner_is_rejected(self):
+        make_document(self.bob, storage_path='taken')
+        result, = services.confirm_uploads(self.owner, [self.item('taken')])
+        self.assertEqual(result['error'], services.STORAGE_PATH_TAKEN)
+
+    def test_single_confirm_resolves_recipients_before_creating(self):
+        client = api_client(self.owner)
+        response = client.post('/api/documents/upload/confirm/', self.item(
+            'single', shared_with=[{'user_id': 999999, 'encrypted_aes_key': 'k'}]
+        ), format='json')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Document.objects.filter(storage_path='single').exists())
+
+        response = client.post('/api/documents/upload/confirm/', self.item(
+            'single', shared_with=[{'user_id': self.bob.id, 'encrypted_aes_key': 'kb'}]
+        ), format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(DocumentAccess.objects.filter(document_id=response.data['id'], user=self.bob).exists())
+
+    def test_single_confirm_rejects_non_string_fields(self):
+        response = api_client(self.owner).post(
+            '/api/documents/upload/confirm/', self.item({'a': 1}), format='json'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+#------------------------------------------ Pagination ------------------------------------------
+def raw_cursor(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+class CursorTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner@example.com')
+        self.docs = [make_document(self.owner, storage_path=f'obj_{i}') for i in range(5)]
+
+    def test_round_trip(self):
+        cursor = encode_cursor('2024-01-01T00:00:00+00:00', self.docs[0].id)
+        self.assertEqual(decode_cursor(cursor, 2), ['2024-01-01T00:00:00+00:00', str(self.docs[0].id)])
+
+    def test_malformed_cursors(self):
+        forged = [
+            'not base64 !', encode_cursor('only-one'), raw_cursor({'a': 1}),
+            # Valeurs non textuelles (curseur forgé à la main)
+            raw_cursor([[1], 2]), raw_cursor([1, 2]),
+        ]
+        for cursor in forged:
+            with self.subTest(cursor=cursor), self.assertRaises(InvalidCursor):
+                decode_cursor(cursor, 2)
+
+    def test_pages_cover_every_document_once(self):
+        client = api_client(self.owner)
+        seen, cursor = [], None
+        while True:
+            params = {'limit': 2, 'group_by': 'none'}
+            if cursor:
+                params['cursor'] = cursor
+            response = client.get('/api/documents/list/', params)
+            self.assertEqual(response.status_code, 200)
+            seen += [item['id'] for item in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(sorted(seen), sorted(str(doc.id) for doc in self.docs))
+
+    def test_invalid_cursor_is_a_client_error(self):
+        client = api_client(self.owner)
+        for cursor in ['zzz', encode_cursor('not-a-date', 'not-a-uuid'), raw_cursor([1, 2])]:
+            with self.subTest(cursor=cursor):
+                response = client.get('/api/documents/list/', {'cursor': cursor, 'group_by': 'none'})
+                self.assertEqual(response.status_code, 400)
+
+
+#------------------------------------------ Synchronisation ------------------------------------------
+class SyncTests(TestCase):
+    def setUp(self):
+        self.owner = make_user('owner@example.com')
+        self.bob = make_user('bob@example.com')
+        self.doc = make_document(self.owner)
+        self.client_bob = api_client(self.bob)
+
+    def sync(self, token=None):
+        response = self.client_bob.get('/api/documents/sync/', {'sync_token': token} if token else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_share_then_unshare_becomes_tombstone(self):
+        initial = self.sync()
+        self.assertTrue(initial['full'])
+        self.assertEqual(initial['documents'], [])
+
+        services.grant_access(self.doc, [{'user_id': self.bob.id, 'encrypted_aes_key': 'kb'}])
+        shared = self.sync(initial['sync_token'])
+        self.assertFalse(shared['full'])
+        self.assertEqual([item['id'] for item in shared['documents']], [str(self.doc.id)])
+        self.assertEqual(shared['deleted'], [])
+
+        api_client(self.owner).post(
+            f'/api/documents/unshare/{self.doc.id}/', {'user_ids': [self.bob.id]}, format='json'
+        )
+        unshared = self.sync(shared['sync_token'])
+        self.assertEqual(unshared['documents'], [])
+        self.assertEqual(unshared['deleted'], [str(self.doc.id)])
+
+    def test_deleted_document_is_a_tombstone(self):
+        services.grant_access(self.doc, [{'user_id': self.bob.id, 'encrypted_aes_key': 'kb'}])
+        token = self.sync()['sync_token']
+        doc_id = self.doc.id
+        self.doc.delete()
+        delta = self.sync(token)
+        self.assertEqual(delta['deleted'], [str(doc_id)])
+        self.assertEqual(self.sync(delta['sync_token'])['deleted'], [])
+
+    def test_pending_transaction_is_not_skipped(self):
+        # Id inférieur écrit par la transaction 7, encore en cours (watermark 7)
+        pending = DocumentChange.objects.create(user=self.bob, document_id=uuid.uuid4(), kind='upsert', txid=7)
+        committed = DocumentChange.objects.create(user=self.bob, document_id=uuid.uuid4(), kind='upsert', txid=5)
+
+        changes = list(queries.document_changes(self.bob, (0, 0), 7))
+        self.assertEqual(changes, [(5, committed.id, committed.document_id)])
+        self.assertEqual(queries.latest_change_position(self.bob, 7), (5, committed.id))
+
+        # Transaction 7 validée : servie après la position atteinte
+        changes = list(queries.document_changes(self.bob, (5, committed.id), 8))
+        self.assertEqual(changes, [(7, pending.id, pending.document_id)])
+
+    def test_invalid_sync_token(self):
+        for token in ['garbage', encode_cursor('0', 'not-a-number'), encode_cursor('1'), raw_cursor([0, 1])]:
+            with self.subTest(token=token):
+                response = self.client_bob.get('/api/documents/sync/', {'sync_token': token})
+                self.assertEqual(response.status_code, 400)
+
+
+#------------------------------------------ Tâches différées ------------------------------------------
+CALLS = []
+
+
+@queue.task('tests.record')
+def record(value):
+    CALLS.append(value)
+
+
+@queue.task('tests.fail', max_attempts=2)
+def fail(permanent=False):
+    if permanent:
+        raise queue.PermanentError('refusé')
+    raise RuntimeError('indisponible')
+
+
+class JobQueueTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def run_ready(self):
+        return [queue.execute(job) for job in queue.claim('test-worker', 10)]
+
+    def test_claim_and_execute(self):
+        queue.enqueue('tests.record', {'value': 1})
+        job, = queue.claim('test-worker', 10)
+        self.assertEqual((job.status, job.attempts, job.locked_by), (Job.RUNNING, 1, 'test-worker'))
+        # Déjà réservée : un autre worker ne la reprend pas
+        self.assertEqual(queue.claim('other-worker', 10), [])
+        self.assertEqual(queue.execute(job), 'succeeded')
+        self.assertEqual(CALLS, [1])
+        self.assertEqual(Job.objects.get(id=job.id).status, Job.SUCCEEDED)
+
+    def test_idempotency_key(self):
+        queue.enqueue('tests.record', {'value': 1}, key='once')
+        queue.enqueue('tests.record', {'value': 2}, key='once')
+        queue.enqueue_many('tests.record', [({'value': 3}, 'once'), ({'value': 4}, 'other')])
+        self.assertEqual(sorted(Job.objects.values_list('payload__value', flat=True)), [1, 4])
+
+    def test_rolled_back_enqueue_disappears(self):
+        with self.assertRaises(RuntimeError), transaction.atomic():
+            queue.enqueue('tests.record', {'value': 1})
+            raise RuntimeError
+        self.assertFalse(Job.objects.exists())
+
+    def test_retry_then_fail(self):
+        queue.enqueue('tests.fail')
+        with self.assertLogs('jobs.queue', 'WARNING'):
+            self.assertEqual(self.run_ready(), ['retried'])
+        job = Job.objects.get()
+        self.assertEqual((job.status, job.attempts), (Job.PENDING, 1))
+        self.assertIn('indisponible', job.last_error)
+        # Backoff : pas encore prête
+        self.assertEqual(self.run_ready(), [])
+
+        Job.objects.update(run_at=job.created_at)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(self.run_ready(), ['failed'])
+        self.assertEqual(Job.objects.get().status, Job.FAILED)
+
+    def test_permanent_error_is_not_retried(self):
+        queue.enqueue('tests.fail', {'permanent': True})
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            self.assertEqual(self.run_ready(), ['failed'])
+
+    def test_unknown_task_is_rejected(self):
+        with self.assertRaises(ValueError):
+            queue.enqueue('tests.missing')
+
+
+class DeleteObjectTests(StorageStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user('owner@example.com')
+
+    def test_one_job_per_deleted_document(self):
+        first = make_document(self.owner, storage_path='shared-key')
+        second = make_document(self.owner, storage_path='shared-key')
+        keys = {f'delete_object:{first.id}', f'delete_object:{second.id}'}
+        first.delete()
+        second.delete()
+        self.assertEqual(
+            set(Job.objects.filter(name='documents.delete_object').values_list('idempotency_key', flat=True)),
+            keys,
+        )
+
+    def test_referenced_object_is_kept(self):
+        self.stub.put_object(self.bucket, 'shared-key', b'data')
+        make_document(self.owner, storage_path='shared-key')
+        tasks.delete_object(storage_path='shared-key')
+        self.assertTrue(self.stored('shared-key'))
+
+        Document.objects.all().delete()
+        for job in queue.claim('test-worker', 10, names=['documents.delete_object']):
+            self.assertEqual(queue.execute(job), 'succeeded')
+        self.assertFalse(self.stored('shared-key'))
+
+
+#------------------------------------------ Déduplication ------------------------------------------
+@override_settings(DOCUMENTS_DEDUP=True, DOCUMENTS_VERIFY_UPLOADS='deferred')
+class BlobTests(StorageStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user('owner@example.com')
+        self.other = make_user('other@example.com')
+        self.client_owner = api_client(self.owner)
+
+    def confirm(self, client, storage_path, file_hash='content-hash'):
+        return client.post('/api/documents/upload/confirm/', {
+            'storage_path': storage_path, 'filename': 'f.pdf', 'file_hash': file_hash,
+            'signature': 's', 'owner_encrypted_aes_key': 'ko',
+        }, format='json')
+
+    def delete_jobs(self):
+        return Job.objects.filter(name='documents.delete_object').count()
+
+    def test_same_content_reuses_the_stored_object(self):
+        first = self.confirm(self.client_owner, 'obj_1')
+        self.assertEqual(first.status_code, 201)
+
+        response = self.client_owner.post(
+            '/api/documents/upload/prepare/', {'filename': 'copy.pdf', 'file_hash': 'content-hash'}, format='json'
+        )
+        self.assertTrue(response.data['already_present'])
+        self.assertEqual(response.data['storage_path'], 'obj_1')
+        self.assertNotIn('upload_url', response.data)
+
+        self.assertEqual(self.confirm(self.client_owner, 'obj_1').status_code, 201)
+        blob = Blob.objects.get(owner=self.owner, file_hash='content-hash')
+        self.assertEqual(blob.ref_count, 2)
+        self.assertEqual(Document.objects.filter(blob=blob).count(), 2)
+
+    def test_object_deleted_with_last_reference(self):
+        self.stub.put_object(self.bucket, 'obj_1', b'data')
+        self.confirm(self.client_owner, 'obj_1')
+        self.confirm(self.client_owner, 'obj_1')
+        first, second = Document.objects.filter(storage_path='obj_1')
+
+        first.delete()
+        self.assertEqual(Blob.objects.get().ref_count, 1)
+        self.assertEqual(self.delete_jobs(), 0)
+
+        second.delete()
+        self.assertFalse(Blob.objects.exists())
+        job, = queue.claim('test-worker', 10, names=['documents.delete_object'])
+        self.assertEqual(queue.execute(job), 'succeeded')
+        self.assertFalse(self.stored('obj_1'))
+
+    def test_dedup_is_per_owner(self):
+        self.confirm(self.client_owner, 'obj_1')
+        self.assertEqual(blobs.existing_uploads(self.other, ['content-hash']), {})
+
+    def test_foreign_storage_path_cannot_be_claimed(self):
+        self.stub.put_object(self.bucket, 'obj_1', b'data')
+        self.confirm(self.client_owner, 'obj_1')
+        client_other = api_client(self.other)
+
+        response = self.confirm(client_other, 'obj_1')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], services.STORAGE_PATH_TAKEN)
+        response = client_other.post('/api/documents/upload/confirm/batch/', {'documents': [{
+            'storage_path': 'obj_1', 'filename': 'f', 'file_hash': 'content-hash', 'signature': 's',
+        }]}, format='json')
+        self.assertEqual(response.data['results'][0]['error'], services.STORAGE_PATH_TAKEN)
+
+        # Rien ne permet à l'autre utilisateur de faire supprimer l'objet du propriétaire
+        self.assertFalse(Document.objects.filter(uploaded_by=self.other).exists())
+        self.assertEqual(self.delete_jobs(), 0)
+        self.assertTrue(self.stored('obj_1'))
+
+
+#------------------------------------------ Upload multipart ------------------------------------------
+class MultipartConfirmTests(StorageStubMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.owner = make_user('owner@example.com')
+        self.client_owner = api_client(self.owner)
+
+    def completed_upload(self):
+        response = self.client_owner.post('/api/documents/upload/multipart/', {'filename': 'big.bin'}, format='json')
+        upload = MultipartUpload.objects.get(id=response.data['upload_id'])
+        self.stub.put_object(self.bucket, upload.storage_path, b'assembled')
+        MultipartUpload.objects.filter(id=upload.id).update(status=MultipartUpload.COMPLETED)
+        return upload
+
+    def confirm(self, upload):
+        return self.client_owner.post('/api/documents/upload/confirm/', {
+            'upload_id': str(upload.id), 'file_hash': 'h', 'signature': 's',
+        }, format='json')
+
+    def test_pending_upload_cannot_be_confirmed(self):
+        response = self.client_owner.post('/api/documents/upload/multipart/', {'filename': 'big.bin'}, format='json')
+        upload = MultipartUpload.objects.get(id=response.data['upload_id'])
+        self.assertEqual(self.confirm(upload).status_code, 400)
+
+    def test_upload_is_confirmed_once(self):
+        upload = self.completed_upload()
+        response = self.confirm(upload)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Document.objects.get(id=response.data['id']).filename, 'big.bin')
+
+        upload.refresh_from_db()
+        self.assertEqual(upload.status, MultipartUpload.CONFIRMED)
+        self.assertEqual(upload.document_id, response.data['id'])
+
+        replay = self.confirm(upload)
+        self.assertEqual(replay.status_code, 400)
+        self.assertEqual(replay.data['error'], services.MULTIPART_NOT_COMPLETED)
+        self.assertEqual(Document.objects.filter(storage_path=upload.storage_path).count(), 1)
+
+    def test_consumed_upload_is_not_reused_by_a_racing_confirm(self):
+        upload = self.completed_upload()
+        first = Document(id=uuid.uuid4(), storage_path=upload.storage_path)
+        self.assertTrue(services.consume_multipart(upload, first))
+        self.assertFalse(services.consume_multipart(upload, Document(storage_path=upload.storage_path)))
+        self.assertFalse(services.completed_multipart(self.owner, upload.id).exists())
+
+
+#------------------------------------------ Flux d'événements ------------------------------------------
+class EventTicketTests(TestCase):
+    def setUp(self):
+        self.user = make_user('user@example.com')
+        self.access = access_token_for(self.user)
+
+    async def test_ticket_is_single_use(self):
+        client = AsyncClient()
+        response = await client.post(
+            '/api/async/documents/events/ticket/', headers={'Authorization': f'Bearer {self.access}'}
+        )
+        self.assertEqual(response.status_code, 201)
+        ticket = response.json()['ticket']
+
+        stream = await client.get('/api/async/documents/events/', {'ticket': ticket})
+        self.assertEqual(stream.status_code, 200)
+        self.assertEqual(stream['Content-Type'], 'text/event-stream')
+        self.assertEqual(await anext(aiter(stream.streaming_content)), b'retry: 5000\n\n')
+
+        replay = await client.get('/api/async/documents/events/', {'ticket': ticket})
+        self.assertEqual(replay.status_code, 401)
+
+    async def test_jwt_is_not_accepted_in_the_url(self):
+        response = await AsyncClient().get('/api/async/documents/events/', {'access_token': self.access})
+        self.assertEqual(response.status_code, 401)
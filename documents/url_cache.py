@@ -0,0 +1,157 @@
+# documents/url_cache.py
+"""
+Cache des URL pré-signées de téléchargement, par (utilisateur, document).
+
+Une URL signée reste valide DOWNLOAD_URL_EXPIRES secondes : tant qu'il lui
+reste au moins MIN_REMAINING_SECONDS de validité, on la renvoie au lieu d'en
+signer une nouvelle. Backend par défaut : LRU en mémoire du processus ;
+"django" utilise le cache Django configuré (partagé entre workers).
+
+Invalidation : signal post_delete de DocumentAccess (documents/signals.py),
+ce qui couvre delete_document (CASCADE) et la révocation d'un partage.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+
+from documents import storage
+
+
+DEFAULTS = {
+    'ENABLED': True,
+    'BACKEND': 'locmem',          # "locmem" (LRU du processus) ou "django"
+    'CACHE_ALIAS': 'default',
+    'MAX_ENTRIES': 10000,
+    'MIN_REMAINING_SECONDS': 600,
+}
+
+
+def _conf(name):
+    return getattr(settings, 'DOCUMENTS_URL_CACHE', {}).get(name, DEFAULTS[name])
+
+
+class LRUBackend:
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                self._data.move_to_end(key)
+            return entry
+
+    def set(self, key, entry, timeout):
+        with self._lock:
+            self._data[key] = entry
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class DjangoCacheBackend:
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def get(self, key):
+        return self.cache.get(key)
+
+    def set(self, key, entry, timeout):
+        self.cache.set(key, entry, timeout)
+
+    def delete(self, key):
+        self.cache.delete(key)
+
+    def clear(self):
+        pass
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def _get_backend():
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if _conf('BACKEND') == 'django':
+                    _backend = DjangoCacheBackend(_conf('CACHE_ALIAS'))
+                else:
+                    _backend = LRUBackend(_conf('MAX_ENTRIES'))
+    return _backend
+
+
+def _incr(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _key(user_id, document_id):
+    return f'documents:dl-url:{user_id}:{document_id}'
+
+
+def get_download_url(user_id, document_id, storage_path):
+    """
+    URL pré-signée pour ce (user, document), depuis le cache si elle
+    est encore valide assez longtemps, sinon nouvellement signée.
+    """
+    if not _conf('ENABLED'):
+        return storage.presigned_download_url(storage_path)
+
+    backend = _get_backend()
+    key = _key(user_id, document_id)
+    now = time.time()
+    min_remaining = _conf('MIN_REMAINING_SECONDS')
+
+    entry = backend.get(key)
+    if entry is not None and entry['expires_at'] - now >= min_remaining:
+        _incr('hits')
+        return entry['url']
+
+    _incr('misses')
+    url = storage.presigned_download_url(storage_path)
+    expires_in = storage.DOWNLOAD_URL_EXPIRES
+    timeout = expires_in - min_remaining
+    if timeout > 0:
+        backend.set(key, {'url': url, 'expires_at': now + expires_in}, timeout)
+    return url
+
+
+def invalidate(user_id, document_id):
+    _get_backend().delete(_key(user_id, document_id))
+    _incr('invalidations')
+
+
+def stats():
+    with _stats_lock:
+        return dict(_stats)
+
+
+def reset():
+    """
+    Vide le cache et remet les compteurs à zéro (benchmarks, changement de settings).
+    """
+    global _backend
+    with _backend_lock:
+        if _backend is not None:
+            _backend.clear()
+        _backend = None
+    with _stats_lock:
+        for name in _stats:
+            _stats[name] = 0
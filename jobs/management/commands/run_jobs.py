@@ -0,0 +1,34 @@
+# jobs/management/commands/run_jobs.py
+from django.core.management.base import BaseCommand, CommandError
+
+from jobs import queue
+from jobs.worker import Worker
+
+
+class Command(BaseCommand):
+    help = "Exécute les tâches différées (file jobs_job) jusqu'à SIGTERM."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help="Tâches exécutées en parallèle")
+        parser.add_argument(
+            '--task', action='append', dest='tasks',
+            help="Limiter le worker à cette tâche (option répétable)",
+        )
+        parser.add_argument('--burst', action='store_true', help="S'arrêter quand la file est vide")
+        parser.add_argument('--poll-interval', type=float, help="Secondes entre deux recherches de tâches")
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1:
+            raise CommandError("--concurrency doit être >= 1")
+        unknown = [name for name in options['tasks'] or () if name not in queue.REGISTRY]
+        if unknown:
+            raise CommandError(f"Tâches inconnues : {', '.join(unknown)}")
+
+        worker = Worker(
+            concurrency=options['concurrency'],
+            names=options['tasks'],
+            burst=options['burst'],
+            poll_interval=options['poll_interval'],
+        )
+        worker.install_signal_handlers()
+        worker.run()
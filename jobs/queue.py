@@ -0,0 +1,240 @@
+# jobs/queue.py
+"""
+File de tâches adossée à la base (table jobs_job), sans broker externe.
+
+    from jobs.queue import task, enqueue
+
+    @task('documents.delete_object', max_attempts=8)
+    def delete_object(storage_path): ...
+
+    enqueue('documents.delete_object', {'storage_path': path}, key=f'delete_object:{doc.id}')
+
+- enqueue() écrit dans la transaction courante : la tâche n'est visible des
+  workers qu'après le COMMIT, et disparaît en cas de ROLLBACK ;
+- une clé d'idempotence déjà connue est ignorée (contrainte unique) ;
+- échec : nouvel essai avec backoff exponentiel (et gigue) jusqu'à
+  max_attempts, puis statut "failed" (relance possible depuis l'admin) ;
+- concurrency=N sur une tâche limite le nombre d'exécutions simultanées,
+  tous workers confondus (verrou consultatif sur PostgreSQL) ;
+- une tâche "running" dont le verrou dépasse LOCK_TIMEOUT (worker tué) est
+  reprise : les tâches doivent donc être idempotentes.
+"""
+import functools
+import logging
+import random
+import time
+import zlib
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from jobs.models import Job
+from secure_doc import metrics
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'EAGER': False,             # exécuter à la validation de la transaction (dev, sans worker)
+    'MAX_ATTEMPTS': 5,
+    'RETRY_BASE_SECONDS': 10,
+    'RETRY_MAX_SECONDS': 3600,
+    'LOCK_TIMEOUT': 600,        # secondes avant reprise d'une tâche "running"
+    'POLL_INTERVAL': 1.0,
+    'KEEP_FINISHED_DAYS': 7,    # purge des tâches terminées
+}
+
+ERROR_MAX_LENGTH = 2000
+BULK_BATCH_SIZE = 500
+
+
+def conf(name):
+    return getattr(settings, 'JOBS', {}).get(name, DEFAULTS[name])
+
+
+class PermanentError(Exception):
+    """
+    Levée par une tâche pour échouer sans nouvel essai.
+    """
+
+
+#------------------------------------------ Registre ------------------------------------------
+class Task:
+    def __init__(self, name, func, max_attempts=None, concurrency=None):
+        self.name = name
+        self.func = func
+        self.max_attempts = max_attempts
+        self.concurrency = concurrency
+
+    def __call__(self, **payload):
+        return self.func(**payload)
+
+
+REGISTRY = {}
+
+
+def task(name, max_attempts=None, concurrency=None):
+    """
+    Déclare une tâche. Le payload (dict JSON) est passé en arguments nommés.
+    """
+    def decorator(func):
+        REGISTRY[name] = Task(name, func, max_attempts, concurrency)
+        return func
+    return decorator
+
+
+def get_task(name):
+    return REGISTRY.get(name)
+
+
+#------------------------------------------ Mise en file ------------------------------------------
+def enqueue(name, payload=None, *, key=None, delay=0, max_attempts=None):
+    """
+    Met une tâche en file dans la transaction courante.
+    """
+    enqueue_many(name, [(payload, key)], delay=delay, max_attempts=max_attempts)
+
+
+def enqueue_many(name, items, *, delay=0, max_attempts=None):
+    """
+    Met en file une tâche par (payload, clé d'idempotence) en un seul INSERT.
+    """
+    registered = get_task(name)
+    if registered is None:
+        raise ValueError(f"Tâche inconnue : {name}")
+    items = [(payload or {}, key) for payload, key in items]
+    if not items:
+        return
+
+    if conf('EAGER'):
+        for payload, _ in items:
+            transaction.on_commit(functools.partial(_run_eager, registered, payload))
+        return
+
+    max_attempts = max_attempts or registered.max_attempts or conf('MAX_ATTEMPTS')
+    run_at = timezone.now() + timedelta(seconds=delay)
+    Job.objects.bulk_create([
+        Job(name=name, payload=payload, idempotency_key=key, max_attempts=max_attempts, run_at=run_at)
+        for payload, key in items
+    ], batch_size=BULK_BATCH_SIZE, ignore_conflicts=True)
+
+
+def _run_eager(registered, payload):
+    try:
+        registered(**payload)
+    except Exception:
+        logger.exception("Échec de la tâche %s (mode EAGER)", registered.name)
+
+
+#------------------------------------------ Exécution ------------------------------------------
+def retry_delay(attempts):
+    """
+    Backoff exponentiel borné, avec gigue pour étaler les reprises.
+    """
+    delay = min(conf('RETRY_BASE_SECONDS') * 2 ** (attempts - 1), conf('RETRY_MAX_SECONDS'))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _ready(now):
+    stale = now - timedelta(seconds=conf('LOCK_TIMEOUT'))
+    return Q(status=Job.PENDING, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale)
+
+
+def _lock_task_name(name):
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_xact_lock(%s)', [zlib.crc32(name.encode())])
+
+
+def claim(worker_id, limit, names=None, exclude=(), max_running=None):
+    """
+    Réserve jusqu'à `limit` tâches prêtes pour ce worker et les retourne.
+
+    Avec max_running (un seul nom dans `names`), le nombre de tâches de ce nom
+    déjà en cours est déduit de `limit`.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        if max_running is not None:
+            _lock_task_name(names[0])
+            stale = now - timedelta(seconds=conf('LOCK_TIMEOUT'))
+            running = Job.objects.filter(
+                name__in=names, status=Job.RUNNING, locked_at__gte=stale
+            ).count()
+            limit = min(limit, max_running - running)
+        if limit <= 0:
+            return []
+
+        candidates = Job.objects.filter(_ready(now))
+        if names is not None:
+            candidates = candidates.filter(name__in=names)
+        if exclude:
+            candidates = candidates.exclude(name__in=exclude)
+        ids = list(
+            candidates.order_by('run_at')
+            .select_for_update(skip_locked=True)
+            .values_list('id', flat=True)[:limit]
+        )
+        if not ids:
+            return []
+        # Les conditions sont répétées : sans SKIP LOCKED (SQLite), un autre
+        # worker a pu réserver une partie de ces tâches entre-temps.
+        Job.objects.filter(_ready(now), id__in=ids).update(
+            status=Job.RUNNING, locked_at=now, locked_by=worker_id,
+            attempts=F('attempts') + 1,
+        )
+    return list(Job.objects.filter(id__in=ids, locked_by=worker_id, locked_at=now))
+
+
+def execute(job):
+    """
+    Exécute une tâche réservée et enregistre son issue.
+    """
+    registered = get_task(job.name)
+    mine = Job.objects.filter(id=job.id, locked_by=job.locked_by, locked_at=job.locked_at)
+    close_old_connections()
+    started = time.perf_counter()
+    try:
+        if registered is None:
+            raise PermanentError(f"Tâche inconnue : {job.name}")
+        registered(**job.payload)
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'[:ERROR_MAX_LENGTH]
+        if isinstance(e, PermanentError) or job.attempts >= job.max_attempts:
+            logger.error("Tâche %s #%s en échec définitif : %s", job.name, job.id, error)
+            mine.update(status=Job.FAILED, finished_at=timezone.now(), last_error=error, locked_by='')
+            outcome = 'failed'
+        else:
+            delay = retry_delay(job.attempts)
+            logger.warning(
+                "Tâche %s #%s en échec (essai %s/%s), nouvel essai dans %.0fs : %s",
+                job.name, job.id, job.attempts, job.max_attempts, delay, error,
+            )
+            mine.update(
+                status=Job.PENDING, run_at=timezone.now() + timedelta(seconds=delay),
+                last_error=error, locked_by='', locked_at=None,
+            )
+            outcome = 'retried'
+    else:
+        mine.update(status=Job.SUCCEEDED, finished_at=timezone.now(), locked_by='')
+        outcome = 'succeeded'
+    finally:
+        close_old_connections()
+    if metrics.enabled():
+        metrics.observe_job(job.name, outcome, time.perf_counter() - started)
+    return outcome
+
+
+def purge_finished():
+    """
+    Supprime les tâches terminées depuis plus de KEEP_FINISHED_DAYS
+    (leurs clés d'idempotence redeviennent disponibles).
+    """
+    cutoff = timezone.now() - timedelta(days=conf('KEEP_FINISHED_DAYS'))
+    deleted, _ = Job.objects.filter(
+        status__in=(Job.SUCCEEDED, Job.FAILED), finished_at__lt=cutoff
+    ).delete()
+    return deleted
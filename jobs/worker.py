@@ -0,0 +1,113 @@
+# jobs/worker.py
+"""
+Boucle du worker : réserve les tâches prêtes et les exécute sur un pool
+de threads de taille fixe (--concurrency).
+"""
+import logging
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.db import close_old_connections
+
+from jobs import queue
+
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 3600
+
+
+class Worker:
+    def __init__(self, concurrency=4, names=None, burst=False, poll_interval=None):
+        self.concurrency = concurrency
+        self.names = names
+        self.burst = burst
+        self.poll_interval = poll_interval or queue.conf('POLL_INTERVAL')
+        self.worker_id = f'{socket.gethostname()}:{os.getpid()}'[:100]
+        self._stop = threading.Event()
+        self._last_purge = 0.0
+
+    def stop(self, *args):
+        self._stop.set()
+
+    def install_signal_handlers(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+
+    def _tasks(self):
+        if self.names is None:
+            return list(queue.REGISTRY.values())
+        return [queue.REGISTRY[name] for name in self.names if name in queue.REGISTRY]
+
+    def claim(self, free):
+        """
+        Réserve au plus `free` tâches : d'abord celles sans limite de
+        concurrence, puis, pour chaque tâche limitée, ce qu'il lui reste.
+        """
+        tasks = self._tasks()
+        limited = [t for t in tasks if t.concurrency]
+        unlimited = [t.name for t in tasks if not t.concurrency]
+
+        jobs = []
+        if self.names is None:
+            jobs += queue.claim(self.worker_id, free, exclude=[t.name for t in limited])
+        elif unlimited:
+            jobs += queue.claim(self.worker_id, free, names=unlimited)
+        for limited_task in limited:
+            if len(jobs) >= free:
+                break
+            jobs += queue.claim(
+                self.worker_id, free - len(jobs),
+                names=[limited_task.name], max_running=limited_task.concurrency,
+            )
+        return jobs
+
+    def _execute(self, job):
+        try:
+            return queue.execute(job)
+        except Exception:
+            # Issue non enregistrée (base indisponible...) : la tâche sera
+            # reprise après LOCK_TIMEOUT
+            logger.exception("Exécution de la tâche %s #%s interrompue", job.name, job.id)
+
+    def _purge(self):
+        now = time.monotonic()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        deleted = queue.purge_finished()
+        if deleted:
+            logger.info("%s tâches terminées purgées", deleted)
+
+    def run(self):
+        logger.info("Worker %s démarré (%s threads)", self.worker_id, self.concurrency)
+        in_flight = set()
+        with ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job') as pool:
+            while not self._stop.is_set():
+                close_old_connections()
+                in_flight = {f for f in in_flight if not f.done()}
+                free = self.concurrency - len(in_flight)
+                jobs = []
+                if free > 0:
+                    try:
+                        jobs = self.claim(free)
+                        self._purge()
+                    except Exception:
+                        logger.exception("Réservation des tâches impossible")
+                for job in jobs:
+                    in_flight.add(pool.submit(self._execute, job))
+                if jobs:
+                    continue
+                if self.burst and not in_flight:
+                    break
+                if in_flight and free <= 0:
+                    wait(in_flight, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+                else:
+                    self._stop.wait(self.poll_interval)
+            # Arrêt propre : les tâches en cours vont à leur terme
+            wait(in_flight)
+        logger.info("Worker %s arrêté", self.worker_id)
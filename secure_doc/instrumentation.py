@@ -0,0 +1,116 @@
+# secure_doc/instrumentation.py
+"""
+Compteurs par requête (SQL, appels S3) alimentés par des hooks installés
+une fois pour toutes : wrapper d'exécution sur chaque connexion DB et
+événements botocore sur le client S3 partagé.
+
+Les hooks ne font rien tant qu'aucune requête n'est échantillonnée
+(une simple lecture de ContextVar), d'où un coût quasi nul quand
+l'instrumentation est désactivée.
+"""
+import contextvars
+import time
+
+from botocore import xform_name
+
+
+_current = contextvars.ContextVar('request_stats', default=None)
+
+
+class RequestStats:
+    __slots__ = (
+        'queries', 'db_time', 's3_calls', 's3_time', 'presigns',
+        'slowest_sql', 'slowest_sql_time',
+    )
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.s3_calls = 0
+        self.s3_time = 0.0
+        self.presigns = 0
+        self.slowest_sql = None
+        self.slowest_sql_time = 0.0
+
+    def record_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        if duration > self.slowest_sql_time:
+            self.slowest_sql_time = duration
+            self.slowest_sql = sql
+
+
+def start():
+    """
+    Active la collecte pour le contexte courant ; retourne (stats, token).
+    """
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def stop(token):
+    _current.reset(token)
+
+
+def current():
+    return _current.get()
+
+
+#------------------------------------------ Base de données ------------------------------------------
+def db_execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.record_query(sql, time.perf_counter() - started)
+
+
+def install_db_wrapper(sender=None, connection=None, **kwargs):
+    """
+    Receiver de connection_created : ajoute le wrapper à la connexion.
+    """
+    if db_execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(db_execute_wrapper)
+
+
+#------------------------------------------ Stockage S3 ------------------------------------------
+_s3_observers = []
+
+
+def add_s3_observer(callback):
+    """
+    callback(operation, duration_seconds) appelé après chaque appel S3
+    (HTTP ou signature d'URL), que la requête soit échantillonnée ou non.
+    """
+    if callback not in _s3_observers:
+        _s3_observers.append(callback)
+
+
+def record_s3(operation, duration, http=True):
+    stats = _current.get()
+    if stats is not None:
+        if http:
+            stats.s3_calls += 1
+            stats.s3_time += duration
+        else:
+            stats.presigns += 1
+    for callback in _s3_observers:
+        callback(operation, duration)
+
+
+def _s3_before_call(context, **kwargs):
+    context['instrumentation_started'] = time.perf_counter()
+
+
+def _s3_after_call(model, context, **kwargs):
+    started = context.pop('instrumentation_started', None)
+    if started is not None:
+        record_s3(xform_name(model.name), time.perf_counter() - started)
+
+
+def register_s3_hooks(client):
+    client.meta.events.register('before-call.s3', _s3_before_call)
+    client.meta.events.register('after-call.s3', _s3_after_call)
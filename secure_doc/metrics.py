@@ -0,0 +1,400 @@
+# secure_doc/metrics.py
+"""
+Registre de métriques au format d'exposition Prometheus.
+
+Chaque thread écrit dans son propre dictionnaire (shard) : l'enregistrement
+d'une mesure ne prend aucun verrou. Les shards ne sont additionnés qu'au
+moment de la lecture (scrape ou écriture périodique) ; ceux des threads
+terminés (pools d'exécuteurs, threads ASGI) sont alors reportés dans un
+total unique puis oubliés. Métriques désactivées : aucune mesure n'est
+enregistrée.
+
+Multi-processus (workers gunicorn) : si METRICS['DIR'] est défini, chaque
+processus écrit régulièrement son instantané dans DIR/metrics-<pid>.json et
+l'endpoint de scrape agrège tous les fichiers du répertoire.
+"""
+import atexit
+import bisect
+import hmac
+import json
+import os
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.http import HttpResponse
+
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+DEFAULTS = {
+    'ENABLED': False,
+    'DIR': '',               # répertoire partagé entre workers ('' = mono-processus)
+    'FLUSH_INTERVAL': 10,    # secondes entre deux écritures de l'instantané
+    'TOKEN': '',             # si défini, exigé en "Authorization: Bearer <token>"
+}
+
+REGISTRY = {}
+
+_local = threading.local()
+_shards = []             # [(thread, shard)] des threads vivants
+_retired = {}            # somme des shards des threads terminés
+_shards_lock = threading.Lock()
+_generation = 0
+_flusher = None
+
+
+def options():
+    return {**DEFAULTS, **getattr(settings, 'METRICS', {})}
+
+
+def enabled():
+    return bool(getattr(settings, 'METRICS', {}).get('ENABLED', DEFAULTS['ENABLED']))
+
+
+def _after_fork():
+    # Un worker forké repart de zéro : les mesures du parent sont à lui
+    global _shards, _retired, _shards_lock, _generation, _flusher
+    _shards = []
+    _retired = {}
+    _shards_lock = threading.Lock()
+    _generation += 1
+    _flusher = None
+
+
+os.register_at_fork(after_in_child=_after_fork)
+
+
+def _shard():
+    if getattr(_local, 'generation', None) == _generation:
+        return _local.shard
+    shard = {}
+    with _shards_lock:
+        _retire_dead_shards()
+        _shards.append((threading.current_thread(), shard))
+        _start_flusher()
+    _local.shard = shard
+    _local.generation = _generation
+    return shard
+
+
+def _retire_dead_shards():
+    """
+    Reporte dans _retired les shards des threads terminés (sous _shards_lock) :
+    plus aucune écriture ne peut s'y produire.
+    """
+    alive = []
+    for thread, shard in _shards:
+        if thread.is_alive():
+            alive.append((thread, shard))
+        else:
+            for key, value in shard.items():
+                _merge(_retired, key, value)
+    _shards[:] = alive
+
+
+#------------------------------------------ Types de métriques ------------------------------------------
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        REGISTRY[name] = self
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels[label]) for label in self.labelnames))
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        shard = _shard()
+        shard[key] = shard.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    """
+    Jauge additive (inc/dec) : la valeur exposée est la somme des threads
+    et des processus vivants.
+    """
+    kind = 'gauge'
+
+    def inc(self, amount=1, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        shard = _shard()
+        shard[key] = shard.get(key, 0) + amount
+
+    def dec(self, amount=1, **labels):
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        if not enabled():
+            return
+        key = self._key(labels)
+        shard = _shard()
+        # [compteurs par intervalle..., +Inf, somme, nombre]
+        values = shard.get(key)
+        if values is None:
+            values = shard[key] = [0] * (len(self.buckets) + 3)
+        values[bisect.bisect_left(self.buckets, value)] += 1
+        values[-2] += value
+        values[-1] += 1
+
+
+#------------------------------------------ Agrégation ------------------------------------------
+def _merge(totals, key, value):
+    if isinstance(value, list):
+        current = totals.get(key)
+        if current is None:
+            totals[key] = list(value)
+        else:
+            for i, v in enumerate(value):
+                current[i] += v
+    else:
+        totals[key] = totals.get(key, 0) + value
+
+
+def snapshot():
+    """
+    Somme des shards du processus courant : {(nom, labels): valeur}.
+    """
+    with _shards_lock:
+        _retire_dead_shards()
+        shards = [shard for _, shard in _shards]
+        totals = {}
+        for key, value in _retired.items():
+            _merge(totals, key, value)
+    for shard in shards:
+        for key, value in shard.copy().items():
+            _merge(totals, key, value)
+    return totals
+
+
+def _snapshot_path(directory, pid):
+    return os.path.join(directory, f'metrics-{pid}.json')
+
+
+def write_snapshot():
+    directory = options()['DIR']
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    data = {
+        'pid': os.getpid(),
+        'samples': [[name, list(labels), value] for (name, labels), value in snapshot().items()],
+    }
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.metrics-')
+    with os.fdopen(fd, 'w') as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, _snapshot_path(directory, os.getpid()))
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def collect():
+    """
+    Agrège tous les processus (ou le seul processus courant sans DIR).
+    Les compteurs et histogrammes des workers terminés sont conservés ;
+    les jauges ne comptent que les processus vivants.
+    """
+    directory = options()['DIR']
+    if not directory:
+        return snapshot()
+    write_snapshot()
+    totals = {}
+    for name in os.listdir(directory):
+        if not name.startswith('metrics-'):
+            continue
+        try:
+            with open(os.path.join(directory, name)) as fh:
+                data = json.load(fh)
+        except (OSError, ValueError):
+            continue
+        alive = data['pid'] == os.getpid() or _pid_alive(data['pid'])
+        for metric_name, labels, value in data['samples']:
+            metric = REGISTRY.get(metric_name)
+            if metric is None or (metric.kind == 'gauge' and not alive):
+                continue
+            _merge(totals, (metric_name, tuple(labels)), value)
+    return totals
+
+
+def _flush_loop(interval):
+    while True:
+        time.sleep(interval)
+        try:
+            write_snapshot()
+        except OSError:
+            pass
+
+
+def _start_flusher():
+    global _flusher
+    opts = options()
+    if _flusher is not None or not opts['DIR']:
+        return
+    _flusher = threading.Thread(
+        target=_flush_loop, args=(opts['FLUSH_INTERVAL'],),
+        name='metrics-flush', daemon=True,
+    )
+    _flusher.start()
+
+
+def _flush_at_exit():
+    if _shards:
+        try:
+            write_snapshot()
+        except OSError:
+            pass
+
+
+atexit.register(_flush_at_exit)
+
+
+#------------------------------------------ Exposition ------------------------------------------
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_bound(bound):
+    return repr(float(bound))
+
+
+def render(totals=None):
+    totals = collect() if totals is None else totals
+    by_metric = {}
+    for (name, labels), value in totals.items():
+        by_metric.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, metric in REGISTRY.items():
+        lines.append(f'# HELP {name} {metric.documentation}')
+        lines.append(f'# TYPE {name} {metric.kind}')
+        for labels, value in sorted(by_metric.get(name, ())):
+            if metric.kind != 'histogram':
+                lines.append(f'{name}{_labels(metric.labelnames, labels)} {value}')
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets, value):
+                cumulative += count
+                le = f'le="{_format_bound(bound)}"'
+                lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, le)} {cumulative}')
+            cumulative += value[len(metric.buckets)]
+            inf = 'le="+Inf"'
+            lines.append(f'{name}_bucket{_labels(metric.labelnames, labels, inf)} {cumulative}')
+            lines.append(f'{name}_sum{_labels(metric.labelnames, labels)} {value[-2]}')
+            lines.append(f'{name}_count{_labels(metric.labelnames, labels)} {value[-1]}')
+    return '\n'.join(lines) + '\n'
+
+
+def metrics_view(request):
+    """
+    Endpoint de scrape Prometheus.
+    """
+    opts = options()
+    if not opts['ENABLED']:
+        return HttpResponse(status=404)
+    token = opts['TOKEN']
+    if token:
+        provided = request.headers.get('Authorization', '')
+        if not hmac.compare_digest(provided, f'Bearer {token}'):
+            return HttpResponse(status=401)
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+#------------------------------------------ Métriques de l'application ------------------------------------------
+REQUEST_DURATION = Histogram(
+    'securedoc_http_request_duration_seconds',
+    "Durée de traitement des requêtes HTTP par route.",
+    ('view', 'method', 'status'),
+)
+REQUEST_DB_QUERIES = Histogram(
+    'securedoc_http_request_db_queries',
+    "Nombre de requêtes SQL par requête HTTP.",
+    ('view',),
+    buckets=(1, 2, 3, 5, 10, 20, 50, 100),
+)
+REQUEST_DB_DURATION = Histogram(
+    'securedoc_http_request_db_duration_seconds',
+    "Temps passé en base de données par requête HTTP.",
+    ('view',),
+)
+STORAGE_OPERATIONS = Counter(
+    'securedoc_storage_operations_total',
+    "Opérations sur le stockage objet (appels HTTP et signatures d'URL).",
+    ('operation',),
+)
+STORAGE_DURATION = Histogram(
+    'securedoc_storage_operation_duration_seconds',
+    "Durée des opérations sur le stockage objet.",
+    ('operation',),
+)
+JWT_AUTHENTICATIONS = Counter(
+    'securedoc_jwt_authentications_total',
+    "Authentifications JWT par résultat.",
+    ('result',),
+)
+JWT_AUTHENTICATIONS_IN_PROGRESS = Gauge(
+    'securedoc_jwt_authentications_in_progress',
+    "Authentifications JWT en cours.",
+)
+JOBS_PROCESSED = Counter(
+    'securedoc_jobs_processed_total',
+    "Exécutions de tâches différées par issue (succeeded, retried, failed).",
+    ('task', 'outcome'),
+)
+JOB_DURATION = Histogram(
+    'securedoc_job_duration_seconds',
+    "Durée d'exécution des tâches différées.",
+    ('task',),
+)
+
+
+def observe_request(request, response, stats, duration):
+    match = getattr(request, 'resolver_match', None)
+    view = match.view_name if match else 'unmatched'
+    REQUEST_DURATION.observe(duration, view=view, method=request.method, status=response.status_code)
+    REQUEST_DB_QUERIES.observe(stats.queries, view=view)
+    REQUEST_DB_DURATION.observe(stats.db_time, view=view)
+
+
+def observe_storage(operation, duration):
+    STORAGE_OPERATIONS.inc(operation=operation)
+    STORAGE_DURATION.observe(duration, operation=operation)
+
+
+def observe_job(task, outcome, duration):
+    JOBS_PROCESSED.inc(task=task, outcome=outcome)
+    JOB_DURATION.observe(duration, task=task)
@@ -0,0 +1,123 @@
+# secure_doc/middleware.py
+import json
+import logging
+import random
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+from secure_doc import instrumentation, metrics
+
+
+logger = logging.getLogger('secure_doc.requests')
+
+DEFAULTS = {
+    'SAMPLE_RATE': 0.0,       # 0 = désactivé, 1 = toutes les requêtes
+    'SLOW_SQL_MS': 100,       # seuil de journalisation de la requête SQL la plus lente
+    'SERVER_TIMING': True,    # en-tête Server-Timing sur les réponses échantillonnées
+}
+
+
+class RequestInstrumentationMiddleware:
+    """
+    Mesure, pour une fraction des requêtes, le nombre et la durée des requêtes
+    SQL et des appels S3 ainsi que le temps total de la vue.
+    Résultat : en-tête Server-Timing + une ligne de log JSON par requête.
+
+    Si les métriques sont activées (METRICS['ENABLED']), toutes les requêtes
+    alimentent en plus les histogrammes de secure_doc.metrics.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.options = {**DEFAULTS, **getattr(settings, 'REQUEST_INSTRUMENTATION', {})}
+        self.sample_rate = float(self.options['SAMPLE_RATE'])
+        self.metrics_enabled = metrics.enabled()
+        if self.metrics_enabled:
+            instrumentation.add_s3_observer(metrics.observe_storage)
+        if self.sample_rate > 0 or self.metrics_enabled:
+            connection_created.connect(
+                instrumentation.install_db_wrapper,
+                dispatch_uid='secure_doc.instrumentation',
+            )
+            for connection in connections.all(initialized_only=True):
+                instrumentation.install_db_wrapper(connection=connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate >= 1 or (self.sample_rate > 0 and random.random() < self.sample_rate)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        sampled = self._sampled()
+        if not sampled and not self.metrics_enabled:
+            return self.get_response(request)
+        stats, token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        self._finish(request, response, stats, time.perf_counter() - started, sampled)
+        return response
+
+    async def __acall__(self, request):
+        sampled = self._sampled()
+        if not sampled and not self.metrics_enabled:
+            return await self.get_response(request)
+        stats, token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            instrumentation.stop(token)
+        self._finish(request, response, stats, time.perf_counter() - started, sampled)
+        return response
+
+    def _finish(self, request, response, stats, elapsed, sampled):
+        if self.metrics_enabled:
+            metrics.observe_request(request, response, stats, elapsed)
+        if sampled:
+            self._report(request, response, stats, elapsed)
+
+    def _report(self, request, response, stats, elapsed):
+        total_ms = elapsed * 1000
+        db_ms = stats.db_time * 1000
+        s3_ms = stats.s3_time * 1000
+        match = getattr(request, 'resolver_match', None)
+
+        if self.options['SERVER_TIMING']:
+            timing = (
+                f'db;dur={db_ms:.1f};desc="{stats.queries} queries", '
+                f's3;dur={s3_ms:.1f};desc="{stats.s3_calls} calls", '
+                f'app;dur={total_ms:.1f}'
+            )
+            existing = response.get('Server-Timing')
+            response['Server-Timing'] = f'{existing}, {timing}' if existing else timing
+
+        logger.info(json.dumps({
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_queries': stats.queries,
+            'db_ms': round(db_ms, 2),
+            's3_calls': stats.s3_calls,
+            's3_ms': round(s3_ms, 2),
+            's3_presigns': stats.presigns,
+        }))
+
+        slowest_ms = stats.slowest_sql_time * 1000
+        if stats.slowest_sql and slowest_ms >= self.options['SLOW_SQL_MS']:
+            logger.warning(
+                "Requête SQL lente (%.1f ms) sur %s %s : %s",
+                slowest_ms, request.method, request.path, stats.slowest_sql[:2000],
+            )
@@ -34,6 +34,7 @@ INSTALLED_APPS = [
     'corsheaders',
     'accounts',
     'documents',
+    'jobs',
 ]
 
 MIDDLEWARE = [
@@ -45,6 +46,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'secure_doc.middleware.RequestInstrumentationMiddleware',
 ]
 
 ROOT_URLCONF = 'secure_doc.urls'
@@ -70,18 +72,53 @@ WSGI_APPLICATION = 'secure_doc.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+import dj_database_url
+from decouple import config
+
+# DATABASE_URL (docker-compose / Render) ; SQLite local par défaut
+DATABASE_URL = os.getenv('DATABASE_URL') or f"sqlite:///{BASE_DIR / 'db.sqlite3'}"
+
+# Mode de connexion PostgreSQL :
+#   - "persistent" : une connexion réutilisée par thread (CONN_MAX_AGE + health checks)
+#   - "pool"       : pool psycopg 3 intégré à Django (>= 5.1), une instance par worker
+#   - "pgbouncer"  : derrière PgBouncer en mode transaction (pas de curseurs serveur)
+DB_POOL_MODE = config('DB_POOL_MODE', default='persistent')
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=60, cast=int)
+
+# Taille du pool alignée sur gunicorn : chaque worker a son propre pool et
+# n'utilise au plus qu'une connexion par thread (docker/django/gunicorn.conf.py)
+GUNICORN_THREADS = config('GUNICORN_THREADS', default=1, cast=int)
+DB_POOL_MIN_SIZE = config('DB_POOL_MIN_SIZE', default=1, cast=int)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=GUNICORN_THREADS + 1, cast=int)
+DB_POOL_TIMEOUT = config('DB_POOL_TIMEOUT', default=10, cast=int)
+
 DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
+    'default': dj_database_url.parse(
+        DATABASE_URL,
+        conn_max_age=DB_CONN_MAX_AGE,
+        conn_health_checks=True,
+    )
 }
 
-# DATABASE
-# import dj_database_url
-# DATABASES = {
-#     'default': dj_database_url.parse(os.getenv('DATABASE_URL'))
-# }
+if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+    if DB_POOL_MODE == 'pool':
+        # Incompatible avec les connexions persistantes : c'est le pool qui réutilise
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default'].setdefault('OPTIONS', {})['pool'] = {
+            'min_size': DB_POOL_MIN_SIZE,
+            'max_size': DB_POOL_MAX_SIZE,
+            'timeout': DB_POOL_TIMEOUT,
+        }
+    elif DB_POOL_MODE == 'pgbouncer':
+        # En mode transaction, un curseur serveur ne survit pas à la transaction
+        DATABASES['default']['DISABLE_SERVER_SIDE_CURSORS'] = True
+elif DATABASES['default']['ENGINE'] == 'django.db.backends.sqlite3':
+    # Serveur et worker de tâches (jobs/) en parallèle : verrou d'écriture pris
+    # dès le BEGIN, pour attendre (timeout) plutôt qu'échouer en "database is locked"
+    DATABASES['default'].setdefault('OPTIONS', {}).update(transaction_mode='IMMEDIATE', timeout=20)
+    # models.W040 : l'include=['encrypted_aes_key'] de docaccess_user_doc_idx ne
+    # sert que sous PostgreSQL (index-only scan) ; SQLite l'ignore simplement
+    SILENCED_SYSTEM_CHECKS = ['models.W040']
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -128,7 +165,7 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 #-------------------------------- Mon cofiguraciones de REST Framework y JWT -------------------------------#
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.SecureDocJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
@@ -141,6 +178,7 @@ SIMPLE_JWT = {
     'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
     'REFRESH_TOKEN_LIFETIME': timedelta(days=7),
     'TOKEN_OBTAIN_SERIALIZER': 'accounts.serializers.CustomTokenObtainPairSerializer',
+    'TOKEN_REFRESH_SERIALIZER': 'accounts.serializers.CustomTokenRefreshSerializer',
 }
 
 AUTH_USER_MODEL = 'accounts.User'  # On va créer notre propre User
@@ -252,6 +290,120 @@ if USE_S3:
     AWS_DEFAULT_ACL = None
     AWS_S3_FILE_OVERWRITE = False
     AWS_S3_OBJECT_PARAMETERS = {'CacheControl': 'max-age=86400'}
+    # Client boto3 partagé par processus (documents/storage.py)
+    AWS_S3_MAX_POOL_CONNECTIONS = config('AWS_S3_MAX_POOL_CONNECTIONS', default=10, cast=int)
+    AWS_S3_TCP_KEEPALIVE = config('AWS_S3_TCP_KEEPALIVE', default=True, cast=bool)
+    AWS_S3_CONNECT_TIMEOUT = config('AWS_S3_CONNECT_TIMEOUT', default=5, cast=int)
+    AWS_S3_READ_TIMEOUT = config('AWS_S3_READ_TIMEOUT', default=60, cast=int)
+    AWS_S3_RETRY_MODE = config('AWS_S3_RETRY_MODE', default='standard')
+    AWS_S3_MAX_ATTEMPTS = config('AWS_S3_MAX_ATTEMPTS', default=3, cast=int)
+
+# Nombre de processus servant l'API (exporté par gunicorn.conf.py / entrypoint.sh)
+WEB_CONCURRENCY = config('WEB_CONCURRENCY', default=1, cast=int)
+
+# Cache des utilisateurs résolus par JWT (accounts/user_cache.py).
+# "auto" : cache Django s'il est partagé (Redis, Memcached, base), LRU du
+# processus avec un seul worker, sinon pas de cache. Un LRU par processus
+# avec plusieurs workers ("locmem" forcé) laisse les autres workers accepter
+# un compte désactivé jusqu'à TTL secondes.
+ACCOUNTS_USER_CACHE = {
+    'ENABLED': config('ACCOUNTS_USER_CACHE_ENABLED', default=True, cast=bool),
+    'BACKEND': config('ACCOUNTS_USER_CACHE_BACKEND', default='auto'),  # ou "locmem", "django"
+    'WORKERS': WEB_CONCURRENCY,
+    'MAX_ENTRIES': config('ACCOUNTS_USER_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'TTL': config('ACCOUNTS_USER_CACHE_TTL', default=30, cast=int),
+}
+
+# Annuaire des clés publiques (accounts/key_directory.py) : LRU du processus,
+# revalidé à chaque lecture par (id, email, key_version) en une requête
+ACCOUNTS_KEY_DIRECTORY = {
+    'ENABLED': config('ACCOUNTS_KEY_DIRECTORY_CACHE_ENABLED', default=True, cast=bool),
+    'MAX_ENTRIES': config('ACCOUNTS_KEY_DIRECTORY_MAX_ENTRIES', default=10000, cast=int),
+    'TTL': config('ACCOUNTS_KEY_DIRECTORY_TTL', default=60, cast=int),
+    'MAX_ITEMS': config('ACCOUNTS_KEY_DIRECTORY_MAX_ITEMS', default=500, cast=int),
+}
+
+# Documents : opérations par lots
+DOCUMENTS_BATCH_MAX_ITEMS = config('DOCUMENTS_BATCH_MAX_ITEMS', default=500, cast=int)
+DOCUMENTS_HEAD_CONCURRENCY = config('DOCUMENTS_HEAD_CONCURRENCY', default=8, cast=int)
+# Upload multipart : taille de partie conseillée (augmentée au-delà de 10 000 parties)
+DOCUMENTS_MULTIPART_PART_SIZE = config('DOCUMENTS_MULTIPART_PART_SIZE', default=16 * 1024 * 1024, cast=int)
+DOCUMENTS_MULTIPART_PRESIGN_BATCH = config('DOCUMENTS_MULTIPART_PRESIGN_BATCH', default=100, cast=int)
+
+# Vérification des objets à la confirmation d'upload : "inline" (head_object dans
+# la requête) ou "deferred" (tâche documents.verify_upload, cf. jobs/).
+# "deferred" exige un worker `manage.py run_jobs` : sans lui, un document
+# confirmé (201) dont l'objet manque n'est jamais supprimé.
+DOCUMENTS_VERIFY_UPLOADS = config('DOCUMENTS_VERIFY_UPLOADS', default='inline')
+
+# Déduplication des objets chiffrés par file_hash, par propriétaire (documents/blobs.py)
+DOCUMENTS_DEDUP = config('DOCUMENTS_DEDUP', default=False, cast=bool)
+
+# Tâches différées (jobs/queue.py), exécutées par `manage.py run_jobs`
+JOBS = {
+    'EAGER': config('JOBS_EAGER', default=False, cast=bool),  # sans worker (dev)
+    'MAX_ATTEMPTS': config('JOBS_MAX_ATTEMPTS', default=5, cast=int),
+    'RETRY_BASE_SECONDS': config('JOBS_RETRY_BASE_SECONDS', default=10, cast=int),
+    'RETRY_MAX_SECONDS': config('JOBS_RETRY_MAX_SECONDS', default=3600, cast=int),
+    'LOCK_TIMEOUT': config('JOBS_LOCK_TIMEOUT', default=600, cast=int),
+    'POLL_INTERVAL': config('JOBS_POLL_INTERVAL', default=1.0, cast=float),
+    'KEEP_FINISHED_DAYS': config('JOBS_KEEP_FINISHED_DAYS', default=7, cast=int),
+}
+
+# Téléchargement relayé par le serveur (documents/download_proxy.py)
+DOCUMENTS_DOWNLOAD_PROXY = {
+    'ENABLED': config('DOCUMENTS_DOWNLOAD_PROXY_ENABLED', default=False, cast=bool),
+    'MODE': config('DOCUMENTS_DOWNLOAD_PROXY_MODE', default='stream'),  # ou "accel" (nginx)
+    'ACCEL_LOCATION': config('DOCUMENTS_DOWNLOAD_PROXY_ACCEL_LOCATION', default='/_protected_s3/'),
+    'CHUNK_SIZE': config('DOCUMENTS_DOWNLOAD_PROXY_CHUNK_SIZE', default=256 * 1024, cast=int),
+}
+
+# Notifications temps réel (documents/events.py, flux SSE /api/async/documents/events/)
+DOCUMENTS_EVENTS = {
+    'BACKEND': config('DOCUMENTS_EVENTS_BACKEND', default='inprocess'),  # ou "postgres"
+    'CHANNEL': config('DOCUMENTS_EVENTS_CHANNEL', default='securedoc_events'),
+    'LISTEN_DSN': config('DOCUMENTS_EVENTS_LISTEN_DSN', default=''),
+    'HEARTBEAT_SECONDS': config('DOCUMENTS_EVENTS_HEARTBEAT', default=15, cast=int),
+    'TICKET_TTL': config('DOCUMENTS_EVENTS_TICKET_TTL', default=30, cast=int),
+}
+
+# Cache des URL de téléchargement pré-signées (documents/url_cache.py)
+DOCUMENTS_URL_CACHE = {
+    'ENABLED': config('DOCUMENTS_URL_CACHE_ENABLED', default=True, cast=bool),
+    'BACKEND': config('DOCUMENTS_URL_CACHE_BACKEND', default='locmem'),  # ou "django"
+    'MAX_ENTRIES': config('DOCUMENTS_URL_CACHE_MAX_ENTRIES', default=10000, cast=int),
+    'MIN_REMAINING_SECONDS': config('DOCUMENTS_URL_CACHE_MIN_REMAINING', default=600, cast=int),
+}
+
+# Instrumentation par requête (secure_doc/middleware.py) : SQL, S3, Server-Timing
+REQUEST_INSTRUMENTATION = {
+    'SAMPLE_RATE': config('REQUEST_INSTRUMENTATION_SAMPLE_RATE', default=0.0, cast=float),
+    'SLOW_SQL_MS': config('REQUEST_INSTRUMENTATION_SLOW_SQL_MS', default=100, cast=int),
+    'SERVER_TIMING': config('REQUEST_INSTRUMENTATION_SERVER_TIMING', default=True, cast=bool),
+}
+
+# Métriques Prometheus (secure_doc/metrics.py), exposées sur /metrics
+METRICS = {
+    'ENABLED': config('METRICS_ENABLED', default=False, cast=bool),
+    'DIR': config('METRICS_DIR', default=''),  # partagé entre workers gunicorn
+    'FLUSH_INTERVAL': config('METRICS_FLUSH_INTERVAL', default=10, cast=int),
+    'TOKEN': config('METRICS_TOKEN', default=''),
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'secure_doc.requests': {
+            'handlers': ['console'],
+            'level': config('REQUEST_INSTRUMENTATION_LOG_LEVEL', default='INFO'),
+            'propagate': False,
+        },
+    },
+}
 
 # Static files (obligatoire pour Render)
 STATIC_URL = '/static/'
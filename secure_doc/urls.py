@@ -3,6 +3,7 @@ from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from django.views.generic import RedirectView
 from drf_spectacular.views import SpectacularAPIView, SpectacularSwaggerView
+from secure_doc.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
@@ -15,6 +16,7 @@ urlpatterns = [
     # API Endpoints
     path('api/accounts/', include('accounts.api.urls')),
     path('api/documents/', include('documents.api.urls')),
+    path('api/async/documents/', include('documents.api.async_urls')),
     
     
     # JWT
@@ -25,4 +27,7 @@ urlpatterns = [
     # Swagger
     path('api/schema/', SpectacularAPIView.as_view(), name='schema'),
     path('api/docs/', SpectacularSwaggerView.as_view(url_name='schema'), name='swagger-ui'),
+
+    # Prometheus
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file